@@ -16,21 +16,32 @@ fix_entity_spans.py
   --dry-run       : 파일에 쓰지 않고 변경 요약만 출력
   --report        : 변경 상세 리포트 출력(표준에러)
   --strict        : 보정 실패 시 즉시 종료(기본: 경고만)
+  --resume        : 중단된 실행을 체크포인트(<output>.ckpt.json)부터 재개 (출력은 .tmp → 원자적 교체)
 """
 
+import os
 import sys
 import json
 import argparse
+
+# 공용 I/O 모듈(verify/jsonl_io.py) 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "verify"))
+from jsonl_io import add_shard_args, expand_input
+from job_runner import add_job_args, job_from_args
+from instrument import add_profile_args, profiler_from_args
 from typing import List, Tuple, Dict, Any
 
 def parse_args():
     p = argparse.ArgumentParser(description="Auto-fix entity begin/end spans using content & value.")
-    p.add_argument("-i", "--input", required=True, help="입력 JSONL 경로")
+    p.add_argument("-i", "--input", required=True, help="입력 JSONL 경로 (샤드 manifest JSON 가능)")
     p.add_argument("-o", "--output", required=False, help="출력 JSONL 경로 (dry-run이면 생략 가능)")
     p.add_argument("--allow-overlap", action="store_true", help="스팬 겹침 허용")
     p.add_argument("--dry-run", action="store_true", help="파일 기록 없이 변경 내역만 출력")
     p.add_argument("--report", action="store_true", help="변경 상세 리포트 출력")
     p.add_argument("--strict", action="store_true", help="보정 실패 시 즉시 종료")
+    add_shard_args(p)
+    add_job_args(p)
+    add_profile_args(p)
     return p.parse_args()
 
 def find_all(hay: str, needle: str) -> List[int]:
@@ -146,43 +157,49 @@ def main():
         sys.stderr.write("[에러] --dry-run이 아니면 --output을 지정해야 합니다.\n")
         sys.exit(1)
 
-    total, total_fixed, total_failed = 0, 0, 0
-    out_f = None
-    if not args.dry_run:
-        out_f = open(args.output, "w", encoding="utf-8")
-
+    stats = {"total": 0, "fixed": 0, "failed": 0}
     try:
-        with open(args.input, "r", encoding="utf-8") as fin:
-            for lineno, line in enumerate(fin, 1):
-                s = line.strip()
-                if not s:
-                    continue
-                total += 1
-                try:
+        job = job_from_args(args, expand_input(args.input), None if args.dry_run else args.output, stats,
+                            options={"allow_overlap": args.allow_overlap}, tag="begin_end_fix")
+        job.open()
+    except ValueError as e:
+        sys.stderr.write(f"[에러] {e}\n")
+        sys.exit(1)
+
+    prof = profiler_from_args(args, "begin_end_fix")
+    with job, prof:
+        for path, lineno, line in prof.iter("read", job.lines()):
+            s = line.strip()
+            if not s:
+                continue
+            stats["total"] += 1
+            prof.tick()
+            try:
+                with prof.stage("parse"):
                     obj = json.loads(s)
-                except json.JSONDecodeError as e:
-                    sys.stderr.write(f"[에러] {lineno}번째 줄 JSON 파싱 실패: {e}\n")
-                    sys.exit(1)
+            except json.JSONDecodeError as e:
+                sys.stderr.write(f"[에러] {path}:{lineno}번째 줄 JSON 파싱 실패: {e}\n")
+                sys.exit(1)
 
+            with prof.stage("fix"):
                 new_obj, logs, fixed, failed = fix_record(
                     obj, allow_overlap=args.allow_overlap, report=args.report
                 )
-                total_fixed += fixed
-                total_failed += failed
-
-                if args.report and logs:
-                    for msg in logs:
-                        sys.stderr.write(msg + "\n")
-
-                if not args.dry_run:
-                    out_f.write(json.dumps(new_obj, ensure_ascii=False))
-                    out_f.write("\n")
-    finally:
-        if out_f:
-            out_f.close()
-
-    sys.stderr.write(f"[요약] 레코드 {total}건 처리, 보정 {total_fixed}개, 실패 {total_failed}개\n")
-    if args.strict and total_failed > 0:
+            stats["fixed"] += fixed
+            stats["failed"] += failed
+
+            if args.report and logs:
+                for msg in logs:
+                    sys.stderr.write(msg + "\n")
+
+            if not args.dry_run:
+                with prof.stage("serialize"):
+                    out = json.dumps(new_obj, ensure_ascii=False)
+                with prof.stage("write"):
+                    job.write(out, new_obj.get("id"))
+
+    sys.stderr.write(f"[요약] 레코드 {stats['total']}건 처리, 보정 {stats['fixed']}개, 실패 {stats['failed']}개\n")
+    if args.strict and stats["failed"] > 0:
         sys.exit(1)
 
 if __name__ == "__main__":
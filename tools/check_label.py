@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import os
 import sys
 import json
+import argparse
+
+# 공용 계측 모듈(verify/instrument.py) 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "verify"))
+from instrument import add_profile_args, profiler_from_args
 
 SEP = "─" * 60
 
@@ -66,19 +72,23 @@ def context_around(text, begin, end, pad=12):
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("사용법: python show_entities.py <input.jsonl>")
-        sys.exit(1)
+    ap = argparse.ArgumentParser(description="Print entities of each JSONL record as a table with context")
+    ap.add_argument("input", help="입력 JSONL 경로")
+    add_profile_args(ap)
+    args = ap.parse_args()
 
-    path = sys.argv[1]
+    path = args.input
 
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
+    prof = profiler_from_args(args, "check_label")
+    with open(path, "r", encoding="utf-8") as f, prof:
+        for line in prof.iter("read", f):
             line = line.strip()
             if not line:
                 continue
+            prof.tick()
 
-            rec = parse_line(line)
+            with prof.stage("parse"):
+                rec = parse_line(line)
             _id = rec.get("id")
             text = rec.get("text")
             has_sensitive = rec.get("has_sensitive")
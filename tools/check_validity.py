@@ -12,16 +12,31 @@ validate_entity_spans.py
 
 - 실패 시: 첫 오류에서 즉시 종료(코드 1)
 - 성공 시: 요약 출력 후 종료(코드 0)
+- --collect-all: 첫 오류에서 멈추지 않고 전체 레코드 검사
+    범주별 건수 요약 + 범주마다 최대 --max-per-category 건 보관, 앞 --show-first 건의 컨텍스트 출력
+    --workers N 이면 줄 배치를 프로세스 풀로 나눠 검사 (결과는 입력 순서 그대로)
 
 옵션:
   --allow-empty-entities   : entities가 빈 리스트여도 오류로 보지 않음(기본: 빈 리스트면 통과, 항목이 있으면 모두 검증)
   --show-context N         : 매칭 실패 시 주변 N글자 컨텍스트를 함께 출력 (기본 12)
 """
 
+import os
 import sys
 import json
 import argparse
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Tuple
+
+# 공용 I/O 모듈(verify/jsonl_io.py) 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "verify"))
+from jsonl_io import open_text_auto, imap_ordered
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
+# 오류 범주 (요약/보관 단위)
+CATEGORIES = (
+    "JSON_PARSE", "NOT_OBJECT", "CONTENT", "ENTITIES", "ENTITY_NOT_OBJECT",
+    "MISSING_KEY", "BAD_TYPE", "BEGIN_GE_END", "OUT_OF_RANGE", "VALUE_MISMATCH",
+)
 
 def parse_args():
     p = argparse.ArgumentParser(description="Validate begin/end spans against content in JSONL.")
@@ -30,6 +45,17 @@ def parse_args():
                    help="entities가 빈 리스트여도 허용(기본: 허용)")
     p.add_argument("--show-context", type=int, default=12,
                    help="불일치 시 앞뒤로 보여줄 컨텍스트 길이 (기본: 12)")
+    p.add_argument("--collect-all", action="store_true",
+                   help="첫 오류에서 멈추지 않고 전체 검사 후 범주별 요약 출력")
+    p.add_argument("--max-per-category", type=int, default=20,
+                   help="--collect-all: 범주별로 보관할 실패 건수 (기본: 20)")
+    p.add_argument("--show-first", type=int, default=10,
+                   help="--collect-all: 상세(컨텍스트 포함) 출력할 앞쪽 실패 건수 (기본: 10)")
+    p.add_argument("--workers", type=int, default=1,
+                   help="--collect-all: 프로세스 풀 워커 수 (기본: 1 = 현재 프로세스)")
+    p.add_argument("--batch-size", type=int, default=5000,
+                   help="--collect-all --workers: 워커에 보내는 줄 수 (기본: 5000)")
+    add_profile_args(p)
     return p.parse_args()
 
 def excerpt(s: str, a: int, b: int, ctx: int) -> str:
@@ -41,18 +67,22 @@ def excerpt(s: str, a: int, b: int, ctx: int) -> str:
     right = s[b:end]
     return f"{left}⟦{mid}⟧{right}"
 
-def validate_record(obj: Dict[str, Any], lineno: int, ctx: int, allow_empty_entities: bool) -> None:
+def record_problems(obj: Dict[str, Any], lineno: int, ctx: int, allow_empty_entities: bool) -> Iterator[Tuple[str, str]]:
+    """레코드의 모든 문제를 (범주, 메시지)로 yield. 엔티티마다 첫 문제만 보고."""
     # content
     if "content" not in obj or not isinstance(obj["content"], str):
-        raise ValueError(f"[라인 {lineno}] 'content'가 없거나 문자열이 아닙니다.")
+        yield "CONTENT", f"[라인 {lineno}] 'content'가 없거나 문자열이 아닙니다."
+        return
     content = obj["content"]
 
     # entities
     ents = obj.get("entities", None)
     if ents is None:
-        raise ValueError(f"[라인 {lineno}] 'entities' 키가 없습니다.")
+        yield "ENTITIES", f"[라인 {lineno}] 'entities' 키가 없습니다."
+        return
     if not isinstance(ents, list):
-        raise ValueError(f"[라인 {lineno}] 'entities'가 리스트가 아닙니다.")
+        yield "ENTITIES", f"[라인 {lineno}] 'entities'가 리스트가 아닙니다."
+        return
 
     if len(ents) == 0 and not allow_empty_entities:
         # 기본은 빈 리스트도 허용하지만, 옵션을 끄지 않았다면 경고/오류로 다룰 수도 있음.
@@ -62,11 +92,13 @@ def validate_record(obj: Dict[str, Any], lineno: int, ctx: int, allow_empty_enti
     # 각 엔티티 검증
     for idx, ent in enumerate(ents):
         if not isinstance(ent, dict):
-            raise ValueError(f"[라인 {lineno}] entities[{idx}]가 객체가 아닙니다.")
+            yield "ENTITY_NOT_OBJECT", f"[라인 {lineno}] entities[{idx}]가 객체가 아닙니다."
+            continue
 
-        for k in ("value", "label", "begin", "end"):
-            if k not in ent:
-                raise ValueError(f"[라인 {lineno}] entities[{idx}]에 '{k}' 키가 없습니다.")
+        missing = [k for k in ("value", "label", "begin", "end") if k not in ent]
+        if missing:
+            yield "MISSING_KEY", f"[라인 {lineno}] entities[{idx}]에 '{missing[0]}' 키가 없습니다."
+            continue
 
         value = ent["value"]
         label = ent["label"]
@@ -74,43 +106,142 @@ def validate_record(obj: Dict[str, Any], lineno: int, ctx: int, allow_empty_enti
         end   = ent["end"]
 
         if not isinstance(value, str):
-            raise ValueError(f"[라인 {lineno}] entities[{idx}].value 타입 오류(문자열 아님)")
+            yield "BAD_TYPE", f"[라인 {lineno}] entities[{idx}].value 타입 오류(문자열 아님)"
+            continue
         if not isinstance(label, str):
-            raise ValueError(f"[라인 {lineno}] entities[{idx}].label 타입 오류(문자열 아님)")
+            yield "BAD_TYPE", f"[라인 {lineno}] entities[{idx}].label 타입 오류(문자열 아님)"
+            continue
         if not isinstance(begin, int) or not isinstance(end, int):
-            raise ValueError(f"[라인 {lineno}] entities[{idx}].begin/end 타입 오류(정수 아님)")
+            yield "BAD_TYPE", f"[라인 {lineno}] entities[{idx}].begin/end 타입 오류(정수 아님)"
+            continue
         if begin >= end:
-            raise ValueError(f"[라인 {lineno}] entities[{idx}] 범위 오류: begin({begin}) >= end({end})")
+            yield "BEGIN_GE_END", f"[라인 {lineno}] entities[{idx}] 범위 오류: begin({begin}) >= end({end})"
+            continue
 
         n = len(content)
         if not (0 <= begin < end <= n):
-            raise ValueError(
-                f"[라인 {lineno}] entities[{idx}] 범위 초과: begin={begin}, end={end}, len(content)={n}"
-            )
+            yield "OUT_OF_RANGE", f"[라인 {lineno}] entities[{idx}] 범위 초과: begin={begin}, end={end}, len(content)={n}"
+            continue
 
         slice_text = content[begin:end]
         if slice_text != value:
             # 불일치 상세 안내
             around = excerpt(content, begin, end, ctx)
-            raise ValueError(
-                (f"[라인 {lineno}] entities[{idx}] 값 불일치\n"
-                 f"  label = {label}\n"
-                 f"  value = {value!r}\n"
-                 f"  slice = {slice_text!r}  (content[{begin}:{end}])\n"
-                 f"  context: …{around}…")
+            yield "VALUE_MISMATCH", (
+                f"[라인 {lineno}] entities[{idx}] 값 불일치\n"
+                f"  label = {label}\n"
+                f"  value = {value!r}\n"
+                f"  slice = {slice_text!r}  (content[{begin}:{end}])\n"
+                f"  context: …{around}…"
             )
 
+def validate_record(obj: Dict[str, Any], lineno: int, ctx: int, allow_empty_entities: bool) -> None:
+    """첫 문제에서 ValueError."""
+    for _, msg in record_problems(obj, lineno, ctx, allow_empty_entities):
+        raise ValueError(msg)
+
+def line_problems(lineno: int, line: str, ctx: int, allow_empty_entities: bool) -> List[Tuple[str, str]]:
+    """원본 줄 1개 → (범주, 메시지) 목록."""
+    try:
+        obj = json.loads(line)
+    except json.JSONDecodeError as e:
+        return [("JSON_PARSE", f"[에러] {lineno}번째 줄 JSON 파싱 실패: {e}")]
+    if not isinstance(obj, dict):
+        return [("NOT_OBJECT", f"[에러] {lineno}번째 줄 최상위 JSON이 객체가 아닙니다.")]
+    return list(record_problems(obj, lineno, ctx, allow_empty_entities))
+
+def check_batch(batch: List[Tuple[int, str]], ctx: int, allow_empty_entities: bool, keep: int):
+    """
+    워커: 줄 배치 검사 → (범주별 건수, 문제 레코드 수, 범주별 보관 목록(최대 keep건, (줄, 메시지))).
+    보관 목록을 배치 안에서 이미 잘라 두므로 부모로 보내는 양도 제한된다.
+    """
+    counts: Dict[str, int] = {}
+    kept: Dict[str, List[Tuple[int, str]]] = {}
+    bad = 0
+    for lineno, line in batch:
+        probs = line_problems(lineno, line, ctx, allow_empty_entities)
+        if probs:
+            bad += 1
+        for cat, msg in probs:
+            counts[cat] = counts.get(cat, 0) + 1
+            lst = kept.setdefault(cat, [])
+            if len(lst) < keep:
+                lst.append((lineno, msg))
+    return counts, bad, kept
+
+def iter_batches(path: str, size: int) -> Iterator[List[Tuple[int, str]]]:
+    batch: List[Tuple[int, str]] = []
+    with open_text_auto(path) as f:
+        for lineno, line in enumerate(f, 1):
+            s = line.strip()
+            if not s:
+                continue
+            batch.append((lineno, s))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def collect_all(args, prof=NULL_PROFILER) -> int:
+    total = 0
+    bad = 0
+    counts: Dict[str, int] = {}
+    kept: Dict[str, List[Tuple[int, str]]] = {}
+    keep = max(args.max_per_category, args.show_first)
+
+    def batches():
+        nonlocal total
+        for b in prof.iter("read", iter_batches(args.input, args.batch_size)):
+            total += len(b)
+            prof.tick(len(b))
+            yield b
+
+    results = imap_ordered(check_batch, batches(), args.workers, None,
+                           args.show_context, args.allow_empty_entities, keep)
+    for c, b, k in prof.iter("validate", results):
+        bad += b
+        for cat, n in c.items():
+            counts[cat] = counts.get(cat, 0) + n
+        for cat, items in k.items():
+            lst = kept.setdefault(cat, [])
+            lst.extend(items[:keep - len(lst)])
+
+    if not counts:
+        sys.stderr.write(f"[검증 성공] 총 {total}건 검사 완료. 모든 begin/end와 value가 content와 일치합니다.\n")
+        return 0
+
+    # 앞쪽 N건 상세 (입력 순서)
+    first = sorted((item for items in kept.values() for item in items), key=lambda t: t[0])[:args.show_first]
+    for _, msg in first:
+        sys.stderr.write(msg + "\n")
+
+    sys.stderr.write(f"\n[검증 실패] 총 {total}건 중 {bad}건 문제, 오류 {sum(counts.values())}개\n")
+    for cat in CATEGORIES:
+        if cat not in counts:
+            continue
+        lines = [ln for ln, _ in kept[cat][:args.max_per_category]]
+        more = " ..." if counts[cat] > len(lines) else ""
+        sys.stderr.write(f"  {cat:<18} {counts[cat]:>8}  라인: {', '.join(map(str, lines))}{more}\n")
+    return 1
+
 def main():
     args = parse_args()
+    prof = profiler_from_args(args, "check_validity")
+    if args.collect_all:
+        with prof:
+            return collect_all(args, prof)
     total = 0
-    with open(args.input, "r", encoding="utf-8") as f:
-        for lineno, line in enumerate(f, 1):
+    with open_text_auto(args.input) as f, prof:
+        for lineno, line in enumerate(prof.iter("read", f), 1):
             s = line.strip()
             if not s:
                 continue
             total += 1
+            prof.tick()
             try:
-                obj = json.loads(s)
+                with prof.stage("parse"):
+                    obj = json.loads(s)
             except json.JSONDecodeError as e:
                 sys.stderr.write(f"[에러] {lineno}번째 줄 JSON 파싱 실패: {e}\n")
                 sys.exit(1)
@@ -120,7 +251,8 @@ def main():
                 sys.exit(1)
 
             try:
-                validate_record(obj, lineno, args.show_context, args.allow_empty_entities)
+                with prof.stage("validate"):
+                    validate_record(obj, lineno, args.show_context, args.allow_empty_entities)
             except ValueError as e:
                 sys.stderr.write(str(e) + "\n")
                 sys.exit(1)
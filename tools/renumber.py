@@ -5,53 +5,305 @@ renumber_jsonl_ids.py
 - JSONL을 위에서부터 읽어 각 객체의 `id`를 1,2,3,... 순으로 재부여
 - 기본은 기존 id를 덮어씀. --preserve-original 사용 시 기존 id를 orig_id로 보존
 - 라인 단위 스트리밍 처리
+- 출력은 .tmp에 쓴 뒤 원자적 교체, --resume으로 중단 지점부터 재개 (verify/job_runner.py)
+
+전역 재번호 (--inputs ... --out-dir): 여러 파일을 주어진 순서대로 이어지는 id로 재부여
+- 1패스: 파일별 행 수(JSON 객체 줄)를 병렬로 세어 파일마다 id 구간 [first, first+rows) 배정
+    빈 줄 판정은 두 패스 / 단일 파일 모드 모두 row_text() (유니코드 공백 / BOM만 있는 줄도 빈 줄)
+    최상위가 객체가 아닌 줄은 단일 파일 모드처럼 경고 후 건너뜀 (1패스에서 미리 세어 id를 배정하지 않음)
+- 2패스: 파일별로 병렬 재번호 → <out-dir>/<파일명> + renumber.manifest.json (다른 도구에 manifest로 입력 가능)
+- --id-map PREFIX: old→new 매핑 테이블
+    PREFIX.csv : new_id,old_id,file,line
+    PREFIX.bin : "RENUMAP1" + uint32 헤더 길이 + 헤더 JSON(파일별 경로/first_id/rows, 정수가 아닌 old id)
+                 + 파일마다 old id(int64 x rows) 다음 원본 줄 번호(uint32 x rows)
+                 new id는 파일 구간에서 계산되므로 저장하지 않음 → 행당 12바이트
+    with IdMap(PREFIX + ".bin") as m: m.lookup(new_id) → (원본 파일, 줄 번호, old id)
+      (헤더만 한 번 읽고 본문은 mmap → 조회마다 8바이트 / 4바이트 슬롯만 읽음)
+
+사용 예:
+  python renumber.py -i dataset.jsonl -o dataset_renum.jsonl
+  python renumber.py --inputs "../dataset6C1/*/*.jsonl" "../dataset6C2/*_final.jsonl" --out-dir renum --start-id 2501 --id-map renum/idmap
 """
 
+import os
 import sys
+import csv
 import json
+import mmap
+import struct
 import argparse
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+# 공용 I/O 모듈(verify/jsonl_io.py) 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "verify"))
+from jsonl_io import (ShardedJsonlWriter, add_shard_args, expand_input, expand_ordered, iter_raw_lines, map_shards,
+                      open_text_auto, row_text, write_manifest)
+from job_runner import add_job_args, job_from_args
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
+MAP_MAGIC = b"RENUMAP1"
+NO_INT_ID = -(1 << 63)      # old id가 없거나 정수가 아님 (원래 값은 헤더 "odd_ids")
 
 def parse_args():
     p = argparse.ArgumentParser(description="Renumber `id` fields sequentially in JSONL.")
-    p.add_argument("-i", "--input", required=True, help="입력 JSONL 경로")
-    p.add_argument("-o", "--output", required=True, help="출력 JSONL 경로")
+    p.add_argument("-i", "--input", help="입력 JSONL 경로 (샤드 manifest JSON 가능)")
+    p.add_argument("-o", "--output", help="출력 JSONL 경로")
     p.add_argument("--preserve-original", action="store_true",
                    help="기존 id를 orig_id로 보존")
-    return p.parse_args()
+    p.add_argument("--start-id", type=int, default=1, help="시작 id (기본 1)")
+    p.add_argument("--inputs", nargs="+", default=None,
+                   help="전역 재번호: 이 순서대로 이어지는 입력들 (glob / manifest 가능)")
+    p.add_argument("--out-dir", default=None, help="전역 재번호 출력 디렉터리")
+    p.add_argument("--id-map", default=None, metavar="PREFIX", help="old→new 매핑 테이블 (PREFIX.bin + PREFIX.csv)")
+    p.add_argument("--workers", type=int, default=None, help="전역 재번호 병렬 워커 수 (기본: CPU 수)")
+    add_shard_args(p)
+    add_job_args(p)
+    add_profile_args(p)
+    args = p.parse_args()
+    if args.inputs:
+        if not args.out_dir:
+            p.error("--inputs requires --out-dir")
+        if args.input or args.output or args.resume:
+            p.error("--inputs cannot be combined with -i/-o/--resume")
+    elif not (args.input and args.output):
+        p.error("either -i/-o or --inputs/--out-dir is required")
+    return args
+
+# ---------------- 전역 재번호 ----------------
+def count_rows(path: str) -> Tuple[int, int]:
+    """
+    1패스: (JSON 객체 줄 수, 객체가 아니라 건너뛸 줄 수).
+    iter_raw_lines가 row_text()와 같은 규칙으로 빈 줄을 거르므로 첫 바이트만 보면 2패스와 같게 판정.
+    """
+    rows = skipped = 0
+    for s in iter_raw_lines(path):
+        if s[0] == 0x7B:    # '{'
+            rows += 1
+        else:
+            skipped += 1
+    return rows, skipped
+
+def output_names(paths: List[str]) -> List[str]:
+    """출력 파일명: 원본 파일명, 겹치면 전부 <순번>_<파일명>."""
+    names = [os.path.basename(p) for p in paths]
+    if len(set(names)) != len(names):
+        width = len(str(len(names)))
+        names = [f"{i:0{width}d}_{n}" for i, n in enumerate(names, 1)]
+    return names
+
+def renumber_file(task: Tuple[str, str, int, int], preserve_original: bool):
+    """워커: (입력, 출력, 첫 id, 예상 행 수) → (샤드 정보, old id bytes, 줄 번호 bytes, 정수 아닌 old id)."""
+    in_path, out_path, first_id, expected = task
+    old_ids = array("q")
+    lines = array("I")
+    odd: Dict[str, Any] = {}
+    new_id = first_id
+    writer = ShardedJsonlWriter(out_path)
+    try:
+        with open_text_auto(in_path) as f:
+            for lineno, line in enumerate(f, 1):
+                s = row_text(line)
+                if not s:
+                    continue
+                try:
+                    obj = json.loads(s)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{in_path}:{lineno}번째 줄 JSON 파싱 실패: {e}")
+                if not isinstance(obj, dict):
+                    # 1패스에서도 건너뛴 줄 (id 구간에 포함되지 않음)
+                    sys.stderr.write(f"[경고] {in_path}:{lineno}번째 줄 최상위 JSON이 객체가 아님: 건너뜀\n")
+                    continue
+                old = obj.get("id")
+                if isinstance(old, int) and not isinstance(old, bool) and NO_INT_ID < old < (1 << 63):
+                    old_ids.append(old)
+                else:
+                    old_ids.append(NO_INT_ID)
+                    odd[str(new_id)] = old
+                lines.append(lineno)
+                if preserve_original and "id" in obj:
+                    obj["orig_id"] = old
+                obj["id"] = new_id
+                writer.write(json.dumps(obj, ensure_ascii=False), new_id)
+                new_id += 1
+        if new_id - first_id != expected:
+            raise ValueError(f"{in_path}: 행 수가 1패스({expected})와 다름({new_id - first_id}) — 파일이 바뀌었나요?")
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.shards[0], old_ids.tobytes(), lines.tobytes(), odd
+
+def write_id_map(prefix: str, files: List[Dict[str, Any]], parts: List[Tuple[bytes, bytes]],
+                 odd: Dict[str, Any]) -> None:
+    header = json.dumps({"files": files, "odd_ids": odd}, ensure_ascii=False).encode("utf-8")
+    tmp = prefix + ".bin.tmp"
+    with open(tmp, "wb") as fb:
+        fb.write(MAP_MAGIC + struct.pack("<I", len(header)) + header)
+        for old_b, line_b in parts:
+            fb.write(old_b)
+            fb.write(line_b)
+    os.replace(tmp, prefix + ".bin")
+
+    tmp = prefix + ".csv.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as fc:
+        w = csv.writer(fc)
+        w.writerow(["new_id", "old_id", "file", "line"])
+        for info, (old_b, line_b) in zip(files, parts):
+            olds, lns = array("q"), array("I")
+            olds.frombytes(old_b)
+            lns.frombytes(line_b)
+            first, src = info["first_id"], info["input"]
+            for k in range(info["rows"]):
+                new = first + k
+                old = olds[k]
+                if old == NO_INT_ID:
+                    v = odd.get(str(new))
+                    old = "" if v is None else (v if isinstance(v, str) else json.dumps(v, ensure_ascii=False))
+                w.writerow([new, old, src, lns[k]])
+    os.replace(tmp, prefix + ".csv")
+
+class IdMap:
+    """
+    PREFIX.bin 조회기: 헤더(JSON)는 한 번만 읽고 본문은 mmap.
+    lookup(new_id)는 해당 파일 구간의 old id(8바이트) / 줄 번호(4바이트) 슬롯만 읽는다.
+    """
+
+    def __init__(self, path: str):
+        self._f = open(path, "rb")
+        head = self._f.read(len(MAP_MAGIC) + 4)
+        if not head.startswith(MAP_MAGIC) or len(head) < len(MAP_MAGIC) + 4:
+            self._f.close()
+            raise ValueError(f"{path}: id map 파일이 아님")
+        (n,) = struct.unpack_from("<I", head, len(MAP_MAGIC))
+        header = json.loads(self._f.read(n).decode("utf-8"))
+        self.files: List[Dict[str, Any]] = header["files"]
+        self.odd_ids: Dict[str, Any] = header["odd_ids"]
+        self._firsts = [f["first_id"] for f in self.files]
+        # 파일별 old id 블록 시작 오프셋 (줄 번호 블록은 그 뒤 rows * 8)
+        self._offsets: List[int] = []
+        off = len(MAP_MAGIC) + 4 + n
+        for f in self.files:
+            self._offsets.append(off)
+            off += f["rows"] * 12
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._f.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, new_id: int) -> Optional[Tuple[str, int, Any]]:
+        """new id → (원본 파일, 원본 줄 번호, old id). 범위 밖이면 None."""
+        i = bisect_right(self._firsts, new_id) - 1
+        if i < 0 or new_id >= self._firsts[i] + self.files[i]["rows"]:
+            return None
+        info, off = self.files[i], self._offsets[i]
+        k = new_id - info["first_id"]
+        (old,) = struct.unpack_from("<q", self._mm, off + k * 8)
+        (line,) = struct.unpack_from("<I", self._mm, off + info["rows"] * 8 + k * 4)
+        if old == NO_INT_ID:
+            old = self.odd_ids.get(str(new_id))
+        return info["input"], line, old
+
+def renumber_global(args, prof=NULL_PROFILER) -> None:
+    inputs = expand_ordered(args.inputs)
+    if not inputs:
+        sys.stderr.write("[에러] 입력 파일이 없습니다\n")
+        sys.exit(1)
+    with prof.stage("read"):
+        counts = map_shards(count_rows, inputs, args.workers)
+    skipped = sum(k for _, k in counts)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    tasks = []
+    files: List[Dict[str, Any]] = []
+    next_id = args.start_id
+    for path, name, (rows, bad) in zip(inputs, output_names(inputs), counts):
+        out = os.path.join(args.out_dir, name)
+        tasks.append((path, out, next_id, rows))
+        files.append({"input": path, "output": out, "first_id": next_id, "rows": rows})
+        note = f" (객체 아닌 줄 {bad}개 건너뜀)" if bad else ""
+        sys.stderr.write(f"[정보] {path}: {rows}건 → id {next_id}~{next_id + rows - 1}{note}\n")
+        next_id += rows
+
+    try:
+        with prof.stage("fix"):
+            results = map_shards(renumber_file, tasks, args.workers, args.preserve_original)
+    except ValueError as e:
+        sys.stderr.write(f"[에러] {e}\n")
+        sys.exit(1)
+    prof.tick(next_id - args.start_id)
+
+    manifest = os.path.join(args.out_dir, "renumber.manifest.json")
+    with prof.stage("write"):
+        write_manifest([info for info, _, _, _ in results], manifest)
+    if args.id_map:
+        odd: Dict[str, Any] = {}
+        for r in results:
+            odd.update(r[3])
+        with prof.stage("write"):
+            write_id_map(args.id_map, files, [(r[1], r[2]) for r in results], odd)
+        sys.stderr.write(f"[정보] id 매핑 → {args.id_map}.bin / {args.id_map}.csv\n")
+    sys.stderr.write(f"[정보] 파일 {len(inputs)}개, 총 {next_id - args.start_id}건, "
+                     f"id {args.start_id}~{next_id - 1}, 건너뜀 {skipped}줄, manifest={manifest}\n")
 
 def main():
     args = parse_args()
-    next_id = 1
-    total, written = 0, 0
+    prof = profiler_from_args(args, "renumber")
+    if args.inputs:
+        with prof:
+            return renumber_global(args, prof)
+
+    stats = {"total": 0, "written": 0}
+    state = {"next_id": args.start_id}
+    try:
+        job = job_from_args(args, expand_input(args.input), args.output, stats, state,
+                            options={"preserve_original": args.preserve_original, "start_id": args.start_id}, tag="renumber")
+        job.open()
+    except ValueError as e:
+        sys.stderr.write(f"[에러] {e}\n")
+        sys.exit(1)
 
-    with open(args.input, "r", encoding="utf-8") as fin, \
-         open(args.output, "w", encoding="utf-8") as fout:
-        for lineno, line in enumerate(fin, 1):
-            s = line.strip()
+    with job, prof:
+        for path, lineno, line in prof.iter("read", job.lines()):
+            s = row_text(line)
             if not s:
                 continue
-            total += 1
+            stats["total"] += 1
+            prof.tick()
             try:
-                obj = json.loads(s)
+                with prof.stage("parse"):
+                    obj = json.loads(s)
             except json.JSONDecodeError as e:
-                sys.stderr.write(f"[에러] {lineno}번째 줄 JSON 파싱 실패: {e}\n")
+                sys.stderr.write(f"[에러] {path}:{lineno}번째 줄 JSON 파싱 실패: {e}\n")
                 sys.exit(1)
 
             if not isinstance(obj, dict):
-                sys.stderr.write(f"[경고] {lineno}번째 줄 최상위 JSON이 객체가 아님: 건너뜀\n")
+                sys.stderr.write(f"[경고] {path}:{lineno}번째 줄 최상위 JSON이 객체가 아님: 건너뜀\n")
                 continue
 
             if args.preserve_original and "id" in obj:
                 obj["orig_id"] = obj["id"]
 
-            obj["id"] = next_id
-            next_id += 1
+            obj["id"] = state["next_id"]
+            state["next_id"] += 1
 
-            fout.write(json.dumps(obj, ensure_ascii=False))
-            fout.write("\n")
-            written += 1
+            with prof.stage("serialize"):
+                out = json.dumps(obj, ensure_ascii=False)
+            with prof.stage("write"):
+                job.write(out, obj["id"])
+            stats["written"] += 1
 
-    sys.stderr.write(f"[정보] 입력 {total}건 처리, 출력 {written}건, 최종 id={next_id-1}\n")
+    sys.stderr.write(f"[정보] 입력 {stats['total']}건 처리, 출력 {stats['written']}건, 최종 id={state['next_id']-1}\n")
 
 if __name__ == "__main__":
     main()
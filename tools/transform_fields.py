@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+transform_fields.py
+- JSONL 스키마 변경용 범용 필드 변환: drop / rename / keep(projection) / set
+- 키 지정:
+    KEY            : 최상위 키 (예: style, writing_style)
+    assistant.KEY  : assistant 메시지 content(JSON 문자열 또는 객체) 안의 키 (예: assistant.has_sensitive)
+- 적용 순서: keep → drop → rename → set (범위별로)
+- 빠른 경로:
+    drop / rename만 있으면 대상 키 이름이 줄 바이트에 없을 때 파싱 없이 원본 줄 그대로 통과
+    orjson이 있으면 loads/dumps에 사용 (없으면 json, 출력은 둘 다 compact + UTF-8 그대로)
+    줄 배치(--batch-size) 단위로 워커(--workers)에서 변환, 결과는 입력 순서대로 한 번에 기록
+- 파싱 실패 줄은 기본적으로 원본 그대로 기록 (--drop-invalid면 제외)
+
+사용 예:
+  # Additional Dataset/remove.py 와 같은 작업
+  python transform_fields.py -i in.jsonl -o out.jsonl --drop writing_style style
+  python transform_fields.py -i dataset_build.jsonl -o out.jsonl --drop writing_style --set source='"synthetic"' --workers 4
+  python transform_fields.py -i raw.jsonl -o out.jsonl --keep id content entities --set source='"synthetic"'
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 공용 I/O 모듈(verify/jsonl_io.py) 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "verify"))
+from jsonl_io import add_shard_args, expand_input, imap_ordered, iter_raw_lines, writer_from_args
+from instrument import add_profile_args, profiler_from_args
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성: 없으면 json 사용
+    orjson = None
+
+SCOPES = ("top", "assistant")
+ASSISTANT_PREFIX = "assistant."
+_ID_RE = re.compile(rb'^\{\s*"id"\s*:\s*(-?\d+)\s*[,}]')
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Drop / rename / project / set fields in JSONL (top level and assistant content).")
+    p.add_argument("-i", "--input", required=True, help="입력 JSONL 경로 (샤드 manifest JSON 가능)")
+    p.add_argument("-o", "--output", required=True, help="출력 JSONL 경로")
+    p.add_argument("--drop", nargs="+", action="extend", default=[], metavar="KEY", help="삭제할 키")
+    p.add_argument("--rename", nargs="+", action="extend", default=[], metavar="OLD=NEW", help="키 이름 변경")
+    p.add_argument("--keep", nargs="+", action="extend", default=[], metavar="KEY",
+                   help="이 키만 남김 (범위별: 최상위 / assistant.)")
+    p.add_argument("--set", nargs="+", action="extend", default=[], metavar="KEY=JSON",
+                   help="키 값 설정 (값은 JSON으로 해석, 실패하면 문자열)")
+    p.add_argument("--drop-invalid", action="store_true", help="JSON 파싱 실패 줄을 출력에서 제외")
+    p.add_argument("--workers", type=int, default=1, help="프로세스 풀 워커 수 (기본: 1 = 현재 프로세스)")
+    p.add_argument("--batch-size", type=int, default=5000, help="워커에 보내는 줄 수 (기본: 5000)")
+    add_shard_args(p)
+    add_profile_args(p)
+    args = p.parse_args()
+    if not (args.drop or args.rename or args.keep or args.set):
+        p.error("at least one of --drop / --rename / --keep / --set is required")
+    return args
+
+# ---------------- 변환 명세 ----------------
+def _scope(key: str) -> Tuple[str, str]:
+    if key.startswith(ASSISTANT_PREFIX):
+        return "assistant", key[len(ASSISTANT_PREFIX):]
+    return "top", key
+
+def _split_pair(item: str, opt: str) -> Tuple[str, str]:
+    if "=" not in item:
+        raise ValueError(f"{opt} 형식 오류 (KEY=VALUE): {item!r}")
+    k, v = item.split("=", 1)
+    if not k:
+        raise ValueError(f"{opt} 키가 비었음: {item!r}")
+    return k, v
+
+def build_spec(drop: List[str], rename: List[str], keep: List[str], set_: List[str]) -> Dict[str, Any]:
+    """
+    CLI 인자 → 범위별 연산 dict (워커로 피클링해 보냄).
+      {"top": {"keep": frozenset|None, "drop": [...], "rename": {...}, "set": {...}}, "assistant": {...},
+       "needles": [bytes, ...] | None}
+    needles: drop/rename만 있을 때 줄 바이트 사전 검사용 키 이름 (None이면 모든 줄 파싱)
+    """
+    spec: Dict[str, Any] = {s: {"keep": None, "drop": [], "rename": {}, "set": {}} for s in SCOPES}
+    for key in keep:
+        scope, k = _scope(key)
+        spec[scope]["keep"] = (spec[scope]["keep"] or frozenset()) | {k}
+    for key in drop:
+        scope, k = _scope(key)
+        spec[scope]["drop"].append(k)
+    for item in rename:
+        old, new = _split_pair(item, "--rename")
+        so, ko = _scope(old)
+        sn, kn = _scope(new) if new.startswith(ASSISTANT_PREFIX) else (so, new)
+        if so != sn:
+            raise ValueError(f"--rename은 같은 범위 안에서만 가능: {item!r}")
+        spec[so]["rename"][ko] = kn
+    for item in set_:
+        key, raw = _split_pair(item, "--set")
+        try:
+            val = json.loads(raw)
+        except ValueError:
+            val = raw
+        scope, k = _scope(key)
+        spec[scope]["set"][k] = val
+
+    names = [k for s in SCOPES for k in spec[s]["drop"] + list(spec[s]["rename"])]
+    prefilter = not keep and not set_ and all(n.isascii() for n in names)
+    spec["needles"] = [n.encode("ascii") for n in names] if prefilter else None
+    return spec
+
+def apply_ops(obj: Dict[str, Any], ops: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """dict 하나에 keep → drop → rename → set 적용. (결과 dict, 변경 여부). 키 순서는 유지."""
+    changed = False
+    keep = ops["keep"]
+    if keep is not None and any(k not in keep for k in obj):
+        obj = {k: v for k, v in obj.items() if k in keep}
+        changed = True
+    for k in ops["drop"]:
+        if k in obj:
+            del obj[k]
+            changed = True
+    ren = ops["rename"]
+    if ren and any(k in obj for k in ren):
+        obj = {ren.get(k, k): v for k, v in obj.items()}
+        changed = True
+    for k, v in ops["set"].items():
+        if k not in obj or obj[k] != v:
+            obj[k] = v
+            changed = True
+    return obj, changed
+
+def _has_ops(ops: Dict[str, Any]) -> bool:
+    return bool(ops["keep"] is not None or ops["drop"] or ops["rename"] or ops["set"])
+
+# ---------------- 코덱 ----------------
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass    # orjson이 거부하는 입력(고립 서로게이트 등)은 json으로 재시도
+    return json.loads(data)
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:   # 64비트 초과 정수 등
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _assistant_message(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    msgs = row.get("messages")
+    if not isinstance(msgs, list):
+        return None
+    for m in reversed(msgs):
+        if isinstance(m, dict) and m.get("role") == "assistant":
+            return m
+    return None
+
+def transform_line(line: bytes, spec: Dict[str, Any]) -> Tuple[bytes, Any, str]:
+    """
+    줄 1개 변환 → (출력 바이트, id, 상태)
+    상태: "changed" / "unchanged" / "passthrough"(파싱 생략) / "invalid"
+    """
+    needles = spec["needles"]
+    if needles is not None and not any(n in line for n in needles):
+        m = _ID_RE.match(line)
+        return line, int(m.group(1)) if m else None, "passthrough"
+    try:
+        row = loads(line)
+    except ValueError:
+        return line, None, "invalid"
+    if not isinstance(row, dict):
+        return line, None, "invalid"
+
+    changed = False
+    ops = spec["assistant"]
+    if _has_ops(ops):
+        msg = _assistant_message(row)
+        content = msg.get("content") if msg is not None else None
+        inner = content
+        if isinstance(content, str):
+            try:
+                inner = loads(content)
+            except ValueError:
+                return line, row.get("id"), "invalid"
+        if isinstance(inner, dict):
+            inner, changed = apply_ops(inner, ops)
+            if changed:
+                msg["content"] = dumps(inner).decode("utf-8") if isinstance(content, str) else inner
+    row, top_changed = apply_ops(row, spec["top"])
+    changed = changed or top_changed
+    rid = row.get("id")
+    if not changed:
+        return line, rid, "unchanged"
+    return dumps(row), rid, "changed"
+
+def transform_chunk(chunk: List[bytes], spec: Dict[str, Any], drop_invalid: bool):
+    """워커: 줄 배치 → (출력 줄 목록, id 목록, 상태별 건수)."""
+    out: List[bytes] = []
+    ids: List[Any] = []
+    counts: Dict[str, int] = {}
+    for line in chunk:
+        data, rid, status = transform_line(line, spec)
+        counts[status] = counts.get(status, 0) + 1
+        if status == "invalid" and drop_invalid:
+            continue
+        out.append(data)
+        ids.append(rid)
+    return out, ids, counts
+
+# ---------------- 입력 ----------------
+def iter_chunks(paths: List[str], size: int) -> Iterator[List[bytes]]:
+    chunk: List[bytes] = []
+    for path in paths:
+        for s in iter_raw_lines(path):
+            chunk.append(s)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def main():
+    args = parse_args()
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    try:
+        spec = build_spec(args.drop, args.rename, args.keep, args.set)
+    except ValueError as e:
+        sys.stderr.write(f"[에러] {e}\n")
+        return 2
+
+    inputs = expand_input(args.input)
+    counts: Dict[str, int] = {}
+    prof = profiler_from_args(args, "transform")
+    writer = writer_from_args(args.output, args)
+    try:
+        with prof:
+            results = imap_ordered(transform_chunk, iter_chunks(inputs, args.batch_size), args.workers, None,
+                                   spec, args.drop_invalid)
+            for out, ids, c in prof.iter("fix", results):
+                with prof.stage("write"):
+                    writer.write_lines(out, ids)
+                for k, n in c.items():
+                    counts[k] = counts.get(k, 0) + n
+                prof.tick(sum(c.values()))
+            prof.extra["counts"] = counts
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    total = sum(counts.values())
+    sys.stderr.write(
+        f"[transform] rows={total} changed={counts.get('changed', 0)} unchanged={counts.get('unchanged', 0)} "
+        f"passthrough={counts.get('passthrough', 0)} invalid={counts.get('invalid', 0)}"
+        f"{' (dropped)' if args.drop_invalid and counts.get('invalid') else ''} → {args.output}\n"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,32 +10,20 @@ import unicodedata
 import re
 from typing import List, Dict, Any, Tuple, Optional
 
+from jsonl_io import ShardedJsonlWriter, add_shard_args, expand_input, robust_read_lines, open_text_write, compression_of
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
 # ----------------------------- Control chars ------------------------------
 # 제로폭/제어문자 제거(검증기와 동일하게 맞춤)
 CTRL_RE = re.compile(r"[\u0000-\u001F\u007F\u200B\u200C\u200D\u200E\u200F]")
 NBSP = "\u00A0"
 
 # ----------------------------- IO helpers --------------------------------
-def robust_read_lines(path: str) -> List[str]:
-    """UTF-8/UTF-8-SIG/UTF-16/CP949 대응 + CRLF 정리."""
-    with open(path, "rb") as fb:
-        data = fb.read()
-    if data.startswith(b"\xef\xbb\xbf"):
-        text = data.decode("utf-8-sig")
-    elif data.startswith(b"\xff\xfe") or data.startswith(b"\xfe\xff"):
-        text = data.decode("utf-16")
-    else:
-        try:
-            text = data.decode("utf-8")
-        except UnicodeDecodeError:
-            text = data.decode("cp949", errors="replace")
-    return [ln.rstrip("\r\n") for ln in text.splitlines()]
-
 def write_jsonl_safely(records_iter, out_path: str) -> int:
     """임시파일에 쓴 뒤 원자적 교체."""
     tmp = out_path + ".tmp"
     count = 0
-    with open(tmp, "w", encoding="utf-8", newline="\n") as fw:
+    with open_text_write(tmp, compression_of(out_path, sniff=False)) as fw:
         for rec in records_iter:
             fw.write(rec + "\n")
             count += 1
@@ -256,10 +244,15 @@ def process(
     nfkc: bool,
     overlap_mode: str,
     assistant_as_string: bool,
-    max_window: int
+    max_window: int,
+    shard_rows: Optional[int] = None,
+    shard_bytes: Optional[int] = None,
+    manifest_path: Optional[str] = None,
+    prof=NULL_PROFILER
 ) -> Tuple[int, int]:
-    """입력→자동 수정→출력. (read count, write count) 반환."""
-    lines = robust_read_lines(input_path)
+    """입력(JSONL 또는 샤드 manifest)→자동 수정→출력. (read count, write count) 반환."""
+    with prof.stage("read"):
+        lines = [ln for p in expand_input(input_path) for ln in robust_read_lines(p)]
     in_total = 0
     out_lines: List[str] = []
     notes_stats: Dict[str, int] = {}
@@ -269,26 +262,37 @@ def process(
         if not s:
             continue
         try:
-            row = json.loads(s)
+            with prof.stage("parse"):
+                row = json.loads(s)
         except Exception as e:
             print(f"[L{ln}] JSON parse error: {e}", file=sys.stderr)
             continue
 
         in_total += 1
-        fixed_row, notes = fix_record(
-            row,
-            nfkc=nfkc,
-            overlap_mode=overlap_mode,
-            prefer_string_assistant=assistant_as_string,
-            max_window=max_window
-        )
+        with prof.stage("fix"):
+            fixed_row, notes = fix_record(
+                row,
+                nfkc=nfkc,
+                overlap_mode=overlap_mode,
+                prefer_string_assistant=assistant_as_string,
+                max_window=max_window
+            )
         if notes:
             for n in notes:
                 notes_stats[n] = notes_stats.get(n, 0) + 1
 
-        out_lines.append(json.dumps(fixed_row, ensure_ascii=False, separators=(",", ":")))
+        with prof.stage("serialize"):
+            out_lines.append(json.dumps(fixed_row, ensure_ascii=False, separators=(",", ":")))
+        prof.tick()
 
-    wrote = write_jsonl_safely(iter(out_lines), out_path)
+    with prof.stage("write"):
+        if shard_rows or shard_bytes or manifest_path:
+            with ShardedJsonlWriter(out_path, shard_rows, shard_bytes, manifest_path) as w:
+                for rec in out_lines:
+                    w.write(rec)
+            wrote = w.total_rows
+        else:
+            wrote = write_jsonl_safely(iter(out_lines), out_path)
 
     # stderr에 요약 노트
     if notes_stats:
@@ -301,15 +305,19 @@ def process(
 
 def main():
     ap = argparse.ArgumentParser(description="Auto-fix dataset JSONL (control chars / offsets / overlaps)")
-    ap.add_argument("--input", required=True, help="입력 JSONL (messages 구조)")
+    ap.add_argument("--input", required=True, help="입력 JSONL (messages 구조) 또는 샤드 manifest JSON")
     ap.add_argument("--out", required=True, help="출력 JSONL")
     ap.add_argument("--nfkc", action="store_true", help="NFKC 정규화 사용(기본 NFC)")
     ap.add_argument("--overlap-mode", choices=["trim", "drop"], default="trim", help="엔티티 겹침 처리 방식")
     ap.add_argument("--assistant-as-string", action="store_true", help="assistant.content를 JSON 문자열로 저장")
     ap.add_argument("--max-window", type=int, default=200, help="근접 탐색 윈도 크기")
+    add_shard_args(ap)
+    add_profile_args(ap)
     args = ap.parse_args()
 
+    prof = profiler_from_args(args, "afterautofix")
     try:
+        prof.start()
         read_n, write_n = process(
             args.input,
             args.out,
@@ -317,7 +325,12 @@ def main():
             overlap_mode=args.overlap_mode,
             assistant_as_string=args.assistant_as_string,
             max_window=args.max_window,
+            shard_rows=args.shard_rows,
+            shard_bytes=args.shard_bytes,
+            manifest_path=args.manifest,
+            prof=prof,
         )
+        prof.close()
     except Exception as e:
         print(f"[FATAL] {type(e).__name__}: {e}", file=sys.stderr)
         raise
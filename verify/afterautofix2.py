@@ -1,6 +1,9 @@
 # fix_trim_spaces.py
 # -*- coding: utf-8 -*-
-import json, sys
+import json, argparse
+
+from jsonl_io import ShardedJsonlWriter, add_shard_args, expand_input, open_text_auto
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
 
 def fix_line(obj):
     msgs = obj.get("messages")
@@ -55,28 +58,41 @@ def fix_line(obj):
         obj["messages"] = msgs
     return obj
 
-def main(in_path, out_path):
+def main(in_path, out_path, shard_rows=None, shard_bytes=None, manifest_path=None, prof=NULL_PROFILER):
     n_in = n_out = 0
-    with open(in_path, encoding="utf-8") as fr, open(out_path, "w", encoding="utf-8", newline="\n") as fw:
-        for line in fr:
-            s = line.strip()
-            if not s:
-                continue
-            n_in += 1
-            try:
-                obj = json.loads(s)
-            except Exception:
-                # 그대로 통과(필요시 건너뛰기)
-                fw.write(line if line.endswith("\n") else line + "\n")
-                n_out += 1
-                continue
-            fixed = fix_line(obj)
-            fw.write(json.dumps(fixed, ensure_ascii=False, separators=(",", ":")) + "\n")
-            n_out += 1
-    print(f"[OK] read={n_in}, wrote={n_out}, out={out_path}")
+    with prof, ShardedJsonlWriter(out_path, shard_rows, shard_bytes, manifest_path) as fw:
+        for path in expand_input(in_path):
+            with open_text_auto(path) as fr:
+                for line in prof.iter("read", fr):
+                    s = line.strip()
+                    if not s:
+                        continue
+                    n_in += 1
+                    prof.tick()
+                    try:
+                        with prof.stage("parse"):
+                            obj = json.loads(s)
+                    except Exception:
+                        # 그대로 통과(필요시 건너뛰기)
+                        with prof.stage("write"):
+                            fw.write(line.rstrip("\n"))
+                        n_out += 1
+                        continue
+                    with prof.stage("fix"):
+                        fixed = fix_line(obj)
+                    with prof.stage("serialize"):
+                        out = json.dumps(fixed, ensure_ascii=False, separators=(",", ":"))
+                    with prof.stage("write"):
+                        fw.write(out, fixed.get("id"))
+                    n_out += 1
+    print(f"[OK] read={n_in}, wrote={n_out}, out={manifest_path or out_path}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python fix_trim_spaces.py <in.jsonl> <out.jsonl>")
-        sys.exit(1)
-    main(sys.argv[1], sys.argv[2])
+    ap = argparse.ArgumentParser(description="Trim leading/trailing spaces inside entity spans")
+    ap.add_argument("input", help="입력 JSONL 또는 샤드 manifest JSON")
+    ap.add_argument("output", help="출력 JSONL")
+    add_shard_args(ap)
+    add_profile_args(ap)
+    args = ap.parse_args()
+    main(args.input, args.output, args.shard_rows, args.shard_bytes, args.manifest,
+         profiler_from_args(args, "afterautofix2"))
@@ -1,6 +1,7 @@
 # autofix_offsets.py
 # -*- coding: utf-8 -*-
 
+import os
 import json
 import sys
 import argparse
@@ -8,6 +9,11 @@ import unicodedata
 import io
 from typing import Dict, Tuple, Optional, List
 
+from jsonl_io import (add_shard_args, ShardedJsonlWriter, is_manifest, open_text_auto,
+                      manifest_shards, map_shards, shard_path, default_manifest_path, write_manifest, shard_info)
+from job_runner import add_job_args, job_from_args
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
 # --- Windows stderr UTF-8 safeguard (stdout은 파일로만 씀) ---
 try:
     sys.stderr.reconfigure(encoding='utf-8')
@@ -267,23 +273,6 @@ def sanitize_entities(ans: dict, drop_unknown: bool, label_map: Dict[str,str],
         ans["has_sensitive"] = hs
         stats["fixed_has_sensitive"] += 1
 
-def open_text_auto(path: str):
-    """BOM 감지로 텍스트 모드 오픈(스트리밍). 실패 시 CP949 폴백."""
-    with open(path, "rb") as fb:
-        head = fb.read(4)
-    if head.startswith(b'\xef\xbb\xbf'):
-        enc = 'utf-8-sig'
-    elif head.startswith(b'\xff\xfe'):
-        enc = 'utf-16'      # LE
-    elif head.startswith(b'\xfe\xff'):
-        enc = 'utf-16-be'   # BE
-    else:
-        enc = 'utf-8'
-    try:
-        return open(path, "r", encoding=enc, newline=None)
-    except UnicodeError:
-        return open(path, "r", encoding="cp949", errors="replace", newline=None)
-
 def process_row(row: dict, args, stats: dict) -> dict:
     msgs = row.get("messages")
     if not isinstance(msgs, list) or len(msgs) != 3:
@@ -310,16 +299,72 @@ def process_row(row: dict, args, stats: dict) -> dict:
     msgs[2]["content"] = json.dumps(ans, ensure_ascii=False)
     return row
 
+def new_stats() -> dict:
+    return {
+        "lines": 0,
+        "fixed_offsets": 0,
+        "unmatched_offsets": 0,
+        "dropped_label": 0,
+        "unknown_label": 0,
+        "dedup": 0,
+        "fixed_has_sensitive": 0,
+    }
+
+def fix_line(line: str, write, args, stats: dict, prof=NULL_PROFILER) -> None:
+    """입력 라인 1개를 보정해 write(line, rec_id)로 기록."""
+    raw = line.rstrip("\n")
+    if not raw.strip():
+        write(raw)
+        return
+    stats["lines"] += 1
+    try:
+        with prof.stage("parse"):
+            row = json.loads(raw)
+    except Exception:
+        # JSON 깨진 줄은 그대로 통과
+        write(raw)
+        return
+
+    with prof.stage("fix"):
+        row2 = process_row(row, args, stats)
+    with prof.stage("serialize"):
+        out = json.dumps(row2, ensure_ascii=False)
+    with prof.stage("write"):
+        write(out, row2.get("id") if isinstance(row2, dict) else None)
+
+def fix_file(in_path: str, writer: ShardedJsonlWriter, args, stats: dict) -> None:
+    """입력 파일 1개를 보정해 writer로 기록."""
+    with open_text_auto(in_path) as fin:
+        for line in fin:
+            fix_line(line, writer.write, args, stats)
+
+def fix_shard(item: Tuple[str, str], args) -> Tuple[dict, dict]:
+    """manifest 팬아웃용 워커: (입력 샤드, 출력 샤드) → (stats, 출력 샤드 정보)."""
+    in_path, out_path = item
+    stats = new_stats()
+    if getattr(args, "resume", False) and os.path.exists(out_path):
+        # 샤드는 원자적으로 기록되므로 존재하면 완료된 것 → 다시 처리하지 않음
+        stats["skipped_shards"] = 1
+        return stats, shard_info(out_path)
+    writer = ShardedJsonlWriter(out_path)
+    fix_file(in_path, writer, args, stats)
+    writer.close()
+    return stats, writer.shards[0]
+
 def main():
     ap = argparse.ArgumentParser(
         description="Fix entity offsets and optionally map/drop labels; output is always UTF-8."
     )
-    ap.add_argument("input", help="입력 JSONL (messages: system,user,assistant)")
-    ap.add_argument("output", help="출력 JSONL (항상 UTF-8 저장)")
+    ap.add_argument("input", help="입력 JSONL (messages: system,user,assistant) 또는 샤드 manifest JSON")
+    ap.add_argument("output", help="출력 JSONL (항상 UTF-8 저장). 입력이 manifest면 샤드별 <output>-00000.jsonl ... + manifest")
     ap.add_argument("--nfkc", action="store_true", help="정규화 비교 시 NFKC 사용(기본 NFC)")
     ap.add_argument("--casefold", action="store_true", help="대소문자 무시(casefold) 비교 사용")
     ap.add_argument("--label-map", type=str, default=None, help="라벨 매핑 JSON 파일 경로")
     ap.add_argument("--drop-unknown-labels", action="store_true", help="허용 라벨로 매핑되지 않으면 엔티티 삭제")
+    ap.add_argument("--workers", type=int, default=None, help="manifest 입력 시 샤드 병렬 워커 수 (기본: CPU 수)")
+    add_shard_args(ap)
+    add_job_args(ap)
+    add_profile_args(ap)
     args = ap.parse_args()
 
     # 라벨 매핑 로드
@@ -335,33 +380,42 @@ def main():
             sys.stderr.write(f"[autofix] label-map load failed: {e}\n")
             args._label_map = None
 
-    stats = {
-        "lines": 0,
-        "fixed_offsets": 0,
-        "unmatched_offsets": 0,
-        "dropped_label": 0,
-        "unknown_label": 0,
-        "dedup": 0,
-        "fixed_has_sensitive": 0,
-    }
-
-    with open_text_auto(args.input) as fin, open(args.output, "w", encoding="utf-8", newline="\n") as fout:
-        for line in fin:
-            raw = line.rstrip("\n")
-            if not raw.strip():
-                fout.write(raw + "\n")
-                continue
-            stats["lines"] += 1
-            try:
-                row = json.loads(raw)
-            except Exception:
-                # JSON 깨진 줄은 그대로 통과
-                fout.write(raw + "\n")
-                continue
-
-            row2 = process_row(row, args, stats)
-            fout.write(json.dumps(row2, ensure_ascii=False) + "\n")
-
+    stats = new_stats()
+    prof = profiler_from_args(args, "autofix")
+    prof.start()
+
+    if is_manifest(args.input):
+        # 샤드당 워커 1개 → 출력도 같은 샤드 구성으로 기록
+        shards = manifest_shards(args.input)
+        items = [(p, shard_path(args.output, i)) for i, p in enumerate(shards)]
+        with prof.stage("fix"):
+            results = map_shards(fix_shard, items, args.workers, args)
+        skipped = 0
+        for st, _ in results:
+            skipped += st.pop("skipped_shards", 0)
+            for k in stats:
+                stats[k] += st[k]
+        manifest_out = args.manifest or default_manifest_path(args.output)
+        write_manifest([info for _, info in results], manifest_out)
+        sys.stderr.write(f"[autofix] shards={len(shards)} resumed_skip={skipped} manifest={manifest_out}\n")
+    else:
+        # 단일 입력: .tmp 원자적 기록 + 체크포인트 (--resume으로 재개)
+        options = {k: getattr(args, k) for k in ("nfkc", "casefold", "drop_unknown_labels")}
+        options["label_map"] = args._label_map
+        try:
+            job = job_from_args(args, [args.input], args.output, stats, options=options, tag="autofix")
+            job.open()
+        except ValueError as e:
+            sys.stderr.write(f"[autofix] {e}\n")
+            sys.exit(1)
+        with job:
+            for _, _, line in prof.iter("read", job.lines()):
+                fix_line(line, job.write, args, stats, prof)
+                prof.tick()
+
+    prof.rows = prof.rows or stats["lines"]
+    prof.extra["stats"] = stats
+    prof.close()
     sys.stderr.write(
         "[autofix] lines={lines} fixed_offsets={fixed_offsets} unmatched_offsets={unmatched_offsets} "
         "dropped_label={dropped_label} unknown_label={unknown_label} dedup={dedup} "
@@ -0,0 +1,194 @@
+# batch_validate.py
+# -*- coding: utf-8 -*-
+"""
+여러 행의 엔티티 스팬을 한 번에 검사하는 컬럼형 배치 검증기 (check_dataset.py --batch).
+
+- 배치의 엔티티를 배열로 펼침: 행 번호 / 엔티티 번호 / begin / end / 본문 길이 / 라벨 id
+- 범위, begin 정렬, (label,begin,end) 중복, 스팬 겹침은 NumPy 벡터 연산으로 한 번에 판정
+- 문자열 수준 검사(slice 일치, 앞뒤 공백, 제어문자, 본문 NFC)만 엔티티/행마다 파이썬으로 수행
+- 결과는 offset_problems()와 같은 (코드, 메시지, 엔티티 인덱스, 라벨) 목록이고 순서도 같다
+  → check_dataset.py 출력이 배치 여부와 무관하게 동일
+- NumPy가 없으면 행마다 offset_problems()를 호출하는 순수 파이썬 경로로 동작
+
+사용 예:
+  python check_dataset.py ../dataset_full_build_56000.jsonl --batch 8192 --report diag.jsonl --summary -
+"""
+
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 선택 의존성: 없으면 행 단위 검사로 폴백
+    np = None
+
+from check_dataset import ALLOWED, CTRL_RE, normalize_text, offset_problems
+
+# 배열에 넣기 전 begin/end 클램프 (int64 범위 밖 값도 범위 오류로만 판정되면 충분)
+_CLAMP = 1 << 62
+
+# 엔티티 단위 검사 순서 (offset_problems()의 검사 순서와 동일해야 함)
+_ORDER = {
+    "ENTITY_KEYS": 0, "ENTITY_TYPES": 1, "SPAN_OUT_OF_RANGE": 2, "SLICE_MISMATCH": 3,
+    "LABEL_NOT_ALLOWED": 4, "VALUE_WHITESPACE": 5, "CONTROL_CHARS": 6, "UNSORTED": 7, "DUPLICATE": 8,
+}
+
+Problem = Tuple[str, str, Optional[int], Optional[str]]
+
+def has_numpy() -> bool:
+    return np is not None
+
+def validate_batch(jobs: Sequence[Tuple[str, List[Any]]], *, use_nfkc=False, allow_overlap=False,
+                   strict_entity_keys=False, warn_sort=True) -> List[List[Problem]]:
+    """[(text, entities), ...] → 행별 문제 목록 (offset_problems()와 같은 형식/순서)."""
+    kw = dict(use_nfkc=use_nfkc, allow_overlap=allow_overlap,
+              strict_entity_keys=strict_entity_keys, warn_sort=warn_sort)
+    if np is None:
+        return [offset_problems(text, ents, **kw) for text, ents in jobs]
+
+    # (행, 단계, 엔티티, 검사 순서) 기준으로 정렬해 offset_problems()와 같은 순서로 맞춘다
+    found: List[Tuple[int, int, int, int, Problem]] = []
+
+    def add(j, phase, i, code, msg, lab):
+        found.append((j, phase, -1 if i is None else i, _ORDER.get(code, 0), (code, msg, i, lab)))
+
+    # ---- 1) 펼치기 + 키/타입 검사 (엔티티별 파이썬) ----
+    rows: List[int] = []
+    idxs: List[int] = []
+    begins: List[int] = []
+    ends: List[int] = []
+    labs: List[int] = []
+    refs: List[Tuple[Any, Any, str, str]] = []    # 원본 (begin, end, value, label)
+    label_ids: Dict[str, int] = {}
+    tlens: List[int] = []
+    fallback: Dict[int, List[Problem]] = {}
+    req = {"value", "begin", "end", "label"}
+
+    for j, (text, ents) in enumerate(jobs):
+        tlens.append(len(text))
+        mark = len(rows)
+        for i, e in enumerate(ents):
+            if not isinstance(e, dict):
+                # 비정형 엔티티가 있는 행은 기존 경로 그대로 (오류 동작 포함), 펼친 항목은 되돌림
+                fallback[j] = offset_problems(text, ents, **kw)
+                for col in (rows, idxs, begins, ends, labs, refs):
+                    del col[mark:]
+                break
+            val, b, en, lab = e.get("value"), e.get("begin"), e.get("end"), e.get("label")
+            if (len(e) != 4 if strict_entity_keys else len(e) < 4) or not req <= e.keys():
+                lab_hint = lab if isinstance(lab, str) else None
+                if strict_entity_keys:
+                    keys = set(e.keys())
+                    missing, extra = req - keys, keys - req
+                    if missing:
+                        add(j, 0, i, "ENTITY_KEYS", f"entity[{i}] missing keys {sorted(missing)}", lab_hint)
+                    if extra:
+                        add(j, 0, i, "ENTITY_KEYS", f"entity[{i}] unexpected keys {sorted(extra)}", lab_hint)
+                else:
+                    for k in ("value", "begin", "end", "label"):
+                        if k not in e:
+                            add(j, 0, i, "ENTITY_KEYS", f"entity[{i}] missing key {k}", lab_hint)
+            if not isinstance(b, int) or not isinstance(en, int) or not isinstance(val, str) or not isinstance(lab, str):
+                lab_hint = lab if isinstance(lab, str) else None
+                add(j, 0, i, "ENTITY_TYPES", f"entity[{i}] bad types (begin/end/value/label)", lab_hint)
+                continue
+            rows.append(j)
+            idxs.append(i)
+            begins.append(b if -_CLAMP <= b <= _CLAMP else -_CLAMP if b < 0 else _CLAMP)
+            ends.append(en if -_CLAMP <= en <= _CLAMP else -_CLAMP if en < 0 else _CLAMP)
+            labs.append(label_ids.setdefault(lab, len(label_ids)))
+            refs.append((b, en, val, lab))
+
+    if rows:
+        R = np.asarray(rows, dtype=np.int64)
+        I = np.asarray(idxs, dtype=np.int64)
+        B = np.asarray(begins, dtype=np.int64)
+        E = np.asarray(ends, dtype=np.int64)
+        L = np.asarray(labs, dtype=np.int64)
+        T = np.asarray(tlens, dtype=np.int64)[R]
+
+        # ---- 2) 범위 (벡터) ----
+        in_range = (B >= 0) & (B < E) & (E <= T)
+        for k in np.flatnonzero(~in_range).tolist():
+            b, en, _, lab = refs[k]
+            add(rows[k], 0, idxs[k], "SPAN_OUT_OF_RANGE",
+                f"entity[{idxs[k]}] span out of range: [{b},{en}) vs len={tlens[rows[k]]}", lab)
+
+        sel = np.flatnonzero(in_range)
+        Rs, Is, Bs, Es, Ls = R[sel], I[sel], B[sel], E[sel], L[sel]
+
+        # ---- 3) 허용 라벨 (라벨 id 조회, 벡터) ----
+        allowed = np.zeros(len(label_ids), dtype=bool)
+        for name, lid in label_ids.items():
+            allowed[lid] = name in ALLOWED
+        bad_label = ~allowed[Ls] if len(label_ids) else np.zeros(0, dtype=bool)
+
+        for k in np.flatnonzero(bad_label).tolist():
+            g = sel[k]
+            lab = refs[g][3]
+            add(rows[g], 0, idxs[g], "LABEL_NOT_ALLOWED", f"entity[{idxs[g]}] label not allowed: {lab}", lab)
+
+        # ---- 4) 문자열 검사 (엔티티별 파이썬) ----
+        ctrl = CTRL_RE.search
+        for k in sel.tolist():
+            b, en, val, lab = refs[k]
+            raw_slice = jobs[rows[k]][0][b:en]
+            if raw_slice == val:
+                # 원문 그대로 일치하면 정규화 비교/제어문자 검사를 한 번으로 줄인다
+                if val == val.strip() and not ctrl(val):
+                    continue
+                slice_ok, has_ctrl = True, ctrl(val)
+            else:
+                slice_ok = normalize_text(raw_slice, use_nfkc) == normalize_text(val, use_nfkc)
+                has_ctrl = ctrl(val) or ctrl(raw_slice)
+            j, i = rows[k], idxs[k]
+            if not slice_ok:
+                add(j, 0, i, "SLICE_MISMATCH", f"entity[{i}] slice mismatch: text[{b}:{en}] != value", lab)
+            if val != val.strip():
+                add(j, 0, i, "VALUE_WHITESPACE", f"entity[{i}] value has leading/trailing spaces", lab)
+            if has_ctrl:
+                add(j, 0, i, "CONTROL_CHARS", f"entity[{i}] value contains control chars", lab)
+
+        if len(sel) > 1:
+            same_row = Rs[1:] == Rs[:-1]
+
+            # ---- 5) begin 정렬 (입력 순서 인접 비교, 벡터) ----
+            if warn_sort:
+                for k in (np.flatnonzero(same_row & (Bs[1:] < Bs[:-1])) + 1).tolist():
+                    g = sel[k]
+                    add(rows[g], 0, idxs[g], "UNSORTED", "entities not sorted by begin offset", refs[g][3])
+
+            # ---- 6) (label,begin,end) 중복: 정렬 후 인접 동일 키 (벡터) ----
+            o = np.lexsort((Is, Es, Bs, Ls, Rs))
+            r, l, b, e = Rs[o], Ls[o], Bs[o], Es[o]
+            dup = (r[1:] == r[:-1]) & (l[1:] == l[:-1]) & (b[1:] == b[:-1]) & (e[1:] == e[:-1])
+            for k in (np.flatnonzero(dup) + 1).tolist():
+                g = sel[o[k]]
+                ob, oe, _, lab = refs[g]
+                add(rows[g], 0, idxs[g], "DUPLICATE", f"duplicate entity (label,begin,end)={(lab, ob, oe)}", lab)
+
+            # ---- 7) 겹침: (begin,end) 정렬 후 행별 첫 겹침만 (벡터) ----
+            if not allow_overlap:
+                o = np.lexsort((Is, Es, Bs, Rs))
+                r, b, e = Rs[o], Bs[o], Es[o]
+                hit = np.flatnonzero((r[1:] == r[:-1]) & (b[1:] < e[:-1]))
+                if len(hit):
+                    _, first = np.unique(r[hit], return_index=True)
+                    for k in hit[first].tolist():
+                        g1, g2 = sel[o[k]], sel[o[k + 1]]
+                        b1, e1 = refs[g1][:2]
+                        b2, e2, _, lab2 = refs[g2]
+                        add(rows[g2], 1, idxs[g2], "OVERLAP", f"overlapping spans: [{b1},{e1}) & [{b2},{e2})", lab2)
+
+    # ---- 8) 본문 NFC (행별 파이썬) ----
+    for j, (text, _) in enumerate(jobs):
+        if not unicodedata.is_normalized("NFC", text) and j not in fallback:
+            add(j, 2, None, "TEXT_NOT_NFC", "WARNING: text not NFC-normalized (may cause offset drift)", None)
+
+    out: List[List[Problem]] = [[] for _ in jobs]
+    found.sort(key=lambda t: t[:4])
+    for j, _, _, _, p in found:
+        out[j].append(p)
+    for j, probs in fallback.items():
+        out[j] = probs
+    return out
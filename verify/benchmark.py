@@ -0,0 +1,291 @@
+# benchmark.py
+# -*- coding: utf-8 -*-
+"""
+데이터셋 도구 벤치마크 (합성 코퍼스 + 핵심 함수 / 전체 CLI 시간, rows/s, 최대 RSS).
+
+- 합성 코퍼스: generate_synthetic의 행 생성기(make_row / draw_combo)로 raw(content) 행을 만들고
+  결함만 위에 주입한 뒤 build(messages) JSONL도 함께 기록, --rows 크기별로 생성
+    --max-per-category / --filler-rate : generate_synthetic과 같은 의미
+    --broken-rate : begin/end를 일부러 어긋나게 할 엔티티 비율
+    --nfd-rate    : 엔티티 밖 본문을 NFD(비 NFC)로 분해할 행 비율 (오프셋은 다시 계산)
+  같은 파라미터면 --workdir에 캐시된 코퍼스를 재사용
+- 대상: check_dataset / autofix_offsets / afterautofix1 / begin_end_fix / count_entities / build_dataset_jsonl
+    core : 핵심 함수만 프로세스 안에서 실행 (벤치마크마다 새 프로세스 → RSS 분리)
+    cli  : 실제 CLI를 subprocess로 실행 (os.wait4의 자식 rusage로 최대 RSS)
+           종료코드가 기대값이 아니면 error로 기록하고 rows/s는 비움 (check_dataset은 결함 코퍼스에서 1이 정상)
+- 결과 JSON (--out): git 커밋, 파라미터, 항목별 seconds / rows_per_s / peak_rss_mb
+  --compare 이전결과.json 으로 rows/s 변화율 출력 → 커밋 간 회귀 확인
+
+사용 예:
+  python benchmark.py --rows 10000 100000 --out bench.json
+  python benchmark.py --rows 1000000 --tools check_dataset count_entities --mode core --compare bench_prev.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import unicodedata
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from generate_synthetic import draw_combo, make_row
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(HERE, "..", "tools")
+
+# ---------------- 합성 코퍼스 ----------------
+def inject_defects(row: Dict[str, Any], rng: random.Random, broken_rate: float, nfd_rate: float) -> Dict[str, Any]:
+    """generate_synthetic raw 행에 결함 주입: 엔티티 밖 본문 NFD 분해 / 일부 엔티티 begin·end 어긋남."""
+    if rng.random() < nfd_rate:
+        text = row["content"]
+        parts: List[str] = []
+        pos = last = 0
+        for e in row["entities"]:  # make_row는 begin 오름차순으로 생성
+            gap = unicodedata.normalize("NFD", text[last:e["begin"]])
+            parts.append(gap)
+            pos += len(gap)
+            last = e["end"]
+            e["begin"], e["end"] = pos, pos + len(e["value"])
+            parts.append(e["value"])
+            pos += len(e["value"])
+        parts.append(unicodedata.normalize("NFD", text[last:]))
+        row["content"] = "".join(parts)
+    for e in row["entities"]:
+        if rng.random() < broken_rate:
+            d = rng.choice((-3, -1, 1, 2, 5))
+            e["begin"] = max(0, e["begin"] + d)
+            e["end"] = e["begin"] + len(e["value"])
+    return row
+
+def build_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    from build_dataset_jsonl import build_record
+    ans = {"text": raw["content"], "has_sensitive": raw["has_sensitive"], "entities": raw["entities"]}
+    return build_record(raw["id"], raw["content"], ans, assistant_as_string=True)
+
+def corpus_paths(workdir: str, rows: int, p: Namespace) -> Dict[str, str]:
+    tag = f"r{rows}_m{p.max_per_category}_f{p.filler_rate}_b{p.broken_rate}_n{p.nfd_rate}_s{p.seed}"
+    return {"raw": os.path.join(workdir, f"raw_{tag}.jsonl"), "build": os.path.join(workdir, f"build_{tag}.jsonl")}
+
+def make_corpus(workdir: str, rows: int, p: Namespace) -> Dict[str, str]:
+    paths = corpus_paths(workdir, rows, p)
+    if all(os.path.exists(x) for x in paths.values()):
+        return paths
+    os.makedirs(workdir, exist_ok=True)
+    rng = random.Random(p.seed)
+    t0 = time.perf_counter()
+    with open(paths["raw"] + ".tmp", "w", encoding="utf-8", newline="\n") as fr, \
+            open(paths["build"] + ".tmp", "w", encoding="utf-8", newline="\n") as fb:
+        for rid in range(1, rows + 1):
+            raw = make_row(rng, rid, draw_combo(rng), p.max_per_category, p.filler_rate)
+            raw = inject_defects(raw, rng, p.broken_rate, p.nfd_rate)
+            fr.write(json.dumps(raw, ensure_ascii=False) + "\n")
+            fb.write(json.dumps(build_row(raw), ensure_ascii=False, separators=(",", ":")) + "\n")
+    for x in paths.values():
+        os.replace(x + ".tmp", x)
+    sys.stderr.write(f"[bench] corpus rows={rows} generated in {time.perf_counter() - t0:.1f}s\n")
+    return paths
+
+# ---------------- core 벤치마크 (새 프로세스에서 실행) ----------------
+def _lines(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [ln for ln in f if ln.strip()]
+
+def core_check_dataset(c: Dict[str, str]) -> None:
+    from check_dataset import check_text
+    from jsonl_io import read_text_safely
+    opts = Namespace(nfkc=False, allow_overlap=False, strict_entity_keys=False, no_sort_warn=False, batch=None)
+    check_text(read_text_safely(c["build"]), opts, emit=lambda msg: None)
+
+def core_autofix_offsets(c: Dict[str, str]) -> None:
+    from autofix_offsets import fix_line, new_stats
+    args = Namespace(drop_unknown_labels=False, _label_map=None, nfkc=False, casefold=False)
+    stats = new_stats()
+    for line in _lines(c["build"]):
+        fix_line(line, lambda s, rid=None: None, args, stats)
+
+def core_afterautofix1(c: Dict[str, str]) -> None:
+    from afterautofix1 import fix_record
+    for line in _lines(c["build"]):
+        row, _ = fix_record(json.loads(line), nfkc=False, overlap_mode="trim", prefer_string_assistant=True)
+        json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+
+def core_begin_end_fix(c: Dict[str, str]) -> None:
+    sys.path.insert(0, TOOLS_DIR)
+    from begin_end_fix import fix_record
+    for line in _lines(c["raw"]):
+        obj, _, _, _ = fix_record(json.loads(line))
+        json.dumps(obj, ensure_ascii=False)
+
+def core_count_entities(c: Dict[str, str]) -> None:
+    from count_entities import count_file
+    count_file(c["build"])
+
+def core_build_dataset_jsonl(c: Dict[str, str]) -> None:
+    from build_dataset_jsonl import build_from_rows
+    rows = (json.loads(line) for line in _lines(c["raw"]))
+    for rec in build_from_rows(rows, 1, False, True):
+        json.dumps(rec, ensure_ascii=False)
+
+CORE: Dict[str, Callable[[Dict[str, str]], None]] = {
+    "check_dataset": core_check_dataset,
+    "autofix_offsets": core_autofix_offsets,
+    "afterautofix1": core_afterautofix1,
+    "begin_end_fix": core_begin_end_fix,
+    "count_entities": core_count_entities,
+    "build_dataset_jsonl": core_build_dataset_jsonl,
+}
+
+def _run_core(tool: str, corpus: Dict[str, str]) -> Dict[str, Any]:
+    """워커: core 벤치마크 1개 → {seconds, peak_rss_mb}."""
+    import contextlib
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        CORE[tool](corpus)
+    secs = time.perf_counter() - t0
+    return {"seconds": secs, "peak_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_SELF)) if resource else None}
+
+def _rss_mb(ru) -> float:
+    # Linux: KB, macOS: bytes
+    return round(ru.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def run_core(tool: str, corpus: Dict[str, str]) -> Dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+        return ex.submit(_run_core, tool, corpus).result()
+
+# ---------------- cli 벤치마크 ----------------
+def cli_command(tool: str, c: Dict[str, str], out: str) -> List[str]:
+    py = sys.executable
+    v = lambda name: os.path.join(HERE, name)
+    return {
+        "check_dataset": [py, v("check_dataset.py"), c["build"]],
+        "autofix_offsets": [py, v("autofix_offsets.py"), c["build"], out],
+        "afterautofix1": [py, v("afterautofix1.py"), "--input", c["build"], "--out", out, "--assistant-as-string"],
+        "begin_end_fix": [py, os.path.join(TOOLS_DIR, "begin_end_fix.py"), "-i", c["raw"], "-o", out],
+        "count_entities": [py, v("count_entities.py"), c["build"]],
+        "build_dataset_jsonl": [py, v("build_dataset_jsonl.py"), "--input", c["raw"], "--out", out,
+                                "--format", "jsonl", "--assistant-as-string"],
+    }[tool]
+
+def ok_exit_codes(tool: str, p: Namespace) -> tuple:
+    """정상 종료로 볼 종료코드. check_dataset은 문제를 찾으면 1 → 결함을 주입한 코퍼스에서는 1이 정상."""
+    if tool == "check_dataset" and (p.broken_rate > 0 or p.nfd_rate > 0):
+        return (1,)
+    return (0,)
+
+def run_cli(tool: str, corpus: Dict[str, str], workdir: str, ok_codes: tuple = (0,)) -> Dict[str, Any]:
+    """실제 CLI 1회 실행. 종료코드가 ok_codes 밖이면 error로 표시 (rows/s 비교에서 제외)."""
+    out = os.path.join(workdir, f"out_{tool}.jsonl")
+    cmd = cli_command(tool, corpus, out)
+    t0 = time.perf_counter()
+    with open(os.devnull, "wb") as devnull:
+        proc = subprocess.Popen(cmd, stdout=devnull, stderr=devnull, cwd=HERE)
+        if hasattr(os, "wait4"):
+            _, status, ru = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status
+            rss = _rss_mb(ru)
+        else:
+            proc.wait()
+            rss = None
+    secs = time.perf_counter() - t0
+    for p in (out, out + ".ckpt.json"):
+        if os.path.exists(p):
+            os.remove(p)
+    res = {"seconds": secs, "peak_rss_mb": rss, "exit_code": proc.returncode}
+    if proc.returncode not in ok_codes:
+        res["error"] = f"exit code {proc.returncode} (expected {'/'.join(map(str, ok_codes))})"
+    return res
+
+# ---------------- 결과 ----------------
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(results: List[Dict[str, Any]], prev_path: str) -> None:
+    with open(prev_path, "r", encoding="utf-8") as f:
+        prev = {(r["tool"], r["mode"], r["rows"]): r for r in json.load(f).get("results", [])}
+    sys.stderr.write(f"[bench] compare with {prev_path}\n")
+    for r in results:
+        old = prev.get((r["tool"], r["mode"], r["rows"]))
+        if not old or not old.get("rows_per_s") or not r.get("rows_per_s"):
+            continue
+        delta = (r["rows_per_s"] - old["rows_per_s"]) / old["rows_per_s"] * 100
+        mark = "  <-- regression" if delta < -10 else ""
+        sys.stderr.write(f"  {r['tool']:<20} {r['mode']:<4} rows={r['rows']:<8} "
+                         f"{old['rows_per_s']:>10.0f} -> {r['rows_per_s']:>10.0f} rows/s ({delta:+.1f}%){mark}\n")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark dataset tools on synthetic corpora")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="코퍼스 크기 (여러 개 가능, 예: 10000 100000 1000000)")
+    ap.add_argument("--tools", nargs="+", choices=sorted(CORE), default=sorted(CORE), help="대상 도구 (기본: 전부)")
+    ap.add_argument("--mode", choices=["core", "cli", "both"], default="both", help="핵심 함수 / 전체 CLI / 둘 다")
+    ap.add_argument("--max-per-category", type=int, default=2, help="카테고리당 최대 엔티티 수 (generate_synthetic)")
+    ap.add_argument("--filler-rate", type=float, default=0.3, help="엔티티 문장 뒤 일반 문장을 붙일 확률 (generate_synthetic)")
+    ap.add_argument("--broken-rate", type=float, default=0.1, help="오프셋을 어긋나게 할 엔티티 비율")
+    ap.add_argument("--nfd-rate", type=float, default=0.05, help="본문을 NFD(비 NFC)로 만들 행 비율")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--workdir", default=os.path.join(HERE, ".bench"), help="코퍼스 캐시 / 임시 출력 디렉터리")
+    ap.add_argument("--out", default=None, help="결과 JSON 경로 (미지정 시 stdout)")
+    ap.add_argument("--compare", default=None, help="이전 결과 JSON과 rows/s 비교")
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    modes = ["core", "cli"] if args.mode == "both" else [args.mode]
+    results: List[Dict[str, Any]] = []
+    for rows in args.rows:
+        corpus = make_corpus(args.workdir, rows, args)
+        for tool in args.tools:
+            for mode in modes:
+                if mode == "core":
+                    r = run_core(tool, corpus)
+                else:
+                    r = run_cli(tool, corpus, args.workdir, ok_exit_codes(tool, args))
+                # 실패한 실행은 시간이 의미 없으므로 rows/s를 남기지 않음 (--compare 대상에서도 빠짐)
+                r.update(tool=tool, mode=mode, rows=rows,
+                         rows_per_s=round(rows / r["seconds"], 1) if r["seconds"] and "error" not in r else None,
+                         seconds=round(r["seconds"], 4))
+                results.append(r)
+                if "error" in r:
+                    sys.stderr.write(f"[bench] {tool:<20} {mode:<4} rows={rows:<8} FAILED: {r['error']}\n")
+                    continue
+                sys.stderr.write(f"[bench] {tool:<20} {mode:<4} rows={rows:<8} {r['seconds']:>8.2f}s "
+                                 f"{r['rows_per_s']:>10.0f} rows/s  rss={r['peak_rss_mb']}MB\n")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {k: getattr(args, k) for k in ("max_per_category", "filler_rate", "broken_rate", "nfd_rate", "seed")},
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
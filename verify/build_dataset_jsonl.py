@@ -1,7 +1,12 @@
 # build_dataset_jsonl.py  (robust merge, no validation)
 # -*- coding: utf-8 -*-
-import json, csv, argparse, sys
-from typing import Any, Dict, Iterable, Union, Optional
+import json, csv, argparse, sys, glob, heapq, itertools, time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union, Optional
+
+from dedup_jsonl import Deduper, canonical_key
+from jsonl_io import ShardedJsonlWriter, add_shard_args, open_text_auto, _split_ext, imap_ordered
+from job_runner import add_job_args, job_from_args
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
 
 SYSTEM_TEXT = (
 "You are a strict whitelist-only detector for specific entities.\n"
@@ -44,55 +49,160 @@ SYSTEM_TEXT = (
 )
 SYSTEM_FIXED = {"role": "system", "content": SYSTEM_TEXT}
 
-def read_csv_rows(path: str) -> Iterable[Dict[str, Any]]:
-    with open(path, newline="", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            yield row
+def read_csv_rows(path: str, with_lineno: bool = False) -> Iterable[Dict[str, Any]]:
+    with open_text_auto(path, newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield (reader.line_num, row) if with_lineno else row
 
-def read_jsonl_rows(path: str):
-    with open(path, encoding="utf-8-sig") as f:
-        for lineno, line in enumerate(f, 1):
-            # \r\n 모두 제거
-            s = line.rstrip("\r\n")
-            if not s:
+# normalize_row()가 보는 컬럼만 골라 dict로 (빠른 CSV 경로용)
+CSV_COLUMNS = ("id", "user", "assistant_json", "assistant", "assistant_obj", "content", "has_sensitive", "entities", "messages")
+_csv_index_cache: Dict[Tuple[str, ...], List[Tuple[str, int]]] = {}
+
+def iter_csv_fast(path: str) -> Iterator[Tuple[str, int, Tuple[Tuple[str, ...], List[str]]]]:
+    """
+    csv.reader로 (파일, 라인, (헤더, 값 목록)) 스트리밍. 행마다 dict를 만들지 않는다.
+    헤더는 같은 튜플 객체를 공유하므로 배치 pickle 시 한 번만 직렬화된다.
+    빈 행 건너뛰기 / 라인 번호는 DictReader와 동일.
+    """
+    with open_text_auto(path, newline="") as f:
+        reader = csv.reader(f)
+        header = tuple(next(reader, ()))
+        for values in reader:
+            if not values:
                 continue
-            try:
-                yield json.loads(s)
-            except json.JSONDecodeError as e:
-                # 위치 정보(라인/열/오프셋) 확보
-                pos    = getattr(e, "pos", None)
-                lno    = getattr(e, "lineno", lineno)  # 보통 1
-                col    = getattr(e, "colno", None)
-
-                # 주변 문맥 120자
-                if pos is not None:
-                    start = max(0, pos - 60)
-                    end   = min(len(s), pos + 60)
-                    snippet = s[start:end]
-                    pointer = " " * (pos - start) + "^"
-                else:
-                    snippet = s[:120]
-                    pointer = ""
-
-                # stderr로 즉시 출력 (버퍼링 방지)
-                sys.stderr.write(
-                    f"\n[JSON ERROR] {path}:{lineno} "
-                    f"(lineno={lno}, colno={col}, pos={pos})\n"
-                    f"error: {e}\n"
-                    f"context: {snippet}\n"
-                    f"         {pointer}\n"
-                )
-                sys.stderr.flush()
-                # 더 이상 진행하지 않고 즉시 종료 (상위에서 메시지 누락 방지)
-                raise SystemExit(1)
-            except Exception as e:
-                # 다른 예외도 위치와 함께 노출
-                sys.stderr.write(
-                    f"\n[READ ERROR] {path}:{lineno}\n{type(e).__name__}: {e}\n"
-                    f"line(raw): {s[:120]}\n"
-                )
-                sys.stderr.flush()
-                raise SystemExit(1)
+            yield path, reader.line_num, (header, values)
+
+def csv_record(header: Tuple[str, ...], values: List[str]) -> Dict[str, Any]:
+    """(헤더, 값) → normalize_row용 최소 dict. 컬럼 인덱스는 헤더별로 한 번만 계산."""
+    idx = _csv_index_cache.get(header)
+    if idx is None:
+        idx = _csv_index_cache[header] = [(name, header.index(name)) for name in CSV_COLUMNS if name in header]
+    n = len(values)
+    return {name: (values[i] if i < n else None) for name, i in idx}
+
+def read_jsonl_rows(path: str, with_lineno: bool = False):
+    with open_text_auto(path) as f:
+        for _, lineno, row in parse_jsonl_lines((path, lineno, line) for lineno, line in enumerate(f, 1)):
+            yield (lineno, row) if with_lineno else row
+
+def _json_error_text(path: str, lineno: int, s: str, e: Exception) -> str:
+    """JSON 파싱 실패 메시지 (위치 + 주변 문맥). 병렬 워커에서도 같은 문구를 쓰도록 분리."""
+    if not isinstance(e, json.JSONDecodeError):
+        # 다른 예외도 위치와 함께 노출
+        return (
+            f"\n[READ ERROR] {path}:{lineno}\n{type(e).__name__}: {e}\n"
+            f"line(raw): {s[:120]}\n"
+        )
+    # 위치 정보(라인/열/오프셋) 확보
+    pos    = getattr(e, "pos", None)
+    lno    = getattr(e, "lineno", lineno)  # 보통 1
+    col    = getattr(e, "colno", None)
+
+    # 주변 문맥 120자
+    if pos is not None:
+        start = max(0, pos - 60)
+        end   = min(len(s), pos + 60)
+        snippet = s[start:end]
+        pointer = " " * (pos - start) + "^"
+    else:
+        snippet = s[:120]
+        pointer = ""
+
+    return (
+        f"\n[JSON ERROR] {path}:{lineno} "
+        f"(lineno={lno}, colno={col}, pos={pos})\n"
+        f"error: {e}\n"
+        f"context: {snippet}\n"
+        f"         {pointer}\n"
+    )
+
+def parse_jsonl_lines(lines: Iterable[Tuple[str, int, str]]) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """(파일, 라인, 텍스트) → (파일, 라인, row). 깨진 줄은 위치/문맥 출력 후 즉시 종료."""
+    for path, lineno, line in lines:
+        # \r\n 모두 제거
+        s = line.rstrip("\r\n")
+        if not s:
+            continue
+        try:
+            row = json.loads(s)
+        except Exception as e:
+            # stderr로 즉시 출력 (버퍼링 방지)
+            sys.stderr.write(_json_error_text(path, lineno, s, e))
+            sys.stderr.flush()
+            # 더 이상 진행하지 않고 즉시 종료 (상위에서 메시지 누락 방지)
+            raise SystemExit(1)
+        yield path, lineno, row
+
+# ---------------- multi-input ----------------
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """glob 패턴 확장. 패턴 순서는 유지하고 패턴 내부는 이름순 정렬, 중복 경로는 한 번만."""
+    out: List[str] = []
+    seen = set()
+    for pat in patterns:
+        matches = sorted(glob.glob(pat, recursive=True)) if glob.has_magic(pat) else [pat]
+        if not matches:
+            sys.stderr.write(f"[WARN] no input matched: {pat}\n")
+        for m in matches:
+            if m not in seen:
+                seen.add(m)
+                out.append(m)
+    return out
+
+def input_format(path: str, fmt: Optional[str]) -> str:
+    # data.csv.gz 처럼 압축 확장자는 떼고 판단
+    return fmt or ("csv" if _split_ext(path.lower())[1].startswith(".csv") else "jsonl")
+
+def iter_source_rows(path: str, fmt: Optional[str]) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """(파일, 라인, row) 스트리밍 — 출처(provenance) 추적용."""
+    reader = read_csv_rows if input_format(path, fmt) == "csv" else read_jsonl_rows
+    for lineno, row in reader(path, with_lineno=True):
+        yield path, lineno, row
+
+def _id_sort_key(item: Tuple[str, int, Dict[str, Any]]) -> int:
+    path, lineno, row = item
+    try:
+        return int(row["id"])
+    except Exception:
+        raise RuntimeError(f"--merge id requires integer 'id' in every row ({path}:{lineno})")
+
+def _check_sorted(stream: Iterator[Tuple[str, int, Dict[str, Any]]]) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """k-way 병합 전제(파일별 id 오름차순) 위반 시 1회 경고."""
+    prev = None
+    warned = False
+    for item in stream:
+        k = _id_sort_key(item)
+        if prev is not None and k < prev and not warned:
+            sys.stderr.write(f"[WARN] {item[0]}:{item[1]} id {k} < previous {prev}; merge order is not global\n")
+            warned = True
+        prev = k
+        yield item
+
+def merge_sources(paths: List[str], fmt: Optional[str], merge: str = "concat") -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    """
+    여러 입력을 한 스트림으로 병합 (파일 전체를 메모리에 올리지 않음).
+      - concat : 입력 순서대로 이어붙임
+      - id     : 각 파일이 id 오름차순이라는 전제로 heapq k-way 병합
+    """
+    streams = [iter_source_rows(p, fmt) for p in paths]
+    if merge == "id":
+        return heapq.merge(*(_check_sorted(s) for s in streams), key=_id_sort_key)
+    return itertools.chain.from_iterable(streams)
+
+def iter_raw_sources(paths: List[str], fmt: Optional[str]) -> Iterator[Tuple[str, int, Any, None]]:
+    """
+    병렬 빌드(concat)용 입력 스트림: 파싱은 워커에 맡기고 원본만 넘긴다.
+      CSV   → (헤더, 값 목록)   (iter_csv_fast)
+      JSONL → 원본 줄 문자열
+    """
+    for path in paths:
+        if input_format(path, fmt) == "csv":
+            for src, ln, payload in iter_csv_fast(path):
+                yield src, ln, payload, None
+        else:
+            with open_text_auto(path) as f:
+                for ln, line in enumerate(f, 1):
+                    yield path, ln, line, None
 
 
 def parse_json_maybe(x: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
@@ -149,69 +259,304 @@ def build_record(rec_id: int, user_text: str, assist_obj: Dict[str, Any], assist
         ]
     }
 
-def build_from_rows(rows: Iterable[Dict[str, Any]], start_id: int, force_start: bool, assistant_as_string: bool) -> Iterable[Dict[str, Any]]:
-    cur_id = start_id
-    for idx, row in enumerate(rows, 1):  # ← 라인 인덱스 추적
+def report_schema_error(idx: int, src: Optional[str], src_line: int, row: Any, e: Any) -> None:
+    # 문제 라인 디버그 정보 최대한 노출
+    where = f" ({src}:{src_line})" if src else ""
+    sys.stderr.write("\n[SCHEMA ERROR] at input row #{idx}{where}\n".format(idx=idx, where=where))
+    try:
+        sys.stderr.write("keys: {keys}\n".format(keys=list(row.keys())))
+    except Exception:
+        pass
+    try:
+        sys.stderr.write("row-json: {j}\n".format(j=json.dumps(row, ensure_ascii=False)))
+    except Exception:
+        sys.stderr.write("row-str: {s}\n".format(s=str(row)))
+    sys.stderr.write("error: {e}\n\n".format(e=e))
+    sys.stderr.flush()
+
+def assign_id(norm_id: Optional[int], cur_id: Optional[int], force_start: bool) -> Tuple[int, Optional[int]]:
+    """(부여할 id, 다음 cur_id). --force-start면 항상 순번, 아니면 입력 id 우선."""
+    if force_start:
+        if cur_id is None:
+            raise RuntimeError("--force-start requires --start-id")
+        return cur_id, cur_id + 1
+    if norm_id is None:
+        if cur_id is None:
+            raise RuntimeError("Provide --start-id or include 'id' in input rows")
+        return cur_id, cur_id + 1
+    return norm_id, cur_id
+
+def build_from_rows(rows: Iterable[Dict[str, Any]], start_id: int, force_start: bool, assistant_as_string: bool,
+                    dedup=None, provenance=None, state=None) -> Iterable[Dict[str, Any]]:
+    """
+    rows: row dict 또는 merge_sources()의 (file, line, row) 튜플 스트림.
+    dedup(dedup_jsonl.Deduper)이 주어지면 (user, entities) 중복 행은 id를 소비하지 않고 건너뜀.
+    provenance(텍스트 파일)가 주어지면 출력 id별 {"id","file","line"}을 JSONL로 기록.
+    state(dict)가 주어지면 다음 부여 id를 state["next_id"]에 유지 (체크포인트 재개용).
+    """
+    cur_id = state.get("next_id", start_id) if state is not None else start_id
+    for idx, item in enumerate(rows, 1):  # ← 라인 인덱스 추적
+        src, src_line, row = item if isinstance(item, tuple) else (None, idx, item)
         try:
             norm = normalize_row(row)
         except Exception as e:
-            # 문제 라인 디버그 정보 최대한 노출
-            import sys, json
-            sys.stderr.write("\n[SCHEMA ERROR] at input row #{idx}\n".format(idx=idx))
-            try:
-                sys.stderr.write("keys: {keys}\n".format(keys=list(row.keys())))
-            except Exception:
-                pass
-            try:
-                sys.stderr.write("row-json: {j}\n".format(j=json.dumps(row, ensure_ascii=False)))
-            except Exception:
-                sys.stderr.write("row-str: {s}\n".format(s=str(row)))
-            sys.stderr.write("error: {e}\n\n".format(e=e))
-            sys.stderr.flush()
+            report_schema_error(idx, src, src_line, row, e)
             raise  # 그대로 중단
 
-        if force_start:
-            if cur_id is None:
-                raise RuntimeError("--force-start requires --start-id")
-            rec_id, cur_id = cur_id, cur_id + 1
-        else:
-            rec_id = norm["id"]
-            if rec_id is None:
-                if cur_id is None:
-                    raise RuntimeError("Provide --start-id or include 'id' in input rows")
-                rec_id, cur_id = cur_id, cur_id + 1
+        dup_key = None
+        if dedup is not None:
+            dup_key = canonical_key(norm["user"], norm["assistant_json"])
+            first = dedup.seen(dup_key)
+            if first is not None:
+                dedup.record_dup(dup_key, first, norm["id"], src, src_line)
+                continue
 
+        rec_id, cur_id = assign_id(norm["id"], cur_id, force_start)
+        if state is not None:
+            state["next_id"] = cur_id
+        if dup_key is not None:
+            dedup.add(dup_key, rec_id, src, src_line)
+        if provenance is not None:
+            provenance.write(json.dumps({"id": rec_id, "file": src, "line": src_line}, ensure_ascii=False) + "\n")
         yield build_record(rec_id, norm["user"], norm["assistant_json"], assistant_as_string)
 
+# ---------------- parallel build ----------------
+def _normalize_batch(task, assistant_as_string: bool, want_key: bool):
+    """
+    워커: (items, meta) → (결과 목록, meta). items는 (file, line, 원본 JSONL 줄 또는 row dict).
+    row 자리에는 (헤더, 값 목록) 튜플(빠른 CSV 경로)도 올 수 있다.
+    결과: ("ok", file, line, 입력 id, messages JSON, dedup key) / ("json", 메시지) / ("schema", file, line, row, 오류)
+    오류가 나면 그 지점까지의 결과만 돌려준다 (부모가 보고 후 중단).
+    """
+    items, meta = task
+    out = []
+    for src, src_line, row in items:
+        if isinstance(row, str):
+            s = row.rstrip("\r\n")
+            if not s:
+                continue
+            try:
+                row = json.loads(s)
+            except Exception as e:
+                out.append(("json", _json_error_text(src, src_line, s, e)))
+                break
+        elif isinstance(row, tuple):
+            row = csv_record(*row)
+        try:
+            norm = normalize_row(row)
+        except Exception as e:
+            out.append(("schema", src, src_line, row, str(e)))
+            break
+        key = canonical_key(norm["user"], norm["assistant_json"]) if want_key else None
+        messages = build_record(0, norm["user"], norm["assistant_json"], assistant_as_string)["messages"]
+        out.append(("ok", src, src_line, norm["id"],
+                    json.dumps(messages, ensure_ascii=False, separators=(",", ":")), key))
+    return out, meta
+
+def _batched(items: Iterable[Tuple[str, int, Any, Any]], size: int):
+    """(file, line, payload, pos) 스트림 → ((file, line, payload) 목록, (마지막 pos, 입력 줄 수)) 배치."""
+    batch: List[Tuple[str, int, Any]] = []
+    pos = None
+    for src, src_line, payload, pos in items:
+        batch.append((src, src_line, payload))
+        if len(batch) >= size:
+            yield batch, (pos, len(batch))
+            batch = []
+    if batch:
+        yield batch, (pos, len(batch))
 
-def write_jsonl(records: Iterable[Dict[str, Any]], out_path: str):
-    with open(out_path, "w", encoding="utf-8") as f:
-        for rec in records:
-            f.write(json.dumps(rec, ensure_ascii=False, separators=(",",":")) + "\n")
+def build_parallel(items: Iterable[Tuple[str, int, Any, Any]], start_id: int, force_start: bool,
+                   assistant_as_string: bool, workers: int, batch_size: int,
+                   dedup=None, provenance=None, state=None, on_batch=None) -> Iterator[Tuple[int, str]]:
+    """
+    build_from_rows의 병렬판. 파싱/정규화/직렬화는 워커, id 부여와 dedup/provenance는 부모에서 순서대로
+    → 출력은 순차 실행과 바이트 단위로 같다. (rec_id, JSONL 줄)을 yield.
+    on_batch(pos, n)은 배치의 출력이 모두 소비된 뒤 호출 (체크포인트용).
+    """
+    cur_id = state.get("next_id", start_id) if state is not None else start_id
+    idx = 0
+    results = imap_ordered(_normalize_batch, _batched(items, batch_size), workers, None,
+                           assistant_as_string, dedup is not None)
+    for out, (pos, n) in results:
+        for res in out:
+            if res[0] == "json":
+                sys.stderr.write(res[1])
+                sys.stderr.flush()
+                raise SystemExit(1)
+            idx += 1
+            if res[0] == "schema":
+                _, src, src_line, row, err = res
+                report_schema_error(idx, src, src_line, row, err)
+                raise RuntimeError(err)
+            _, src, src_line, norm_id, messages_json, dup_key = res
+            if dup_key is not None:
+                first = dedup.seen(dup_key)
+                if first is not None:
+                    dedup.record_dup(dup_key, first, norm_id, src, src_line)
+                    continue
+            rec_id, cur_id = assign_id(norm_id, cur_id, force_start)
+            if state is not None:
+                state["next_id"] = cur_id
+            if dup_key is not None:
+                dedup.add(dup_key, rec_id, src, src_line)
+            if provenance is not None:
+                provenance.write(json.dumps({"id": rec_id, "file": src, "line": src_line}, ensure_ascii=False) + "\n")
+            yield rec_id, '{"id":' + json.dumps(rec_id) + ',"messages":' + messages_json + "}"
+        if on_batch is not None:
+            on_batch(pos, n)
+
+def write_jsonl(records: Iterable[Dict[str, Any]], out_path: str,
+                shard_rows: Optional[int] = None, shard_bytes: Optional[int] = None,
+                manifest_path: Optional[str] = None, prof=NULL_PROFILER):
+    """shard_rows/shard_bytes 지정 시 out-00000.jsonl ... 샤드 + manifest(행 수/id 범위/SHA-256) 기록."""
+    with ShardedJsonlWriter(out_path, shard_rows, shard_bytes, manifest_path) as w:
+        for rec in prof.iter("fix", records):
+            # 직렬화 + 기록 (write 단계)
+            with prof.stage("write"):
+                w.write_record(rec)
+            prof.tick()
+    return w
+
+def report_throughput(rows: int, secs: float) -> None:
+    sys.stderr.write(f"[OK] Rows: {rows} in {secs:.2f}s ({rows / secs if secs > 0 else 0:,.0f} rows/s)\n")
+
+def run_job(args, inputs: List[str], prof=NULL_PROFILER) -> None:
+    """JSONL concat 빌드: .tmp 원자적 기록 + 입력 오프셋 체크포인트 (--resume으로 재개)."""
+    state: Dict[str, Any] = {}
+    options = {k: getattr(args, k) for k in ("start_id", "force_start", "assistant_as_string")}
+    try:
+        job = job_from_args(args, inputs, args.out, state=state, options=options, tag="build")
+        job.open()
+    except ValueError as e:
+        sys.stderr.write(f"[ERROR] {e}\n")
+        raise SystemExit(1)
+    t0 = time.perf_counter()
+    with job:
+        if args.workers > 1:
+            # 원본 줄 배치를 워커로 보내고, 배치 출력이 끝날 때마다 체크포인트 위치 갱신
+            for rec_id, line in prof.iter("fix", build_parallel(
+                prof.iter("read", job.lines_with_pos()), args.start_id, args.force_start, args.assistant_as_string,
+                args.workers, args.batch_size, state=state, on_batch=job.advance
+            )):
+                with prof.stage("write"):
+                    job.write(line, rec_id)
+                prof.tick()
+        else:
+            records = build_from_rows(
+                prof.iter("parse", parse_jsonl_lines(prof.iter("read", job.lines()))),
+                start_id=args.start_id,
+                force_start=args.force_start,
+                assistant_as_string=args.assistant_as_string,
+                state=state
+            )
+            for rec in prof.iter("fix", records):
+                with prof.stage("serialize"):
+                    line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"))
+                with prof.stage("write"):
+                    job.write(line, rec["id"])
+                prof.tick()
+    report_throughput(job.written - (job.resumed_from or {}).get("written", 0), time.perf_counter() - t0)
+    print(f"[OK] Inputs: {len(inputs)} file(s), merge={args.merge}")
+    if job.resumed_from is not None:
+        print(f"[OK] Resumed at input #{job.resumed_from['input_index']} line {job.resumed_from['lineno']}")
+    if job.writer is not None and job.writer.sharded:
+        print(f"[OK] Shards: {len(job.writer.shards)}, rows={job.writer.total_rows}")
+        print(f"[OK] Wrote -> {job.writer.manifest_path}")
+    else:
+        print(f"[OK] Wrote -> {args.out}")
 
 def main():
     ap = argparse.ArgumentParser(description="Merge fixed SYSTEM + user/assistant into JSONL (robust, no validation)")
-    ap.add_argument("--input", required=True, help="입력 파일 (CSV or JSONL)")
+    ap.add_argument("--input", required=True, nargs="+", help="입력 파일 (CSV or JSONL, 여러 개/glob 패턴 가능)")
     ap.add_argument("--out", required=True, help="출력 JSONL")
-    ap.add_argument("--format", choices=["csv","jsonl"], default=None, help="입력 포맷 (미지정 시 확장자로 추론)")
+    ap.add_argument("--format", choices=["csv","jsonl"], default=None, help="입력 포맷 (미지정 시 파일별 확장자로 추론)")
+    ap.add_argument("--merge", choices=["concat","id"], default="concat",
+                    help="여러 입력 병합 방식: concat(입력 순서대로) / id(파일별 id 오름차순 전제 k-way 병합)")
+    ap.add_argument("--provenance", default=None, help="출력 id별 원본 파일/라인 기록 JSONL 경로")
     ap.add_argument("--start-id", type=int, default=None, help="시작 id (입력에 id 없거나 --force-start일 때 사용)")
     ap.add_argument("--force-start", action="store_true", help="입력의 기존 id를 무시하고 --start-id부터 재부여")
     ap.add_argument("--assistant-as-string", action="store_true", help="assistant JSON을 문자열로 저장(내부 \\\" 이스케이프 표시)")
+    add_shard_args(ap)
+    ap.add_argument("--dedup", action="store_true", help="(user 텍스트, 정렬된 entities) 기준 정확 중복 제거")
+    ap.add_argument("--dedup-report", default=None, help="중복 리포트 JSONL 경로 (--dedup 필요)")
+    ap.add_argument("--dedup-store", default=None, help="중복 해시 테이블 파일 경로 (미지정 시 임시 파일)")
+    add_job_args(ap)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="정규화/직렬화 워커 프로세스 수 (1=순차). id 부여/출력 순서는 순차 실행과 동일")
+    ap.add_argument("--batch-size", type=int, default=2000, help="--workers 사용 시 워커에 보내는 배치 행 수")
+    ap.add_argument("--fast-csv", action="store_true",
+                    help="CSV를 csv.reader + 컬럼 인덱스로 배치 읽기, JSON 컬럼 파싱은 배치 워커에서 (--merge concat)")
+    add_profile_args(ap)
     args = ap.parse_args()
 
-    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
-    rows = read_csv_rows(args.input) if fmt == "csv" else read_jsonl_rows(args.input)
-
-    write_jsonl(
-        build_from_rows(
-            rows,
-            start_id=args.start_id,
-            force_start=args.force_start,
-            assistant_as_string=args.assistant_as_string
-        ),
-        args.out
-    )
-    print(f"[OK] Wrote -> {args.out}")
+    inputs = expand_inputs(args.input)
+    if not inputs:
+        ap.error("no input files")
+
+    # JSONL 입력을 concat으로 이어붙이는 경우: 체크포인트/재개 가능한 job 경로
+    resumable = (args.merge == "concat" and not args.dedup and not args.provenance
+                 and all(input_format(p, args.format) == "jsonl" for p in inputs))
+    prof = profiler_from_args(args, "build")
+    if resumable:
+        with prof:
+            return run_job(args, inputs, prof)
+    if args.resume:
+        ap.error("--resume requires JSONL inputs with --merge concat and no --dedup/--provenance")
+    if args.fast_csv and args.merge != "concat":
+        ap.error("--fast-csv requires --merge concat")
+    rows = prof.iter("parse", merge_sources(inputs, args.format, args.merge))
+
+    dedup = None
+    if args.dedup:
+        dedup = Deduper(args.dedup_store, args.dedup_report)
+
+    prov = open(args.provenance, "w", encoding="utf-8", newline="\n") if args.provenance else None
+    t0 = time.perf_counter()
+    prof.start()
+    try:
+        if args.workers > 1 or args.fast_csv:
+            if args.merge == "concat":
+                items = prof.iter("read", iter_raw_sources(inputs, args.format))
+            else:
+                items = ((src, ln, row, None) for src, ln, row in rows)
+            with ShardedJsonlWriter(args.out, args.shard_rows, args.shard_bytes, args.manifest) as writer:
+                for rec_id, line in prof.iter("fix", build_parallel(
+                    items,
+                    args.start_id, args.force_start, args.assistant_as_string,
+                    args.workers, args.batch_size, dedup=dedup, provenance=prov
+                )):
+                    with prof.stage("write"):
+                        writer.write(line, rec_id)
+                    prof.tick()
+        else:
+            writer = write_jsonl(
+                build_from_rows(
+                    rows,
+                    start_id=args.start_id,
+                    force_start=args.force_start,
+                    assistant_as_string=args.assistant_as_string,
+                    dedup=dedup,
+                    provenance=prov
+                ),
+                args.out,
+                shard_rows=args.shard_rows,
+                shard_bytes=args.shard_bytes,
+                manifest_path=args.manifest,
+                prof=prof
+            )
+    finally:
+        if prov is not None:
+            prov.close()
+        if dedup is not None:
+            dedup.close()
+    prof.close()
+    report_throughput(writer.total_rows + (dedup.dropped if dedup is not None else 0), time.perf_counter() - t0)
+    if dedup is not None:
+        print(f"[OK] Dedup: kept={dedup.kept}, dropped={dedup.dropped}")
+    print(f"[OK] Inputs: {len(inputs)} file(s), merge={args.merge}")
+    if writer.sharded:
+        print(f"[OK] Shards: {len(writer.shards)}, rows={writer.total_rows}")
+    print(f"[OK] Wrote -> {writer.manifest_path if writer.sharded else args.out}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,287 @@
+# check_contamination.py
+# -*- coding: utf-8 -*-
+"""
+학습 빌드(dataset_full_build_*.jsonl)와 평가셋(Test Dataset) 사이의 오염(중복) 검사기.
+
+- 평가셋 텍스트/엔티티 값으로 인덱스를 만든 뒤(재사용 가능, JSON 저장)
+  학습 빌드를 한 줄씩 스트리밍하며 겹침을 찾는다.
+- 인덱스에는 평가셋 파일(절대 경로 / 크기 / mtime)과 ngram / min_value_len을 함께 저장하고,
+  재사용 시 지금 값과 다르면(평가셋 수정, 다른 --test, 다른 옵션) 에러로 중단 → --rebuild-index로 재생성
+- 검사 항목:
+  1) TEXT_EXACT   : 정규화한 텍스트 해시가 평가셋 문장과 동일
+  2) TEXT_FUZZY   : 문자 n-gram 기준으로 평가셋 문장의 대부분(containment)이 학습 문장에 포함
+  3) VALUE_EXACT  : 학습 엔티티 value가 평가셋 엔티티 value와 동일 (짧은 값은 --min-value-len으로 제외)
+- 오염이 하나라도 있으면 종료코드 1 (빌드 게이트용)
+
+사용 예:
+  python check_contamination.py --test "../Test Dataset/Test_Dataset_500_Answer_Format.jsonl" \
+      --index test500.index.json --input ../dataset_full_build_56000.jsonl --report contamination.jsonl
+"""
+
+import os
+import io
+import re
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from jsonl_io import open_text_auto
+from profile_lengths import extract_text_entities
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
+INDEX_VERSION = 2
+DEFAULT_NGRAM = 5
+DEFAULT_MIN_VALUE_LEN = 6
+WS_RE = re.compile(r"\s+")
+
+# ----------------------------- IO helpers --------------------------------
+def iter_rows(path: str, prof=NULL_PROFILER) -> Iterable[Tuple[int, Dict[str, Any]]]:
+    """(라인번호, row) 스트리밍. 깨진 줄은 stderr 경고 후 건너뜀."""
+    with open_text_auto(path) as fin:
+        for ln, line in enumerate(prof.iter("read", fin), 1):
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                with prof.stage("parse"):
+                    row = json.loads(s)
+            except Exception as e:
+                sys.stderr.write(f"[contam] {path}:{ln} JSON parse error: {e}\n")
+                continue
+            if isinstance(row, dict):
+                yield ln, row
+
+# ------------------------ Normalization helpers ---------------------------
+def norm_text(s: str) -> str:
+    """비교용 정규화: NFKC + casefold + 공백 1칸으로 축약."""
+    return WS_RE.sub(" ", unicodedata.normalize("NFKC", s).casefold()).strip()
+
+def text_hash(s: str) -> str:
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=8).hexdigest()
+
+def shingles(s: str, n: int) -> set:
+    """문자 n-gram을 crc32로 해시한 집합 (실행 간 안정적인 값)."""
+    if len(s) < n:
+        return {zlib.crc32(s.encode("utf-8"))} if s else set()
+    return {zlib.crc32(s[i:i + n].encode("utf-8")) for i in range(len(s) - n + 1)}
+
+# ------------------------------ Index -------------------------------------
+def build_index(test_paths: List[str], ngram: int, min_value_len: int, prof=NULL_PROFILER) -> Dict[str, Any]:
+    texts: Dict[str, List[str]] = {}        # text hash -> [test ids]
+    values: Dict[str, List[str]] = {}       # norm value -> [test ids]
+    postings: Dict[int, List[int]] = {}     # shingle -> [test doc idx]
+    docs: List[Dict[str, Any]] = []         # test doc idx -> {id, size}
+
+    for path in test_paths:
+        for ln, row in iter_rows(path, prof):
+            text, ents = extract_text_entities(row)
+            if text is None:
+                continue
+            rid = row.get("id")
+            tid = f"{os.path.basename(path)}#{rid if rid is not None else ln}"
+            nt = norm_text(text)
+            texts.setdefault(text_hash(nt), []).append(tid)
+
+            sh = shingles(nt, ngram)
+            doc_idx = len(docs)
+            docs.append({"id": tid, "size": len(sh)})
+            for h in sh:
+                postings.setdefault(h, []).append(doc_idx)
+
+            for e in ents:
+                v = e.get("value") if isinstance(e, dict) else None
+                if not isinstance(v, str):
+                    continue
+                nv = norm_text(v)
+                if len(nv) < min_value_len:
+                    continue
+                lst = values.setdefault(nv, [])
+                if tid not in lst:
+                    lst.append(tid)
+
+    return {
+        "version": INDEX_VERSION,
+        "ngram": ngram,
+        "min_value_len": min_value_len,
+        "sources": test_fingerprint(test_paths),
+        "docs": docs,
+        "texts": texts,
+        "values": values,
+        "postings": postings,
+    }
+
+def test_fingerprint(test_paths: List[str]) -> List[Dict[str, Any]]:
+    """평가셋 파일별 {path(절대 경로), size, mtime} — 인덱스 재사용 가능 여부 판단용."""
+    out = []
+    for p in test_paths:
+        st = os.stat(p)
+        out.append({"path": os.path.abspath(p), "size": st.st_size, "mtime": st.st_mtime_ns})
+    return out
+
+def stale_reasons(index: Dict[str, Any], test_paths: List[str],
+                  ngram: Optional[int], min_value_len: Optional[int]) -> List[str]:
+    """
+    저장된 인덱스가 지금 입력과 맞지 않는 이유 목록 (비면 재사용 가능).
+    test_paths가 비어 있으면 인덱스에 기록된 평가셋 파일을 디스크의 현재 상태와 비교.
+    """
+    reasons = []
+    for key, want in (("ngram", ngram), ("min_value_len", min_value_len)):
+        if want is not None and index[key] != want:
+            reasons.append(f"{key}: index={index[key]} requested={want}")
+    saved = {s["path"]: s for s in index["sources"]}
+    paths = [os.path.abspath(p) for p in test_paths] or list(saved)
+    if test_paths and set(paths) != set(saved):
+        reasons.append(f"test files differ: index={sorted(saved)} requested={sorted(paths)}")
+        return reasons
+    for p in paths:
+        if not os.path.exists(p):
+            reasons.append(f"test file missing: {p}")
+            continue
+        cur = test_fingerprint([p])[0]
+        if (cur["size"], cur["mtime"]) != (saved[p]["size"], saved[p]["mtime"]):
+            reasons.append(f"test file changed: {p}")
+    return reasons
+
+def save_index(index: Dict[str, Any], path: str) -> None:
+    # JSON 키는 문자열이어야 하므로 저장 시 str, 로드 시 int로 복원
+    data = {**index, "postings": {str(k): v for k, v in index["postings"].items()}}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def load_index(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"index version mismatch: {index.get('version')} (expected {INDEX_VERSION})")
+    index["postings"] = {int(k): v for k, v in index["postings"].items()}
+    return index
+
+# ------------------------------ Scan --------------------------------------
+def scan_row(text: str, ents: List[Dict[str, Any]], index: Dict[str, Any], fuzzy_threshold: float) -> List[Dict[str, Any]]:
+    """학습 레코드 1건을 인덱스와 대조해 hit 목록 반환."""
+    hits: List[Dict[str, Any]] = []
+    nt = norm_text(text)
+
+    exact = index["texts"].get(text_hash(nt))
+    if exact:
+        hits.append({"code": "TEXT_EXACT", "test_ids": exact})
+    elif fuzzy_threshold < 1.0:
+        postings = index["postings"]
+        docs = index["docs"]
+        counts: Dict[int, int] = {}
+        for h in shingles(nt, index["ngram"]):
+            for d in postings.get(h, ()):
+                counts[d] = counts.get(d, 0) + 1
+        for d, inter in counts.items():
+            size = docs[d]["size"]
+            if size and inter / size >= fuzzy_threshold:
+                hits.append({"code": "TEXT_FUZZY", "test_ids": [docs[d]["id"]], "score": round(inter / size, 4)})
+
+    values = index["values"]
+    min_len = index["min_value_len"]
+    for e in ents:
+        v = e.get("value") if isinstance(e, dict) else None
+        if not isinstance(v, str):
+            continue
+        nv = norm_text(v)
+        if len(nv) < min_len:
+            continue
+        tids = values.get(nv)
+        if tids:
+            hits.append({"code": "VALUE_EXACT", "test_ids": tids, "label": e.get("label"), "value": v})
+    return hits
+
+def main():
+    ap = argparse.ArgumentParser(description="Train/test contamination checker (exact + n-gram fuzzy + entity values)")
+    ap.add_argument("--test", nargs="*", default=[], help="평가셋 JSONL (Answer/Prompt 포맷 또는 messages 포맷)")
+    ap.add_argument("--index", default=None,
+                    help="인덱스 JSON 경로 (있으면 재사용, 없으면 --test로 생성 후 저장). "
+                         "평가셋 파일 / 옵션이 인덱스와 다르면 에러")
+    ap.add_argument("--rebuild-index", action="store_true", help="인덱스가 있어도 --test로 다시 생성")
+    ap.add_argument("--input", nargs="*", default=[], help="검사할 학습 빌드 JSONL (여러 개 가능)")
+    ap.add_argument("--report", default=None, help="오염 상세 리포트 JSONL 경로 (미지정 시 생략)")
+    ap.add_argument("--ngram", type=int, default=None,
+                    help=f"fuzzy 비교용 문자 n-gram 크기 (기본 {DEFAULT_NGRAM}, 인덱스 재사용 시 인덱스 값)")
+    ap.add_argument("--fuzzy-threshold", type=float, default=0.8,
+                    help="평가 문장 n-gram 중 학습 문장에 포함된 비율 임계값 (1.0이면 fuzzy 비활성)")
+    ap.add_argument("--min-value-len", type=int, default=None,
+                    help=f"이 길이 미만 엔티티 value는 비교 제외 (PIN/CVV 등 짧은 값 오탐 방지, "
+                         f"기본 {DEFAULT_MIN_VALUE_LEN}, 인덱스 재사용 시 인덱스 값)")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    prof = profiler_from_args(args, "contam")
+    with prof:
+        t0 = time.perf_counter()
+        if args.index and os.path.exists(args.index) and not args.rebuild_index:
+            try:
+                index = load_index(args.index)
+                reasons = stale_reasons(index, args.test, args.ngram, args.min_value_len)
+            except (ValueError, KeyError) as e:
+                reasons = [f"unreadable index: {e}"]
+            if reasons:
+                for r in reasons:
+                    sys.stderr.write(f"[contam] stale index {args.index}: {r}\n")
+                sys.stderr.write("[contam] --rebuild-index (with --test) to regenerate it\n")
+                return 2
+            sys.stderr.write(f"[contam] index loaded: {args.index} docs={len(index['docs'])}\n")
+        else:
+            if not args.test:
+                ap.error("--test is required when the index does not exist")
+            index = build_index(args.test,
+                                args.ngram if args.ngram is not None else DEFAULT_NGRAM,
+                                args.min_value_len if args.min_value_len is not None else DEFAULT_MIN_VALUE_LEN,
+                                prof)
+            if args.index:
+                save_index(index, args.index)
+            sys.stderr.write(
+                f"[contam] index built: docs={len(index['docs'])} values={len(index['values'])} "
+                f"shingles={len(index['postings'])} ({time.perf_counter() - t0:.2f}s)\n"
+            )
+
+        stats = {"rows": 0, "contaminated_rows": 0, "TEXT_EXACT": 0, "TEXT_FUZZY": 0, "VALUE_EXACT": 0}
+        rep = open(args.report, "w", encoding="utf-8", newline="\n") if args.report else None
+        try:
+            for path in args.input:
+                for ln, row in iter_rows(path, prof):
+                    text, ents = extract_text_entities(row)
+                    if text is None:
+                        continue
+                    rid = row.get("id")
+                    stats["rows"] += 1
+                    prof.tick()
+                    with prof.stage("validate"):
+                        hits = scan_row(text, ents, index, args.fuzzy_threshold)
+                    if not hits:
+                        continue
+                    stats["contaminated_rows"] += 1
+                    for h in hits:
+                        stats[h["code"]] += 1
+                    if rep:
+                        with prof.stage("write"):
+                            rep.write(json.dumps({"file": path, "line": ln, "id": rid, "hits": hits}, ensure_ascii=False) + "\n")
+        finally:
+            if rep:
+                rep.close()
+
+    sys.stderr.write(
+        "[contam] rows={rows} contaminated_rows={contaminated_rows} text_exact={TEXT_EXACT} "
+        "text_fuzzy={TEXT_FUZZY} value_exact={VALUE_EXACT}".format(**stats)
+        + f" ({time.perf_counter() - t0:.2f}s)\n"
+    )
+    return 1 if stats["contaminated_rows"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,12 @@ import sys
 import unicodedata
 import argparse
 import io
+import os
 import re
 
+from jsonl_io import is_manifest, manifest_shards, map_shards, read_text_safely
+from instrument import add_profile_args, profiler_from_args
+
 # -------------------- ALLOWED 라벨 (사용자 제공 버전) --------------------
 ALLOWED = {
     # 기본 신원 정보
@@ -69,22 +73,37 @@ def parse_assistant_json(s):
     except Exception as e:
         return None, f"assistant.content JSON parse error: {e}"
 
-def read_text_safely(path: str) -> str:
-    """UTF-8 / UTF-8-SIG / UTF-16LE/BE 자동 인식, 실패시 CP949 폴백."""
-    with open(path, "rb") as fb:
-        data = fb.read()
-    if data.startswith(b'\xef\xbb\xbf'):
-        return data.decode('utf-8-sig')
-    if data.startswith(b'\xff\xfe'):
-        return data.decode('utf-16')      # LE
-    if data.startswith(b'\xfe\xff'):
-        return data.decode('utf-16-be')   # BE
-    try:
-        return data.decode('utf-8')
-    except UnicodeDecodeError:
-        return data.decode('cp949', errors='replace')
+# -------------------- 오류 코드 (리포트/CI용, 변경 금지) --------------------
+CODES = (
+    "JSON_PARSE",            # 줄 JSON 파싱 실패
+    "MESSAGES_SHAPE",        # messages가 길이 3 리스트가 아님
+    "ROLE_ORDER",            # system,user,assistant 순서 아님
+    "CONTENT_NOT_STRING",    # messages[i].content 누락/문자열 아님
+    "ASSISTANT_JSON",        # assistant.content 파싱 실패/객체 아님
+    "ASSISTANT_KEYS",        # 정답 JSON 키가 {text,has_sensitive,entities} 아님
+    "TEXT_TYPE",             # text 문자열 아님
+    "HS_TYPE",               # has_sensitive 불리언 아님
+    "ENTITIES_TYPE",         # entities 리스트 아님
+    "ENTITY_KEYS",           # 엔티티 키 누락/불필요 키
+    "ENTITY_TYPES",          # begin/end/value/label 타입 오류
+    "SPAN_OUT_OF_RANGE",     # [begin,end) 범위 오류
+    "SLICE_MISMATCH",        # text[begin:end] != value
+    "LABEL_NOT_ALLOWED",     # ALLOWED 밖 라벨
+    "VALUE_WHITESPACE",      # value 앞뒤 공백
+    "CONTROL_CHARS",         # 제어문자 포함
+    "UNSORTED",              # begin 오름차순 아님
+    "DUPLICATE",             # (label,begin,end) 중복
+    "OVERLAP",               # 스팬 겹침
+    "TEXT_NOT_NFC",          # 본문 NFC 아님 (경고)
+    "HS_MISMATCH",           # has_sensitive와 entities 개수 불일치
+)
+# ------------------------------------------------------------------------
 
-def check_offsets(text, ents, *, use_nfkc=False, allow_overlap=False, strict_entity_keys=False, warn_sort=True):
+class TooManyErrors(Exception):
+    """--max-errors 도달 시 검사 중단용."""
+
+def offset_problems(text, ents, *, use_nfkc=False, allow_overlap=False, strict_entity_keys=False, warn_sort=True):
+    """엔티티 검사 결과를 (코드, 메시지, 엔티티 인덱스, 라벨) 목록으로 반환."""
     errs = []
     norm_text = normalize_text(text, use_nfkc)
 
@@ -93,19 +112,20 @@ def check_offsets(text, ents, *, use_nfkc=False, allow_overlap=False, strict_ent
     spans_sorted = []
 
     for i, e in enumerate(ents):
+        lab_hint = e.get("label") if isinstance(e, dict) and isinstance(e.get("label"), str) else None
         # 스키마 키 검사
         req = {"value","begin","end","label"}
         if strict_entity_keys:
             extra = set(e.keys()) - req
             missing = req - set(e.keys())
             if missing:
-                errs.append(f"entity[{i}] missing keys {sorted(missing)}")
+                errs.append(("ENTITY_KEYS", f"entity[{i}] missing keys {sorted(missing)}", i, lab_hint))
             if extra:
-                errs.append(f"entity[{i}] unexpected keys {sorted(extra)}")
+                errs.append(("ENTITY_KEYS", f"entity[{i}] unexpected keys {sorted(extra)}", i, lab_hint))
         else:
             for k in ("value","begin","end","label"):
                 if k not in e:
-                    errs.append(f"entity[{i}] missing key {k}")
+                    errs.append(("ENTITY_KEYS", f"entity[{i}] missing key {k}", i, lab_hint))
                     # 다음 검사 최소화
                     continue
 
@@ -113,63 +133,268 @@ def check_offsets(text, ents, *, use_nfkc=False, allow_overlap=False, strict_ent
 
         # 타입 검사
         if not isinstance(b, int) or not isinstance(en, int) or not isinstance(val, str) or not isinstance(lab, str):
-            errs.append(f"entity[{i}] bad types (begin/end/value/label)")
+            errs.append(("ENTITY_TYPES", f"entity[{i}] bad types (begin/end/value/label)", i, lab_hint))
             continue
 
         # 범위 검사
         if not (0 <= b < en <= len(text)):
-            errs.append(f"entity[{i}] span out of range: [{b},{en}) vs len={len(text)}")
+            errs.append(("SPAN_OUT_OF_RANGE", f"entity[{i}] span out of range: [{b},{en}) vs len={len(text)}", i, lab))
             continue
 
         # slice 일치(정규화 기준 선택 가능)
         raw_slice = text[b:en]
         if normalize_text(raw_slice, use_nfkc) != normalize_text(val, use_nfkc):
-            errs.append(f"entity[{i}] slice mismatch: text[{b}:{en}] != value")
+            errs.append(("SLICE_MISMATCH", f"entity[{i}] slice mismatch: text[{b}:{en}] != value", i, lab))
 
         # 허용 라벨
         if lab not in ALLOWED:
-            errs.append(f"entity[{i}] label not allowed: {lab}")
+            errs.append(("LABEL_NOT_ALLOWED", f"entity[{i}] label not allowed: {lab}", i, lab))
 
         # 공백/제어문자 경고
         if val != val.strip():
-            errs.append(f"entity[{i}] value has leading/trailing spaces")
+            errs.append(("VALUE_WHITESPACE", f"entity[{i}] value has leading/trailing spaces", i, lab))
         if CTRL_RE.search(val) or CTRL_RE.search(raw_slice):
-            errs.append(f"entity[{i}] value contains control chars")
+            errs.append(("CONTROL_CHARS", f"entity[{i}] value contains control chars", i, lab))
 
         # 정렬 경고
         if warn_sort and b < prev_begin:
-            errs.append("entities not sorted by begin offset")
+            errs.append(("UNSORTED", "entities not sorted by begin offset", i, lab))
         prev_begin = b
 
         # 중복/겹침 검사 준비
         key = (lab, b, en)
         if key in seen:
-            errs.append(f"duplicate entity (label,begin,end)={key}")
+            errs.append(("DUPLICATE", f"duplicate entity (label,begin,end)={key}", i, lab))
         seen.add(key)
-        spans_sorted.append((b, en))
+        spans_sorted.append((b, en, i, lab))
 
     # 겹침 검사
     spans_sorted.sort()
     if not allow_overlap:
         for j in range(len(spans_sorted) - 1):
-            b1, e1 = spans_sorted[j]
-            b2, e2 = spans_sorted[j + 1]
+            b1, e1 = spans_sorted[j][:2]
+            b2, e2, i2, lab2 = spans_sorted[j + 1]
             if b2 < e1:
-                errs.append(f"overlapping spans: [{b1},{e1}) & [{b2},{e2})")
+                errs.append(("OVERLAP", f"overlapping spans: [{b1},{e1}) & [{b2},{e2})", i2, lab2))
                 break
 
     # 본문 정규화 경고
     if text != unicodedata.normalize("NFC", text):
-        errs.append("WARNING: text not NFC-normalized (may cause offset drift)")
+        errs.append(("TEXT_NOT_NFC", "WARNING: text not NFC-normalized (may cause offset drift)", None, None))
     return errs
 
+def check_offsets(text, ents, **kw):
+    """offset_problems()의 메시지만 반환 (기존 호출부 호환)."""
+    return [msg for _, msg, _, _ in offset_problems(text, ents, **kw)]
+
+def row_checks(line: str):
+    """
+    한 줄의 구조 검사.
+    반환: (id, 앞 문제 목록, 엔티티 검사 대상 (text, entities) 또는 None, 뒤 문제 목록, 문제 행 카운트)
+    문제 항목은 (코드, 메시지, 라벨, 엔티티 인덱스).
+    """
+    pre, post = [], []
+    bad = 0
+    try:
+        row = json.loads(line)
+    except Exception as e:
+        return None, [("JSON_PARSE", f"JSON parse error: {e}", None, None)], None, post, 1
+    rid = row.get("id") if isinstance(row, dict) else None
+
+    # messages 구조
+    msgs = row.get("messages")
+    if not isinstance(msgs, list) or len(msgs) != 3:
+        return rid, [("MESSAGES_SHAPE", "messages must be list of length 3", None, None)], None, post, 1
+
+    roles = [m.get("role") for m in msgs]
+    if roles != ["system","user","assistant"]:
+        bad += 1
+        pre.append(("ROLE_ORDER", f"role order must be system,user,assistant (got {roles})", None, None))
+
+    for ri, m in enumerate(msgs):
+        if "content" not in m or not isinstance(m["content"], str):
+            bad += 1
+            pre.append(("CONTENT_NOT_STRING", f"messages[{ri}] missing content or not string", None, None))
+
+    # assistant.content 파싱
+    ac = msgs[2].get("content", "")
+    ans, err = parse_assistant_json(ac)
+    if err:
+        pre.append(("ASSISTANT_JSON", err, None, None))
+        return rid, pre, None, post, bad + 1
+
+    # 정답 JSON 스키마 검사
+    exp_keys = {"text","has_sensitive","entities"}
+    if set(ans.keys()) != exp_keys:
+        bad += 1
+        pre.append(("ASSISTANT_KEYS", f"assistant JSON keys must be {exp_keys} (got {set(ans.keys())})", None, None))
+
+    text_body = ans.get("text")
+    hs = ans.get("has_sensitive")
+    ents = ans.get("entities")
+
+    if not isinstance(text_body, str):
+        bad += 1
+        pre.append(("TEXT_TYPE", "'text' must be string", None, None))
+    if not isinstance(hs, bool):
+        bad += 1
+        pre.append(("HS_TYPE", "'has_sensitive' must be boolean", None, None))
+    if not isinstance(ents, list):
+        pre.append(("ENTITIES_TYPE", "'entities' must be list", None, None))
+        return rid, pre, None, post, bad + 1
+
+    # has_sensitive 논리 일치 (오프셋/라벨 검사 결과 뒤에 보고)
+    if (len(ents) > 0) != bool(hs):
+        bad += 1
+        post.append(("HS_MISMATCH", f"has_sensitive mismatch: entities={len(ents)} hs={hs}", None, None))
+    return rid, pre, (text_body, ents), post, bad
+
+def check_rows(text: str, opts, diag):
+    """
+    JSONL 텍스트 전체 검사. 문제마다 diag(line, id, code, message, label, entity) 호출, (total, bad) 반환.
+    opts.batch(행 수)가 있으면 엔티티 검사를 batch_validate.validate_batch()로 묶어서 수행 (출력 동일).
+    diag가 TooManyErrors를 올리면 그 시점까지의 (total, bad)를 담아 다시 올린다.
+    """
+    kw = dict(
+        use_nfkc=opts.nfkc,
+        allow_overlap=opts.allow_overlap,
+        strict_entity_keys=opts.strict_entity_keys,
+        warn_sort=not opts.no_sort_warn
+    )
+    batch = getattr(opts, "batch", None) or 1
+    if batch > 1:
+        from batch_validate import validate_batch
+    bad = 0
+    total = 0
+    pending = []   # (ln, id, pre, job, post, bad)
+
+    def flush():
+        nonlocal bad, total
+        jobs = [p[3] for p in pending if p[3] is not None]
+        if batch > 1:
+            results = iter(validate_batch(jobs, **kw))
+        else:
+            results = (offset_problems(text_body, ents, **kw) for text_body, ents in jobs)
+        for ln, rid, pre, job, post, b in pending:
+            # 오프셋/라벨 검사
+            errs = [(c, m, lab, i) for c, m, i, lab in next(results)] if job is not None else []
+            total += 1
+            bad += b + (1 if errs else 0)
+            for code, msg, lab, idx in pre + errs + post:
+                diag(ln, rid, code, msg, lab, idx)
+        pending.clear()
+
+    try:
+        for ln, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            pending.append((ln, *row_checks(line)))
+            if len(pending) >= batch:
+                flush()
+        flush()
+    except TooManyErrors as e:
+        e.args = (total, bad)
+        raise
+    return total, bad
+
+def check_text(text: str, opts, emit=print):
+    """JSONL 텍스트 전체 검사. 문제 메시지는 emit으로 전달, (total, bad) 반환."""
+    return check_rows(text, opts, lambda ln, rid, code, msg, label=None, entity=None: emit(f"[L{ln}] {msg}"))
+
+class Report:
+    """
+    구조화 리포트 수집기 (check_rows의 diag 콜백).
+    - 진단을 JSONL 줄로 모아 flush_every 건마다 한 번에 기록 (out이 None이면 집계만)
+    - 코드별 / 라벨별 / 코드×라벨 건수 집계
+    - max_errors 건에 도달하면 TooManyErrors
+    """
+
+    def __init__(self, out=None, max_errors=None, flush_every=10000):
+        self.out = out
+        self.max_errors = max_errors
+        self.flush_every = flush_every
+        self.file = None
+        self.count = 0
+        self.by_code = {}
+        self.by_label = {}
+        self.by_code_label = {}
+        self._buf = []
+
+    def __call__(self, ln, rid, code, msg, label=None, entity=None):
+        self.count += 1
+        self.by_code[code] = self.by_code.get(code, 0) + 1
+        if label is not None:
+            self.by_label[label] = self.by_label.get(label, 0) + 1
+            cl = self.by_code_label.setdefault(code, {})
+            cl[label] = cl.get(label, 0) + 1
+        if self.out is not None:
+            self._buf.append(json.dumps({
+                "file": self.file, "line": ln, "id": rid, "code": code,
+                "label": label, "entity": entity, "message": msg,
+            }, ensure_ascii=False) + "\n")
+            if len(self._buf) >= self.flush_every:
+                self.flush()
+        if self.max_errors and self.count >= self.max_errors:
+            raise TooManyErrors()
+
+    def flush(self):
+        if self.out is not None and self._buf:
+            self.out.writelines(self._buf)
+            self._buf.clear()
+
+    def summary(self, total, bad, stopped=False):
+        return {
+            "checked": total,
+            "problem_rows": bad,
+            "diagnostics": self.count,
+            "stopped_early": stopped,
+            "by_code": dict(sorted(self.by_code.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "by_label": dict(sorted(self.by_label.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "by_code_label": {c: dict(sorted(v.items())) for c, v in sorted(self.by_code_label.items())},
+        }
+
+def check_shard(path: str, opts):
+    """manifest 팬아웃용 워커: 샤드 1개 검사 → (total, bad, 진단 튜플 목록, 중단 여부)."""
+    diags = []
+
+    def collect(*d):
+        diags.append(d)
+        if opts.max_errors and len(diags) >= opts.max_errors:
+            raise TooManyErrors()
+
+    try:
+        total, bad = check_rows(read_text_safely(path), opts, collect)
+        return total, bad, diags, False
+    except TooManyErrors as e:
+        total, bad = e.args
+        return total, bad, diags, True
+
+def open_report(path):
+    if path == "-":
+        try:
+            sys.stdout.reconfigure(encoding="utf-8")
+        except Exception:
+            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+        return sys.stdout, False
+    return open(path, "w", encoding="utf-8", newline="\n"), True
+
 def main():
     ap = argparse.ArgumentParser(description="Dataset validator for messages JSONL")
-    ap.add_argument("path", nargs=1, help="input JSONL file")
+    ap.add_argument("path", nargs=1, help="input JSONL file (or shard manifest JSON)")
     ap.add_argument("--nfkc", action="store_true", help="use NFKC normalization for slice comparison (default NFC)")
     ap.add_argument("--allow-overlap", action="store_true", help="do not error on overlapping entity spans")
     ap.add_argument("--strict-entity-keys", action="store_true", help="error on extra/missing keys in entity objects")
     ap.add_argument("--no-sort-warn", action="store_true", help="disable sorted-by-begin warning")
+    ap.add_argument("--workers", type=int, default=None, help="manifest input: parallel workers (default: CPU count)")
+    ap.add_argument("--report", default=None,
+                    help="structured mode: write JSONL diagnostics {file,line,id,code,label,entity,message} here ('-' = stdout) "
+                         "instead of free-text lines")
+    ap.add_argument("--summary", default=None, help="write per-code / per-label summary JSON here ('-' = stdout)")
+    ap.add_argument("--max-errors", type=int, default=None, help="stop after this many diagnostics")
+    ap.add_argument("--batch", type=int, default=None, metavar="ROWS",
+                    help="validate entity spans ROWS rows at a time with vectorized NumPy checks (batch_validate.py)")
+    add_profile_args(ap)
     args = ap.parse_args()
 
     path = args.path[0]
@@ -182,84 +407,75 @@ def main():
     except Exception:
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-    text = read_text_safely(path)
-    for ln, line in enumerate(text.splitlines(), 1):
-        line = line.strip()
-        if not line:
-            continue
-        total += 1
-        try:
-            row = json.loads(line)
-        except Exception as e:
-            print(f"[L{ln}] JSON parse error: {e}")
-            bad += 1
-            continue
-
-        # messages 구조
-        msgs = row.get("messages")
-        if not isinstance(msgs, list) or len(msgs) != 3:
-            print(f"[L{ln}] messages must be list of length 3")
-            bad += 1
-            continue
-
-        roles = [m.get("role") for m in msgs]
-        if roles != ["system","user","assistant"]:
-            print(f"[L{ln}] role order must be system,user,assistant (got {roles})")
-            bad += 1
+    # 구조화 모드: JSONL 진단은 버퍼링해서 기록, 자유 텍스트 줄은 출력하지 않음
+    out, close_out = open_report(args.report) if args.report else (None, False)
+    rep = Report(out, args.max_errors)
+    text_mode = args.report is None
 
-        for ri, m in enumerate(msgs):
-            if "content" not in m or not isinstance(m["content"], str):
-                print(f"[L{ln}] messages[{ri}] missing content or not string")
-                bad += 1
+    def sink(name, prefix=""):
+        rep.file = name
+        if not text_mode:
+            return rep
 
-        # assistant.content 파싱
-        ac = msgs[2].get("content", "")
-        ans, err = parse_assistant_json(ac)
-        if err:
-            print(f"[L{ln}] {err}")
-            bad += 1
-            continue
-
-        # 정답 JSON 스키마 검사
-        exp_keys = {"text","has_sensitive","entities"}
-        if set(ans.keys()) != exp_keys:
-            print(f"[L{ln}] assistant JSON keys must be {exp_keys} (got {set(ans.keys())})")
-            bad += 1
-
-        text_body = ans.get("text")
-        hs = ans.get("has_sensitive")
-        ents = ans.get("entities")
+        def diag(ln, rid, code, msg, label=None, entity=None):
+            print(f"{prefix}[L{ln}] {msg}")
+            rep(ln, rid, code, msg, label, entity)
+        return diag
 
-        if not isinstance(text_body, str):
-            print(f"[L{ln}] 'text' must be string")
-            bad += 1
-        if not isinstance(hs, bool):
-            print(f"[L{ln}] 'has_sensitive' must be boolean")
-            bad += 1
-        if not isinstance(ents, list):
-            print(f"[L{ln}] 'entities' must be list")
-            bad += 1
-            continue
-
-        # 오프셋/라벨 검사
-        errs = check_offsets(
-            text_body, ents,
-            use_nfkc=args.nfkc,
-            allow_overlap=args.allow_overlap,
-            strict_entity_keys=args.strict_entity_keys,
-            warn_sort=not args.no_sort_warn
-        )
-        for e in errs:
-            print(f"[L{ln}] {e}")
-        if errs:
-            bad += 1
-
-        # has_sensitive 논리 일치
-        if (len(ents) > 0) != bool(hs):
-            print(f"[L{ln}] has_sensitive mismatch: entities={len(ents)} hs={hs}")
-            bad += 1
-
-    print(f"\nChecked {total} lines. Problems: {bad}")
+    stopped = False
+    prof = profiler_from_args(args, "check")
+    prof.start()
+    try:
+        if is_manifest(path):
+            # 샤드당 워커 1개로 검사 후 샤드 순서대로 출력
+            shards = manifest_shards(path)
+            with prof.stage("validate"):
+                results = map_shards(check_shard, shards, args.workers, args)
+            for shard, (t, b, diags, cut) in zip(shards, results):
+                total += t
+                bad += b
+                name = os.path.basename(shard)
+                d = sink(name, f"[{name}]")
+                for item in diags:
+                    d(*item)
+                if cut:
+                    raise TooManyErrors()
+        else:
+            with prof.stage("read"):
+                text = read_text_safely(path)
+            with prof.stage("validate"):
+                total, bad = check_rows(text, args, sink(path))
+    except TooManyErrors as e:
+        if e.args:
+            total, bad = e.args
+        stopped = True
+    finally:
+        with prof.stage("write"):
+            rep.flush()
+            if close_out:
+                out.close()
+    prof.tick(total)
+    prof.close()
+
+    summary = rep.summary(total, bad, stopped)
+    if args.summary:
+        text = json.dumps(summary, ensure_ascii=False, indent=2)
+        if args.summary == "-":
+            print(text)
+        else:
+            with open(args.summary, "w", encoding="utf-8", newline="\n") as f:
+                f.write(text + "\n")
+    elif not text_mode:
+        for code, n in summary["by_code"].items():
+            sys.stderr.write(f"[check] {code}: {n}\n")
+
+    if stopped:
+        sys.stderr.write(f"[check] --max-errors {args.max_errors} reached, stopped early\n")
+    msg = f"\nChecked {total} lines. Problems: {bad}"
+    if args.report == "-" or args.summary == "-":
+        sys.stderr.write(msg + "\n")
+    else:
+        print(msg)
     return 0 if bad == 0 else 1
 
 if __name__ == "__main__":
@@ -2,41 +2,21 @@
 # -*- coding: utf-8 -*-
 import sys, json, argparse, io, unicodedata
 
-def read_text_safely(path: str) -> str:
-    with open(path, "rb") as fb:
-        data = fb.read()
-    # BOM 감지
-    if data.startswith(b'\xef\xbb\xbf'):
-        return data.decode('utf-8-sig')
-    if data.startswith(b'\xff\xfe'):
-        return data.decode('utf-16')      # LE
-    if data.startswith(b'\xfe\xff'):
-        return data.decode('utf-16-be')   # BE
-    # 기본 UTF-8, 실패 시 CP949 폴백
-    try:
-        return data.decode('utf-8')
-    except UnicodeDecodeError:
-        return data.decode('cp949', errors='replace')
-
-def main():
-    ap = argparse.ArgumentParser(description="JSONL에서 id별 중요정보(entities) 개수 집계")
-    ap.add_argument("input", help="입력 JSONL 파일 경로")
-    args = ap.parse_args()
-
-    text = read_text_safely(args.input)
+from jsonl_io import expand_input, iter_raw_lines, map_shards
+from lazy_reader import assistant_view
+from instrument import add_profile_args, profiler_from_args
 
-    per_id = {}           # id -> count
-    groups = {}           # count -> [ids]
+def count_file(path: str):
+    """파일(샤드) 1개 집계 → ([(id, count)], total_entities, total_rows, bad_lines)."""
+    pairs = []            # (id, count), 라인 순서
     total_entities = 0
     total_rows = 0
     bad_lines = 0
 
-    for ln, line in enumerate(text.splitlines(), 1):
-        s = line.strip()
-        if not s:
-            continue
+    # UTF-8 줄은 bytes 그대로, id / messages[2]만 부분 디코딩 (레이아웃이 다르면 전체 파싱)
+    for s in iter_raw_lines(path):
         try:
-            row = json.loads(s)
+            row = assistant_view(s)
         except Exception:
             bad_lines += 1
             continue
@@ -60,11 +40,14 @@ def main():
             continue
 
         cnt = len(ents)
-        per_id[rid] = cnt
-        groups.setdefault(cnt, []).append(rid)
+        pairs.append((rid, cnt))
         total_entities += cnt
         total_rows += 1
 
+    return pairs, total_entities, total_rows, bad_lines
+
+def print_report(per_id, groups, total_entities, total_rows, bad_lines):
+    """id별 개수 / 요약 / 개수별 그룹 출력."""
     # 1) id별 개수 출력
     print("# id별 중요정보 엔티티 개수")
     for rid in sorted(per_id):
@@ -94,6 +77,37 @@ def main():
             ids = sorted(groups[k])
             print(f"- {k}개: {len(ids)}개 라인 | ids: {', '.join(map(str, ids))}")
 
+def main():
+    ap = argparse.ArgumentParser(description="JSONL에서 id별 중요정보(entities) 개수 집계")
+    ap.add_argument("input", help="입력 JSONL 파일 경로 (샤드 manifest JSON 가능)")
+    ap.add_argument("--workers", type=int, default=None, help="manifest 입력 시 샤드 병렬 워커 수 (기본: CPU 수)")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    prof = profiler_from_args(args, "count")
+    prof.start()
+
+    per_id = {}           # id -> count
+    groups = {}           # count -> [ids]
+    total_entities = 0
+    total_rows = 0
+    bad_lines = 0
+
+    # 읽기 + 파싱은 count_file 안에서 (manifest면 샤드별 워커)
+    with prof.stage("parse"):
+        results = map_shards(count_file, expand_input(args.input), args.workers)
+    for pairs, p_ents, p_rows, p_bad in results:
+        for rid, cnt in pairs:
+            per_id[rid] = cnt
+            groups.setdefault(cnt, []).append(rid)
+        total_entities += p_ents
+        total_rows += p_rows
+        bad_lines += p_bad
+
+    prof.tick(total_rows)
+    with prof.stage("write"):
+        print_report(per_id, groups, total_entities, total_rows, bad_lines)
+    prof.close()
+
 if __name__ == "__main__":
     # Windows 콘솔에서 출력 깨짐 방지(옵션)
     try:
@@ -0,0 +1,440 @@
+# dataset_index.py
+# -*- coding: utf-8 -*-
+"""
+빌드(JSONL)를 로컬 SQLite 색인으로 적재하고 라벨 / 조합 / 길이로 질의.
+
+테이블
+  files    : file_id, path(절대경로), size, mtime_ns, encoding, rows, bad_lines, indexed_at
+  records  : rowid, id, file_id, line(원본 줄 번호), offset / length(해제 후 바이트 위치 / 줄 바이트 수),
+             text_len(문자 수), has_sensitive(0/1, 값이 없으면 엔티티 유무), n_entities,
+             combo(중복 없는 라벨을 정렬해 '+'로 연결, 예: "CARD_CVV+MNEMONIC")
+  entities : rec(records.rowid), idx, label, begin, end, value_hash(blake2b 8바이트, signed int64)
+             WITHOUT ROWID, 기본키 (rec, idx)
+  인덱스   : records(id) / (text_len) / (combo) / (file_id), entities(label, rec) / (value_hash)
+
+index
+  - 입력 순서대로(glob은 패턴 안에서 정렬, manifest는 샤드로 펼침) 파일마다 한 트랜잭션
+  - 줄은 bytes 그대로 읽어 lazy_reader.assistant_view로 id / assistant만 디코딩, --workers면 배치를 워커에서 파싱
+  - 이미 색인된 파일은 크기 / mtime이 같으면 건너뛰고, 바뀌었으면(또는 --force) 그 파일 행만 지우고 다시 적재
+  - 처음 만드는 DB는 적재 후에 인덱스 생성 (대량 적재가 빠름)
+query
+  - --label A B : A와 B를 모두 포함 / --combo A B : 라벨 집합이 정확히 {A, B}
+  - --min-len / --max-len / --has-sensitive / --min-entities / --max-entities / --value / --id / --file
+  - 기본 출력은 id 목록, --count는 건수만, --raw는 offset으로 원본 줄을 찾아 JSONL로 스트리밍
+    (plain 파일은 seek, .gz/.zst는 해제하며 건너뜀, UTF-16은 줄 번호로; 색인 후 파일이 바뀌었으면 거부)
+
+사용 예:
+  python dataset_index.py index --db dataset.sqlite ../dataset_full_build_56000.jsonl --workers 4
+  python dataset_index.py query --db dataset.sqlite --label CARD_CVV MNEMONIC --min-len 300
+  python dataset_index.py query --db dataset.sqlite --combo PHONE EMAIL --has-sensitive true --raw --out subset.jsonl
+"""
+
+import io
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from jsonl_io import (SNIFF_SIZE, _sniff_encoding, compression_of, expand_ordered, imap_ordered, open_binary_read,
+                      open_binary_write, open_text_auto)
+from lazy_reader import assistant_view
+from profile_lengths import extract_record
+from instrument import add_profile_args, profiler_from_args
+
+SCHEMA_VERSION = 1
+BOM = b"\xef\xbb\xbf"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id     INTEGER PRIMARY KEY,
+    path        TEXT NOT NULL UNIQUE,
+    size        INTEGER,
+    mtime_ns    INTEGER,
+    encoding    TEXT,
+    rows        INTEGER,
+    bad_lines   INTEGER,
+    indexed_at  TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+    rowid         INTEGER PRIMARY KEY,
+    id,
+    file_id       INTEGER NOT NULL,
+    line          INTEGER NOT NULL,
+    offset        INTEGER,
+    length        INTEGER,
+    text_len      INTEGER,
+    has_sensitive INTEGER,
+    n_entities    INTEGER NOT NULL,
+    combo         TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    rec         INTEGER NOT NULL,
+    idx         INTEGER NOT NULL,
+    label       TEXT,
+    begin       INTEGER,
+    end         INTEGER,
+    value_hash  INTEGER,
+    PRIMARY KEY (rec, idx)
+) WITHOUT ROWID;
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS records_id ON records(id);
+CREATE INDEX IF NOT EXISTS records_text_len ON records(text_len);
+CREATE INDEX IF NOT EXISTS records_combo ON records(combo);
+CREATE INDEX IF NOT EXISTS records_file ON records(file_id);
+CREATE INDEX IF NOT EXISTS entities_label ON entities(label, rec);
+CREATE INDEX IF NOT EXISTS entities_value ON entities(value_hash);
+"""
+
+# ---------------- DB ----------------
+def open_db(path: str, create: bool = False) -> sqlite3.Connection:
+    if not create and not os.path.exists(path):
+        raise FileNotFoundError(f"색인 DB가 없음: {path} (먼저 index 실행)")
+    conn = sqlite3.connect(path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0 and create:
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    elif version != SCHEMA_VERSION:
+        conn.close()
+        raise ValueError(f"{path}: 색인 스키마 버전 {version} (지원: {SCHEMA_VERSION})")
+    return conn
+
+def value_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(),
+                          "little", signed=True)
+
+def file_fingerprint(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+# ---------------- index ----------------
+def iter_offset_lines(path: str) -> Tuple[str, Iterator[Tuple[int, Optional[int], Optional[int], bytes]]]:
+    """
+    (인코딩, (줄 번호, 시작 오프셋, 줄 바이트 수, 공백 제거한 UTF-8 줄) 이터레이터).
+    오프셋은 해제 후 바이트 기준, UTF-16 입력은 바이트로 줄을 자를 수 없으므로 None.
+    """
+    with open_binary_read(path) as fb:
+        enc = _sniff_encoding(fb.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+
+    def gen():
+        if enc.startswith("utf-16"):
+            with open_text_auto(path) as f:
+                for lineno, line in enumerate(f, 1):
+                    s = line.strip()
+                    if s:
+                        yield lineno, None, None, s.encode("utf-8")
+            return
+        with open_binary_read(path) as fb:
+            pos = 0
+            for lineno, raw in enumerate(fb, 1):
+                start, n = pos, len(raw)
+                pos += n
+                s = raw.strip()
+                if s[:3] == BOM:
+                    s = s[3:].strip()
+                if not s:
+                    continue
+                if enc == "cp949":
+                    s = s.decode("cp949", "replace").encode("utf-8")
+                yield lineno, start, n, s
+
+    return enc, gen()
+
+def iter_chunks(lines: Iterator[Tuple[int, Optional[int], Optional[int], bytes]], size: int):
+    chunk = []
+    for item in lines:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_chunk(chunk: List[Tuple[int, Optional[int], Optional[int], bytes]]):
+    """워커: 줄 배치 → ([(line, offset, length, id, text_len, hs, n_ent, combo, [(label, begin, end, vhash)])], 깨진 줄 수)."""
+    out = []
+    bad = 0
+    for lineno, offset, length, s in chunk:
+        try:
+            row = assistant_view(s)
+            text, hs, ents = extract_record(row)
+        except Exception:
+            bad += 1
+            continue
+        if text is None:
+            bad += 1
+            continue
+        erows = []
+        labels = set()
+        for e in ents:
+            if not isinstance(e, dict):
+                continue
+            label = e.get("label") if isinstance(e.get("label"), str) else None
+            b, en, v = e.get("begin"), e.get("end"), e.get("value")
+            erows.append((label,
+                          b if isinstance(b, int) else None,
+                          en if isinstance(en, int) else None,
+                          value_hash(v) if isinstance(v, str) else None))
+            if label:
+                labels.add(label)
+        if not isinstance(hs, bool):
+            hs = len(ents) > 0
+        out.append((lineno, offset, length, row.get("id"), len(text), int(hs), len(ents),
+                    "+".join(sorted(labels)), erows))
+    return out, bad
+
+def delete_file_rows(conn: sqlite3.Connection, file_id: int) -> None:
+    lo, hi = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM records WHERE file_id = ?", (file_id,)).fetchone()
+    if lo is not None:
+        # 한 파일의 행은 한 번에 적재되므로 rowid가 연속 → entities 기본키 (rec, idx) 범위 삭제
+        conn.execute("DELETE FROM entities WHERE rec BETWEEN ? AND ?", (lo, hi))
+        conn.execute("DELETE FROM records WHERE file_id = ?", (file_id,))
+
+def index_file(conn: sqlite3.Connection, path: str, args, prof) -> Optional[Tuple[int, int]]:
+    """파일 1개 적재 → (행 수, 깨진 줄 수). 변경 없어 건너뛰면 None."""
+    apath = os.path.abspath(path)
+    size, mtime_ns = file_fingerprint(apath)
+    old = conn.execute("SELECT file_id, size, mtime_ns FROM files WHERE path = ?", (apath,)).fetchone()
+    if old is not None and (old[1], old[2]) == (size, mtime_ns) and not args.force:
+        return None
+
+    enc, lines = iter_offset_lines(apath)
+    with conn:
+        if old is not None:
+            file_id = old[0]
+            delete_file_rows(conn, file_id)
+        else:
+            file_id = conn.execute("INSERT INTO files(path) VALUES (?)", (apath,)).lastrowid
+        next_rec = conn.execute("SELECT COALESCE(MAX(rowid), 0) + 1 FROM records").fetchone()[0]
+        rows = bad = 0
+        results = imap_ordered(parse_chunk, iter_chunks(lines, args.batch_size), args.workers)
+        for recs, nbad in prof.iter("parse", results):
+            with prof.stage("write"):
+                rec_rows = []
+                ent_rows = []
+                for i, (lineno, offset, length, rid, text_len, hs, n_ent, combo, erows) in enumerate(recs, next_rec):
+                    rec_rows.append((i, rid, file_id, lineno, offset, length, text_len, hs, n_ent, combo))
+                    ent_rows.extend((i, k) + er for k, er in enumerate(erows))
+                conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rec_rows)
+                conn.executemany("INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?)", ent_rows)
+            next_rec += len(recs)
+            rows += len(recs)
+            bad += nbad
+            prof.tick(len(recs))
+        conn.execute("UPDATE files SET size = ?, mtime_ns = ?, encoding = ?, rows = ?, bad_lines = ?, indexed_at = ? "
+                     "WHERE file_id = ?",
+                     (size, mtime_ns, enc, rows, bad, time.strftime("%Y-%m-%dT%H:%M:%S"), file_id))
+    return rows, bad
+
+def cmd_index(args) -> int:
+    paths = expand_ordered(args.inputs)
+    conn = open_db(args.db, create=True)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    prof = profiler_from_args(args, "index")
+    try:
+        with prof:
+            for p in paths:
+                res = index_file(conn, p, args, prof)
+                if res is None:
+                    sys.stderr.write(f"[index] {p}: 변경 없음, 건너뜀\n")
+                else:
+                    sys.stderr.write(f"[index] {p}: {res[0]}건" + (f" (깨진 줄 {res[1]})" if res[1] else "") + "\n")
+            with prof.stage("write"):
+                conn.executescript(INDEXES)
+                conn.execute("ANALYZE")
+        total = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        nfiles = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    finally:
+        conn.close()
+    sys.stderr.write(f"[index] 파일 {nfiles}개, 총 {total}건 → {args.db}\n")
+    return 0
+
+# ---------------- query ----------------
+def build_query(args) -> Tuple[str, List[Any]]:
+    """질의 옵션 → (WHERE 절, 파라미터)."""
+    where: List[str] = []
+    params: List[Any] = []
+    for label in args.label or []:
+        where.append("r.rowid IN (SELECT rec FROM entities WHERE label = ?)")
+        params.append(label)
+    if args.combo is not None:
+        where.append("r.combo = ?")
+        params.append("+".join(sorted(set(args.combo))))
+    for col, op, val in (("r.text_len", ">=", args.min_len), ("r.text_len", "<=", args.max_len),
+                         ("r.n_entities", ">=", args.min_entities), ("r.n_entities", "<=", args.max_entities)):
+        if val is not None:
+            where.append(f"{col} {op} ?")
+            params.append(val)
+    if args.has_sensitive is not None:
+        where.append("r.has_sensitive = ?")
+        params.append(1 if args.has_sensitive == "true" else 0)
+    for v in args.value or []:
+        where.append("r.rowid IN (SELECT rec FROM entities WHERE value_hash = ?)")
+        params.append(value_hash(v))
+    if args.id:
+        # id는 행의 JSON 타입 그대로 저장됨 (빌드: 정수, Test Dataset / make_answer_format: "5" 문자열)
+        # → 숫자 인자는 정수와 문자열 두 형태 모두로 찾는다
+        ids: List[Any] = []
+        for x in args.id:
+            if x.lstrip("-").isdigit():
+                ids.append(int(x))
+            ids.append(x)
+        where.append(f"r.id IN ({', '.join('?' * len(ids))})")
+        params.extend(ids)
+    if args.file:
+        where.append("r.file_id IN (SELECT file_id FROM files WHERE path LIKE ?)")
+        params.append(f"%{args.file}%")
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+def _decode_line(data: bytes, enc: str) -> bytes:
+    s = data.strip()
+    if s[:3] == BOM:
+        s = s[3:].strip()
+    if enc == "cp949":
+        s = s.decode("cp949", "replace").encode("utf-8")
+    return s
+
+def read_lines_at(path: str, enc: str, hits: List[Tuple[int, Optional[int], Optional[int]]]) -> Iterator[bytes]:
+    """
+    (줄 번호, 오프셋, 길이) 목록(파일 안 순서대로) → UTF-8 원본 줄.
+    plain 파일은 seek, 압축 파일은 해제하며 건너뜀, 오프셋이 없으면(UTF-16) 줄 번호로 찾음.
+    """
+    if not hits:
+        return
+    if hits[0][1] is None:
+        want = {h[0] for h in hits}
+        with open_text_auto(path) as f:
+            for lineno, line in enumerate(f, 1):
+                if lineno in want:
+                    yield line.strip().encode("utf-8")
+        return
+    with open_binary_read(path) as fb:
+        seekable = compression_of(path) is None
+        pos = 0
+        for _, offset, length in hits:
+            if seekable:
+                fb.seek(offset)
+            else:
+                while pos < offset:
+                    skipped = len(fb.read(min(offset - pos, 1 << 20)))
+                    if not skipped:
+                        raise ValueError(f"{path}: 오프셋 {offset}이 파일 끝을 넘음")
+                    pos += skipped
+            data = fb.read(length)
+            pos = offset + len(data)
+            yield _decode_line(data, enc)
+
+def stream_raw(conn: sqlite3.Connection, sql: str, params: List[Any], out) -> int:
+    """질의 결과(file_id, line, offset, length; 파일 / 줄 순서)를 원본 줄로 out에 기록. 기록한 줄 수 반환."""
+    files: Dict[int, Tuple[str, str, int, int]] = {
+        fid: (path, enc, size, mtime_ns)
+        for fid, path, enc, size, mtime_ns in conn.execute("SELECT file_id, path, encoding, size, mtime_ns FROM files")
+    }
+    n = 0
+    cur_fid: Optional[int] = None
+    hits: List[Tuple[int, Optional[int], Optional[int]]] = []
+
+    def flush():
+        nonlocal n
+        path, enc, size, mtime_ns = files[cur_fid]
+        if not os.path.exists(path) or file_fingerprint(path) != (size, mtime_ns):
+            raise ValueError(f"{path}: 색인 후 파일이 바뀌었거나 없음 (index를 다시 실행)")
+        for s in read_lines_at(path, enc, hits):
+            out.write(s + b"\n")
+            n += 1
+
+    for fid, lineno, offset, length in conn.execute(sql, params):
+        if fid != cur_fid and hits:
+            flush()
+            hits = []
+        cur_fid = fid
+        hits.append((lineno, offset, length))
+    if hits:
+        flush()
+    return n
+
+def cmd_query(args) -> int:
+    conn = open_db(args.db)
+    try:
+        where, params = build_query(args)
+        limit = f" LIMIT {int(args.limit)}" if args.limit else ""
+        if args.count:
+            print(conn.execute(f"SELECT COUNT(*) FROM records r{where}", params).fetchone()[0])
+            return 0
+        if args.raw:
+            sql = f"SELECT r.file_id, r.line, r.offset, r.length FROM records r{where} ORDER BY r.file_id, r.rowid{limit}"
+            out = open_binary_write(args.out) if args.out else sys.stdout.buffer
+            try:
+                n = stream_raw(conn, sql, params, out)
+            finally:
+                if args.out:
+                    out.close()
+                else:
+                    out.flush()
+            sys.stderr.write(f"[query] {n}건" + (f" → {args.out}" if args.out else "") + "\n")
+            return 0
+        sql = f"SELECT r.id FROM records r{where} ORDER BY r.file_id, r.rowid{limit}"
+        out = open(args.out, "w", encoding="utf-8", newline="\n") if args.out else sys.stdout
+        n = 0
+        try:
+            for (rid,) in conn.execute(sql, params):
+                out.write(f"{rid}\n")
+                n += 1
+        finally:
+            if args.out:
+                out.close()
+        sys.stderr.write(f"[query] {n}건\n")
+    finally:
+        conn.close()
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite index over JSONL builds: query by label / combination / length")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ip = sub.add_parser("index", help="JSONL → SQLite 색인 적재")
+    ip.add_argument("inputs", nargs="+", help="입력 JSONL (glob / 샤드 manifest 가능, 이 순서대로)")
+    ip.add_argument("--db", required=True, help="SQLite DB 경로 (없으면 생성)")
+    ip.add_argument("--force", action="store_true", help="변경 없는 파일도 다시 적재")
+    ip.add_argument("--workers", type=int, default=1, help="파싱 프로세스 수 (기본: 1 = 현재 프로세스)")
+    ip.add_argument("--batch-size", type=int, default=5000, help="워커에 보내는 줄 수 (기본: 5000)")
+    add_profile_args(ip)
+
+    qp = sub.add_parser("query", help="색인 질의 → id 목록 / 건수 / 원본 줄")
+    qp.add_argument("--db", required=True, help="SQLite DB 경로")
+    qp.add_argument("--label", nargs="+", default=None, help="이 라벨들을 모두 포함")
+    qp.add_argument("--combo", nargs="*", default=None, help="라벨 집합이 정확히 이것 (인자 없으면 엔티티 없는 행)")
+    qp.add_argument("--min-len", type=int, default=None, help="텍스트 길이(문자) 하한")
+    qp.add_argument("--max-len", type=int, default=None, help="텍스트 길이(문자) 상한")
+    qp.add_argument("--min-entities", type=int, default=None, help="엔티티 수 하한")
+    qp.add_argument("--max-entities", type=int, default=None, help="엔티티 수 상한")
+    qp.add_argument("--has-sensitive", choices=("true", "false"), default=None, help="has_sensitive 값")
+    qp.add_argument("--value", nargs="+", default=None, help="이 value를 가진 엔티티 포함 (해시 비교)")
+    qp.add_argument("--id", nargs="+", default=None, help="id 목록 (숫자는 정수 id와 문자열 id 모두 일치)")
+    qp.add_argument("--file", default=None, help="원본 파일 경로에 이 문자열 포함")
+    qp.add_argument("--limit", type=int, default=None, help="최대 결과 수")
+    qp.add_argument("--count", action="store_true", help="건수만 출력")
+    qp.add_argument("--raw", action="store_true", help="원본 JSONL 줄 출력 (offset으로 직접 읽음)")
+    qp.add_argument("--out", default=None, help="출력 경로 (기본 stdout, --raw면 .gz/.zst 가능)")
+    args = ap.parse_args()
+
+    for stream in ("stdout", "stderr"):
+        try:
+            getattr(sys, stream).reconfigure(encoding="utf-8")
+        except Exception:
+            setattr(sys, stream, io.TextIOWrapper(getattr(sys, stream).buffer, encoding="utf-8"))
+
+    try:
+        return cmd_index(args) if args.command == "index" else cmd_query(args)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"[에러] {e}\n")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+# dedup_jsonl.py
+# -*- coding: utf-8 -*-
+"""
+(user text, 정렬된 entities) 기준 정확 중복 제거.
+
+- 키: NFC 정규화한 user 텍스트 + (begin,end,label,value) 정렬 목록을 직렬화 → blake2b 8바이트
+- 해시 저장소: mmap 기반 open-addressing 해시 테이블 파일(DiskHashSet)
+    슬롯 24바이트 = key(u64, 0은 빈칸) + 최초 등장 출력 id(i64) + 입력 파일 번호(u32) + 줄 번호(u32)
+    → 빌드가 커져도 메모리는 OS 페이지 캐시 수준으로 제한됨
+    파일 번호 → 경로 목록은 --store 지정 시 <store>.files.json에 함께 보존
+- 중복 행은 출력에서 빠지고 리포트 JSONL에 기록 (first는 출력 id, dup은 입력 id → id 공간을 섞지 않음)
+    {"first": {"id", "file", "line"}, "dup": {"input_id", "file", "line"}, "key"}
+
+build_dataset_jsonl.py --dedup 에서 Deduper를 사용하며, 이미 만들어진 빌드는 단독 실행:
+  python dedup_jsonl.py input.jsonl output.jsonl --report dups.jsonl
+"""
+
+import os
+import io
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+import tempfile
+import unicodedata
+from typing import Any, Dict, Optional, TextIO, Tuple
+
+from jsonl_io import open_text_auto, open_text_write
+from instrument import add_profile_args, profiler_from_args
+
+# ------------------------- On-disk hash table -----------------------------
+_MAGIC = b"DDHS"
+_HEADER = struct.Struct("<4sIQQ")    # magic, version, capacity, count
+_SLOT = struct.Struct("<QqII")       # key, 출력 id, 파일 번호, 줄 번호
+_VERSION = 2
+_HEADER_SIZE = 32
+_NO_ID = -1
+_NO_FILE = 0xFFFFFFFF               # 파일 / 줄 모름 (줄 번호는 0)
+
+Location = Tuple[int, int, int]      # (출력 id, 파일 번호, 줄 번호)
+
+class DiskHashSet:
+    """
+    u64 키 → (i64, u32, u32) 값 매핑을 파일에 두는 선형 탐사 해시 테이블.
+    load factor가 max_load를 넘으면 용량을 2배로 늘려 재해시(새 파일 작성 후 교체).
+    """
+
+    def __init__(self, path: str, capacity: int = 1 << 16, max_load: float = 0.7):
+        self.path = path
+        self.max_load = max_load
+        if os.path.exists(path) and os.path.getsize(path) >= _HEADER_SIZE:
+            self._open()
+        else:
+            cap = 1
+            while cap < capacity:
+                cap <<= 1
+            self._create(path, cap)
+            self._open()
+
+    # -- 파일 관리 --
+    @staticmethod
+    def _create(path: str, capacity: int) -> None:
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, capacity, 0).ljust(_HEADER_SIZE, b"\0"))
+            f.truncate(_HEADER_SIZE + capacity * _SLOT.size)
+
+    def _open(self) -> None:
+        self._f = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._f.fileno(), 0)
+        magic, ver, cap, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"not a dedup hash file: {self.path}")
+        if ver != _VERSION:
+            raise ValueError(f"dedup hash file version {ver} (expected {_VERSION}), rebuild it: {self.path}")
+        self.capacity, self.count = cap, count
+        self._mask = cap - 1
+
+    def close(self) -> None:
+        if getattr(self, "_mm", None) is not None:
+            _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, self.capacity, self.count)
+            self._mm.flush()
+            self._mm.close()
+            self._f.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    # -- 조회/삽입 --
+    def _probe(self, key: int) -> int:
+        """key가 있는 슬롯 또는 들어갈 빈 슬롯의 오프셋."""
+        mm, mask = self._mm, self._mask
+        i = key & mask
+        while True:
+            off = _HEADER_SIZE + i * _SLOT.size
+            k = _SLOT.unpack_from(mm, off)[0]
+            if k == 0 or k == key:
+                return off
+            i = (i + 1) & mask
+
+    def get(self, key: int) -> Optional[Location]:
+        k, *v = _SLOT.unpack_from(self._mm, self._probe(key or 1))
+        return tuple(v) if k else None
+
+    def put(self, key: int, value: Location) -> None:
+        key = key or 1  # 0은 빈 슬롯 표시용
+        if (self.count + 1) > self.capacity * self.max_load:
+            self._grow()
+        off = self._probe(key)
+        if _SLOT.unpack_from(self._mm, off)[0] == 0:
+            self.count += 1
+        _SLOT.pack_into(self._mm, off, key, *value)
+
+    def _grow(self) -> None:
+        new_path = self.path + ".grow"
+        new_cap = self.capacity * 2
+        self._create(new_path, new_cap)
+        with open(new_path, "r+b") as nf:
+            nm = mmap.mmap(nf.fileno(), 0)
+            mask = new_cap - 1
+            for i in range(self.capacity):
+                slot = _SLOT.unpack_from(self._mm, _HEADER_SIZE + i * _SLOT.size)
+                if not slot[0]:
+                    continue
+                j = slot[0] & mask
+                while _SLOT.unpack_from(nm, _HEADER_SIZE + j * _SLOT.size)[0]:
+                    j = (j + 1) & mask
+                _SLOT.pack_into(nm, _HEADER_SIZE + j * _SLOT.size, *slot)
+            _HEADER.pack_into(nm, 0, _MAGIC, _VERSION, new_cap, self.count)
+            nm.flush()
+            nm.close()
+        self.close()
+        os.replace(new_path, self.path)
+        self._open()
+
+# ---------------------------- Canonical key -------------------------------
+def canonical_key(user_text: str, assist_obj: Dict[str, Any]) -> int:
+    """(NFC user text, 정렬된 entities) → u64 해시."""
+    ents = assist_obj.get("entities") if isinstance(assist_obj, dict) else None
+    spans = []
+    for e in ents if isinstance(ents, list) else []:
+        if isinstance(e, dict):
+            spans.append((e.get("begin"), e.get("end"), str(e.get("label")), str(e.get("value"))))
+    spans.sort(key=lambda t: (str(t[0]), str(t[1]), t[2], t[3]))
+    payload = json.dumps(
+        [unicodedata.normalize("NFC", user_text or ""), spans],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return int.from_bytes(hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest(), "little")
+
+class Deduper:
+    """
+    빌드 파이프라인용 중복 필터.
+      check(key, rec_id, file, line) → 처음 보면 True(유지), 중복이면 리포트 기록 후 False
+    최초 등장 행의 출력 id와 입력 파일 / 줄을 함께 저장해 리포트에서 두 행의 출처를 같이 보여준다.
+    store 경로를 지정하지 않으면 임시 파일을 쓰고 close()에서 삭제.
+    """
+
+    def __init__(self, store_path: Optional[str] = None, report_path: Optional[str] = None):
+        self._tmp = None
+        if store_path is None:
+            fd, store_path = tempfile.mkstemp(prefix="dedup_", suffix=".hset")
+            os.close(fd)
+            os.remove(store_path)
+            self._tmp = store_path
+        self.store = DiskHashSet(store_path)
+        self._files_path = store_path + ".files.json"
+        self.files = []     # 파일 번호 → 입력 경로
+        if self._tmp is None and os.path.exists(self._files_path):
+            with open(self._files_path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+        self._file_no = {p: i for i, p in enumerate(self.files)}
+        self.report: Optional[TextIO] = open(report_path, "w", encoding="utf-8", newline="\n") if report_path else None
+        self.kept = 0
+        self.dropped = 0
+
+    def seen(self, key: int) -> Optional[Location]:
+        """이미 본 키면 최초 행의 (출력 id(정수가 아니면 -1), 파일 번호, 줄 번호), 아니면 None."""
+        return self.store.get(key)
+
+    def add(self, key: int, rec_id: Any, file: Optional[str] = None, line: Optional[int] = None) -> None:
+        if file is None:
+            no = _NO_FILE
+        else:
+            no = self._file_no.get(file)
+            if no is None:
+                no = self._file_no[file] = len(self.files)
+                self.files.append(file)
+        self.store.put(key, (rec_id if isinstance(rec_id, int) else _NO_ID, no, line or 0))
+        self.kept += 1
+
+    def record_dup(self, key: int, first: Location, rec_id: Any,
+                   file: Optional[str] = None, line: Optional[int] = None) -> None:
+        """first: seen()이 돌려준 최초 행 위치, rec_id / file / line: 버려지는 중복 행의 입력 id와 위치."""
+        self.dropped += 1
+        if self.report:
+            first_id, no, first_line = first
+            self.report.write(json.dumps({
+                "first": {
+                    "id": None if first_id == _NO_ID else first_id,
+                    "file": self.files[no] if no < len(self.files) else None,
+                    "line": first_line or None,
+                },
+                "dup": {"input_id": rec_id, "file": file, "line": line},
+                "key": f"{key:016x}",
+            }, ensure_ascii=False) + "\n")
+
+    def check(self, key: int, rec_id: Any, file: Optional[str] = None, line: Optional[int] = None) -> bool:
+        first = self.seen(key)
+        if first is not None:
+            self.record_dup(key, first, rec_id, file, line)
+            return False
+        self.add(key, rec_id, file, line)
+        return True
+
+    def close(self) -> None:
+        self.store.close()
+        if self._tmp is None:
+            with open(self._files_path, "w", encoding="utf-8", newline="\n") as f:
+                json.dump(self.files, f, ensure_ascii=False)
+        if self.report:
+            self.report.close()
+            self.report = None
+        if self._tmp and os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+# ------------------------------ IO helpers --------------------------------
+def row_user_assistant(row: Dict[str, Any]):
+    """messages 포맷 또는 content/entities 포맷에서 (user, assistant_obj) 추출."""
+    msgs = row.get("messages")
+    if isinstance(msgs, list) and len(msgs) >= 3:
+        ac = msgs[2].get("content", "") if isinstance(msgs[2], dict) else ""
+        ans = json.loads(ac) if isinstance(ac, str) else ac
+        return msgs[1].get("content"), ans if isinstance(ans, dict) else {}
+    if "content" in row:
+        return row["content"], {"entities": row.get("entities", [])}
+    return None, {}
+
+def main():
+    ap = argparse.ArgumentParser(description="Exact (text, entities) dedup for JSONL with on-disk hash set")
+    ap.add_argument("input", help="입력 JSONL (messages 또는 content/entities 포맷)")
+    ap.add_argument("output", help="출력 JSONL (중복 제거)")
+    ap.add_argument("--report", default=None, help="중복 리포트 JSONL 경로")
+    ap.add_argument("--store", default=None, help="해시 테이블 파일 경로 (지정 시 보존 → 다음 빌드와 누적 비교 가능)")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    dd = Deduper(args.store, args.report)
+    prof = profiler_from_args(args, "dedup")
+    bad = 0
+    try:
+        with open_text_auto(args.input) as fin, open_text_write(args.output) as fout, prof:
+            for ln, line in enumerate(prof.iter("read", fin), 1):
+                raw = line.rstrip("\n")
+                if not raw.strip():
+                    continue
+                prof.tick()
+                try:
+                    with prof.stage("parse"):
+                        row = json.loads(raw)
+                        user, ans = row_user_assistant(row)
+                except Exception:
+                    # 파싱 불가 줄은 판단하지 않고 그대로 통과
+                    bad += 1
+                    fout.write(raw + "\n")
+                    continue
+                with prof.stage("fix"):
+                    keep = user is None or dd.check(canonical_key(user, ans), row.get("id"), args.input, ln)
+                if keep:
+                    with prof.stage("write"):
+                        fout.write(raw + "\n")
+    finally:
+        dd.close()
+
+    sys.stderr.write(f"[dedup] kept={dd.kept} dropped={dd.dropped} unparsed={bad}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# evaluate.py
+# -*- coding: utf-8 -*-
+"""
+예측 JSONL을 Test_Dataset_500_Answer_Format 정답과 id로 조인해 스팬 단위로 채점.
+
+- 정답 / 예측 모두 {"id", "answer"}(answer는 JSON 문자열 또는 객체) / messages / content 포맷 허용
+  (id는 문자열로 맞춰 조인, 예측은 스트리밍)
+- 지표
+    exact   : (begin, end, label) 완전 일치
+    overlap : 같은 라벨끼리 스팬이 겹치면 일치 (1:1 그리디 매칭)
+    → 라벨별 / README id 구간별 / 전체(micro, 라벨 macro F1)의 P / R / F1
+    has_sensitive 정확도 (예측에 has_sensitive가 없으면 entities 유무로 판단)
+- id 구간 (README Test Dataset):
+    1~62 단일 엔티티 / 63~262 100자 이내 / 263~412 200자 이내 / 413~440 500자 이내
+    441~450 1000자 이내 / 451~500 중요정보 미포함 / 그 외 other
+- 예측 answer는 parse_predictions로 관대하게 파싱 (코드 펜스 / 후행 쉼표 / 잡담 보정,
+  정답 text 기준 오프셋 재정렬), ok / repaired / failed 비율을 리포트에 기록 (--strict: 보정 없이 채점)
+- 같은 id의 예측이 여러 행이면 마지막 성공 답(없으면 첫 행) 하나만 채점, 나머지는 duplicate_predictions
+- 예측이 manifest면 샤드당 워커 1개로 파싱 후 합산 (--workers, 샤드를 넘는 중복 id도 위 규칙으로 정리)
+- 결과 JSON 리포트 (--report, 미지정 시 stdout) → 회귀 추적용
+
+사용 예:
+  python evaluate.py --gold "../Test Dataset/Test_Dataset_500_Answer_Format.jsonl" --pred predictions.jsonl --report eval.json
+"""
+
+import io
+import sys
+import json
+import argparse
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonl_io import expand_input, map_shards, open_text_auto
+from instrument import add_profile_args, profiler_from_args
+from lazy_reader import assistant_view
+from profile_lengths import extract_text_entities
+from parse_predictions import ParseStats, parse_prediction, raw_output
+
+# README Test Dataset id 구간
+ID_BUCKETS = (
+    (1, 62, "single_entity"),
+    (63, 262, "len_100"),
+    (263, 412, "len_200"),
+    (413, 440, "len_500"),
+    (441, 450, "len_1000"),
+    (451, 500, "negative"),
+)
+OTHER_BUCKET = "other"
+
+Span = Tuple[int, int, str]
+
+def id_bucket(rec_id: str) -> str:
+    try:
+        n = int(rec_id)
+    except (TypeError, ValueError):
+        return OTHER_BUCKET
+    for lo, hi, name in ID_BUCKETS:
+        if lo <= n <= hi:
+            return name
+    return OTHER_BUCKET
+
+def to_spans(ents: List[Any]) -> Tuple[List[Span], int]:
+    """엔티티 목록 → 유효 스팬 목록, 무효 엔티티 수 (begin/end 정수, label 문자열이 아니면 무효)."""
+    spans: List[Span] = []
+    invalid = 0
+    for e in ents:
+        if isinstance(e, dict) and isinstance(e.get("begin"), int) and isinstance(e.get("end"), int) \
+                and isinstance(e.get("label"), str):
+            spans.append((e["begin"], e["end"], e["label"]))
+        else:
+            invalid += 1
+    return spans, invalid
+
+def read_record(row: Dict[str, Any]) -> Tuple[Optional[List[Span]], Optional[bool], int]:
+    """행 → (스팬 목록, has_sensitive, 무효 엔티티 수). 파싱 불가면 스팬 None."""
+    text, ents = extract_text_entities(row)
+    ans = row.get("answer")
+    if isinstance(ans, str):
+        try:
+            ans = json.loads(ans)
+        except Exception:
+            return None, None, 0
+    if text is None and not isinstance(ans, dict):
+        return None, None, 0
+    spans, invalid = to_spans(ents)
+    hs = ans.get("has_sensitive") if isinstance(ans, dict) else row.get("has_sensitive")
+    if not isinstance(hs, bool):
+        hs = len(ents) > 0
+    return spans, hs, invalid
+
+def read_prediction(row: Dict[str, Any], text: str, stats: ParseStats) -> Tuple[Optional[List[Span]], Optional[bool], int]:
+    """예측 행 → read_record와 같은 형태. 모델 출력은 보정 파싱 후 정답 text 기준으로 재정렬."""
+    obj = parse_prediction(raw_output(row), text, stats)
+    if obj is None:
+        return None, None, 0
+    ents = obj.get("entities")
+    if not isinstance(ents, list):
+        ents = []
+    spans, invalid = to_spans(ents)
+    hs = obj.get("has_sensitive")
+    if not isinstance(hs, bool):
+        hs = len(ents) > 0
+    return spans, hs, invalid
+
+def match_exact(gold: List[Span], pred: List[Span]) -> Counter:
+    """라벨별 exact 일치 수."""
+    common = Counter(gold) & Counter(pred)
+    out: Counter = Counter()
+    for (_, _, lab), n in common.items():
+        out[lab] += n
+    return out
+
+def match_overlap(gold: List[Span], pred: List[Span]) -> Counter:
+    """라벨별 overlap 일치 수 (예측마다 겹치는 첫 미매칭 정답 1개)."""
+    out: Counter = Counter()
+    used = [False] * len(gold)
+    gs = sorted(range(len(gold)), key=lambda i: gold[i])
+    for pb, pe, plab in sorted(pred):
+        for i in gs:
+            gb, ge, glab = gold[i]
+            if not used[i] and glab == plab and gb < pe and pb < ge:
+                used[i] = True
+                out[plab] += 1
+                break
+    return out
+
+class Tally:
+    """채점 카운터: (지표, 그룹, 키) → [tp, fp, fn], has_sensitive 혼동행렬."""
+
+    def __init__(self):
+        self.prf: Dict[Tuple[str, str, str], List[int]] = {}
+        self.hs: Dict[str, List[int]] = {}     # 구간 → [tp, fp, fn, tn]
+        self.rows = 0
+        self.parse_fail = 0
+        self.invalid_entities = 0
+        self.parse = ParseStats()
+
+    def _add(self, metric: str, group: str, key: str, tp: int, fp: int, fn: int) -> None:
+        c = self.prf.setdefault((metric, group, key), [0, 0, 0])
+        c[0] += tp
+        c[1] += fp
+        c[2] += fn
+
+    def add_row(self, bucket: str, gold: List[Span], gold_hs: bool,
+                pred: List[Span], pred_hs: Optional[bool]) -> None:
+        self.rows += 1
+        g_lab = Counter(lab for _, _, lab in gold)
+        p_lab = Counter(lab for _, _, lab in pred)
+        for metric, hit in (("exact", match_exact(gold, pred)), ("overlap", match_overlap(gold, pred))):
+            for lab in set(g_lab) | set(p_lab):
+                tp = hit[lab]
+                fp, fn = p_lab[lab] - tp, g_lab[lab] - tp
+                self._add(metric, "label", lab, tp, fp, fn)
+                self._add(metric, "bucket", bucket, tp, fp, fn)
+                self._add(metric, "all", "micro", tp, fp, fn)
+        for key in (bucket, "all"):
+            c = self.hs.setdefault(key, [0, 0, 0, 0])
+            if pred_hs is None:
+                c[2 if gold_hs else 1] += 1   # 예측 없음/파싱 실패 = 오답
+            elif gold_hs:
+                c[0 if pred_hs else 2] += 1
+            else:
+                c[1 if pred_hs else 3] += 1
+
+def prf(tp: int, fp: int, fn: int) -> Dict[str, Any]:
+    p = tp / (tp + fp) if tp + fp else 0.0
+    r = tp / (tp + fn) if tp + fn else 0.0
+    f = 2 * p * r / (p + r) if p + r else 0.0
+    return {"tp": tp, "fp": fp, "fn": fn,
+            "precision": round(p, 6), "recall": round(r, 6), "f1": round(f, 6)}
+
+def hs_stats(c: List[int]) -> Dict[str, Any]:
+    tp, fp, fn, tn = c
+    n = tp + fp + fn + tn
+    return {"n": n, "tp": tp, "fp": fp, "fn": fn, "tn": tn, "accuracy": round((tp + tn) / n, 6) if n else 0.0}
+
+def load_gold(path: str) -> Dict[str, Tuple[List[Span], bool, Optional[str]]]:
+    gold: Dict[str, Tuple[List[Span], bool, Optional[str]]] = {}
+    for p in expand_input(path):
+        with open_text_auto(p) as f:
+            for ln, line in enumerate(f, 1):
+                s = line.strip()
+                if not s:
+                    continue
+                row = assistant_view(s)
+                spans, hs, invalid = read_record(row)
+                if spans is None or invalid:
+                    raise ValueError(f"{p}:{ln} gold row is not a valid answer record")
+                gold[str(row.get("id"))] = (spans, hs, extract_text_entities(row)[0])
+    return gold
+
+Scored = Tuple[bool, List[Span], Optional[bool], int]    # (파싱 성공, 스팬, has_sensitive, 무효 엔티티 수)
+
+def pick(picks: Dict[str, Scored], rid: str, res: Scored) -> None:
+    """같은 id의 예측이 여러 번이면 마지막 성공 답을, 성공이 없으면 첫 행을 남긴다."""
+    if res[0] or rid not in picks:
+        picks[rid] = res
+
+def score_shard(pred_path: str, gold_path: str, strict: bool = False):
+    """
+    워커: 예측 샤드 1개 파싱 → (id별 선택된 결과, id별 예측 행 수, 정답 없는 예측 id 목록, 깨진 줄 수, ParseStats).
+    채점(Tally 집계)은 샤드 간 중복 id까지 정리한 뒤 main에서 id당 한 번만 한다.
+    """
+    gold = load_gold(gold_path)
+    stats = ParseStats()
+    picks: Dict[str, Scored] = {}
+    counts: Counter = Counter()
+    unmatched: List[str] = []
+    bad_lines = 0
+    with open_text_auto(pred_path) as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                row = assistant_view(s)
+            except Exception:
+                bad_lines += 1
+                continue
+            rid = str(row.get("id"))
+            g = gold.get(rid)
+            if g is None:
+                unmatched.append(rid)
+                continue
+            counts[rid] += 1
+            if strict:
+                spans, hs, invalid = read_record(row)
+            else:
+                spans, hs, invalid = read_prediction(row, g[2], stats)
+            pick(picks, rid, (spans is not None, spans or [], hs, invalid))
+    return picks, counts, unmatched, bad_lines, stats
+
+def build_report(tally: Tally, gold_path: str, pred_path: str, missing: List[str],
+                 duplicates: int, unmatched: List[str]) -> Dict[str, Any]:
+    def group(metric: str, name: str) -> Dict[str, Any]:
+        return {k: prf(*v) for (m, g, k), v in sorted(tally.prf.items()) if m == metric and g == name}
+
+    out: Dict[str, Any] = {
+        "gold": gold_path,
+        "pred": pred_path,
+        "rows_scored": tally.rows,
+        "missing_predictions": len(missing),
+        "missing_ids": missing[:50],
+        "duplicate_predictions": duplicates,
+        "unmatched_predictions": len(unmatched),
+        "parse_fail": tally.parse_fail,
+        "prediction_parse": tally.parse.summary(),
+        "invalid_pred_entities": tally.invalid_entities,
+        "has_sensitive": {k: hs_stats(v) for k, v in sorted(tally.hs.items())},
+    }
+    for metric in ("exact", "overlap"):
+        labels = group(metric, "label")
+        out[metric] = {
+            "micro": prf(*tally.prf.get((metric, "all", "micro"), [0, 0, 0])),
+            "macro_f1": round(sum(v["f1"] for v in labels.values()) / len(labels), 6) if labels else 0.0,
+            "per_label": labels,
+            "per_bucket": group(metric, "bucket"),
+        }
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Span-level evaluation of predictions against answer-format gold")
+    ap.add_argument("--gold", required=True, help="정답 JSONL (Test_Dataset_500_Answer_Format.jsonl 등)")
+    ap.add_argument("--pred", required=True, help="예측 JSONL 또는 샤드 manifest ({id, answer})")
+    ap.add_argument("--report", default=None, help="결과 JSON 경로 (미지정 시 stdout)")
+    ap.add_argument("--workers", type=int, default=None, help="manifest 예측: 병렬 워커 수 (기본: CPU 수)")
+    ap.add_argument("--strict", action="store_true", help="예측 보정 파싱 / 오프셋 재정렬 없이 그대로 채점")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    prof = profiler_from_args(args, "eval")
+    prof.start()
+    with prof.stage("read"):
+        gold = load_gold(args.gold)
+    tally = Tally()
+    picks: Dict[str, Scored] = {}
+    seen: Counter = Counter()
+    unmatched: List[str] = []
+    # 샤드 순서대로 합쳐 id당 예측 1개 선택 (샤드를 넘나드는 중복도 같은 규칙)
+    # 워커의 읽기 / 파싱 시간은 결과를 기다리는 parse 단계로 잡힘
+    shards = map_shards(score_shard, expand_input(args.pred), args.workers, args.gold, args.strict)
+    for sp, counts, um, bad, stats in prof.iter("parse", shards):
+        prof.tick(sum(counts.values()) + len(um) + bad)
+        for rid, res in sp.items():
+            pick(picks, rid, res)
+        seen.update(counts)
+        unmatched.extend(um)
+        tally.parse_fail += bad
+        tally.parse.merge(stats)
+
+    with prof.stage("validate"):
+        for rid, (ok, spans, hs, invalid) in picks.items():
+            if not ok:
+                tally.parse_fail += 1
+            tally.invalid_entities += invalid
+            tally.add_row(id_bucket(rid), gold[rid][0], gold[rid][1], spans, hs)
+
+        # 예측이 없는 정답은 전부 놓친 것으로 집계
+        missing = [rid for rid in gold if rid not in picks]
+        for rid in missing:
+            tally.add_row(id_bucket(rid), gold[rid][0], gold[rid][1], [], None)
+    duplicates = sum(n - 1 for n in seen.values() if n > 1)
+
+    report = build_report(tally, args.gold, args.pred, missing, duplicates, unmatched)
+    with prof.stage("serialize"):
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+    with prof.stage("write"):
+        if args.report:
+            with open(args.report, "w", encoding="utf-8", newline="\n") as f:
+                f.write(text + "\n")
+        else:
+            try:
+                sys.stdout.reconfigure(encoding="utf-8")
+            except Exception:
+                sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+            print(text)
+    prof.close()
+
+    ex, ov, hs = report["exact"]["micro"], report["overlap"]["micro"], report["has_sensitive"].get("all")
+    sys.stderr.write(
+        f"[eval] rows={tally.rows} exact P/R/F1={ex['precision']:.4f}/{ex['recall']:.4f}/{ex['f1']:.4f} "
+        f"overlap F1={ov['f1']:.4f} has_sensitive acc={hs['accuracy'] if hs else 0:.4f} "
+        f"missing={len(missing)} parse_fail={tally.parse_fail}\n"
+    )
+    if not args.strict:
+        ps = report["prediction_parse"]
+        sys.stderr.write(
+            f"[eval] pred parse ok={ps['ok']} repaired={ps['repaired']} failed={ps['failed']} "
+            f"realigned={ps['realigned_entities']} {ps['ms_per_1000_rows']}ms/1000 rows\n"
+        )
+
+if __name__ == "__main__":
+    main()
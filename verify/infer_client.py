@@ -0,0 +1,338 @@
+# infer_client.py
+# -*- coding: utf-8 -*-
+"""
+OpenAI 호환 /v1/chat/completions 엔드포인트용 asyncio 배치 추론 클라이언트 (표준 라이브러리만 사용).
+
+- 프롬프트: SYSTEM_TEXT(build_dataset_jsonl.py) + 입력 행의 user 텍스트
+    입력은 Test_Dataset_500_Prompt_Format {"id", "text"} / content / messages 포맷
+- --concurrency 개의 keep-alive 연결로 동시 요청, 입력은 --batch-size 행씩 읽어 투입
+  (chat completions는 요청 하나에 프롬프트 하나 → 배치는 투입/기록 단위, 배치마다 출력 flush)
+- 429 / 5xx / 연결 오류는 지수 백오프(+지터, Retry-After 존중)로 --retries 회까지 재시도
+- 결과는 완료 순서대로 예측 JSONL로 스트리밍: {"id", "answer", "latency_ms", "attempts"}
+  실패 행은 {"id", "error", "attempts"} (evaluate.py에서는 파싱 실패로 집계)
+- --resume: 기존 출력에서 실패 행 / 잘린 줄을 지우고(임시 파일 → os.replace) answer 없는 id만 다시 요청해 이어쓰기
+- 요청별 지연 시간 히스토그램(2배 간격 ms 구간) + p50/p90/p99, 처리량(req/s)을 stderr / --stats JSON으로
+
+오프라인 테스트 / 처리량 측정은 stub_server.py와 함께:
+  python stub_server.py --gold "../Test Dataset/Test_Dataset_500_Answer_Format.jsonl" --port 8000 &
+  python infer_client.py --input "../Test Dataset/Test_Dataset_500_Prompt_Format.jsonl" \\
+      --url http://127.0.0.1:8000/v1/chat/completions --out predictions.jsonl --concurrency 32
+  python evaluate.py --gold "../Test Dataset/Test_Dataset_500_Answer_Format.jsonl" --pred predictions.jsonl
+"""
+
+import io
+import os
+import ssl
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from jsonl_io import open_text_auto
+from build_dataset_jsonl import SYSTEM_TEXT
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# ------------------------------ 입력 ---------------------------------------
+def prompt_text(row: Dict[str, Any]) -> Optional[str]:
+    """{"id","text"} / content / messages(user) 포맷에서 사용자 텍스트."""
+    for k in ("text", "content", "user"):
+        if isinstance(row.get(k), str):
+            return row[k]
+    for m in row.get("messages") or []:
+        if isinstance(m, dict) and m.get("role") == "user" and isinstance(m.get("content"), str):
+            return m["content"]
+    return None
+
+def iter_prompts(path: str, skip: set) -> Iterator[Tuple[Any, str]]:
+    with open_text_auto(path) as f:
+        for ln, line in enumerate(f, 1):
+            s = line.strip()
+            if not s:
+                continue
+            row = json.loads(s)
+            text = prompt_text(row)
+            if text is None:
+                sys.stderr.write(f"[infer] {path}:{ln} 텍스트 없음 → 건너뜀\n")
+                continue
+            rid = row.get("id", ln)
+            if str(rid) in skip:
+                continue
+            yield rid, text
+
+def resume_output(path: str) -> Tuple[set, int]:
+    """
+    --resume: 출력에서 answer가 기록된 id 집합을 모으고, 재시도할 실패 행({"id","error"})과
+    중단으로 잘린 줄은 걸러 파일을 다시 쓴다 (임시 파일 → os.replace). (완료 id, 제거한 줄 수)
+    """
+    ids = set()
+    if not os.path.exists(path):
+        return ids, 0
+    dropped = 0
+    tmp = path + ".tmp"
+    with open(path, "r", encoding="utf-8") as f, open(tmp, "w", encoding="utf-8", newline="\n") as out:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except Exception:
+                dropped += 1
+                continue
+            if not isinstance(row, dict) or "answer" not in row:
+                dropped += 1
+                continue
+            ids.add(str(row.get("id")))
+            out.write(line if line.endswith("\n") else line + "\n")
+    os.replace(tmp, path)
+    return ids, dropped
+
+# ------------------------------ HTTP ---------------------------------------
+class HttpError(Exception):
+    def __init__(self, status: int, body: bytes, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+        self.status = status
+        self.retry_after = retry_after
+
+class Connection:
+    """keep-alive HTTP/1.1 연결 1개 (Content-Length / chunked 응답)."""
+
+    def __init__(self, url: str, timeout: float, headers: Dict[str, str]):
+        u = urlsplit(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.tls = u.scheme == "https"
+        self.port = u.port or (443 if self.tls else 80)
+        self.path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        self.timeout = timeout
+        self.headers = headers
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = None
+
+    async def post_json(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.wait_for(self._post(json.dumps(payload, ensure_ascii=False).encode("utf-8")), self.timeout)
+
+    async def _post(self, body: bytes) -> Dict[str, Any]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port, ssl=ssl.create_default_context() if self.tls else None)
+        head = [f"POST {self.path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                "Content-Type: application/json", f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        head += [f"{k}: {v}" for k, v in self.headers.items()]
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        hdrs: Dict[str, str] = {}
+        while True:
+            h = await self.reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = h.decode("latin-1").partition(":")
+            hdrs[k.strip().lower()] = v.strip()
+        if hdrs.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            data = b"".join(chunks)
+        elif "content-length" in hdrs:
+            data = await self.reader.readexactly(int(hdrs["content-length"]))
+        else:
+            data = await self.reader.read()
+            await self.close()
+        if hdrs.get("connection", "").lower() == "close":
+            await self.close()
+        if status != 200:
+            ra = hdrs.get("retry-after")
+            raise HttpError(status, data, float(ra) if ra and ra.replace(".", "", 1).isdigit() else None)
+        return json.loads(data)
+
+# ------------------------------ 통계 ---------------------------------------
+class LatencyStats:
+    """요청별 지연 시간(ms): 2배 간격 히스토그램 + 백분위."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+    def histogram(self) -> Dict[str, int]:
+        hist: Dict[str, int] = {}
+        for ms in self.samples:
+            hi = 1
+            while hi < ms:
+                hi *= 2
+            key = f"<={hi}ms"
+            hist[key] = hist.get(key, 0) + 1
+        return dict(sorted(hist.items(), key=lambda kv: int(kv[0][2:-2])))
+
+    def summary(self) -> Dict[str, Any]:
+        n = len(self.samples)
+        return {
+            "n": n,
+            "mean_ms": round(sum(self.samples) / n, 3) if n else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p90_ms": round(self.percentile(0.90), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(max(self.samples), 3) if n else 0.0,
+            "histogram": self.histogram(),
+        }
+
+# ------------------------------ 실행 ---------------------------------------
+async def request_one(conn: Connection, payload: Dict[str, Any], retries: int, backoff: float,
+                      max_backoff: float) -> Tuple[Optional[str], Optional[str], int]:
+    """(answer, error, attempts). 재시도 가능한 오류는 지수 백오프."""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            resp = await conn.post_json(payload)
+            return resp["choices"][0]["message"]["content"], None, attempt
+        except (HttpError, OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            await conn.close()
+            retryable = not isinstance(e, HttpError) or e.status in RETRY_STATUS
+            if not retryable or attempt > retries:
+                return None, f"{type(e).__name__}: {e}", attempt
+            delay = min(max_backoff, backoff * (2 ** (attempt - 1))) * (0.5 + random.random())
+            if isinstance(e, HttpError) and e.retry_after is not None:
+                delay = max(delay, e.retry_after)
+            await asyncio.sleep(delay)
+        except (KeyError, IndexError, TypeError) as e:
+            return None, f"bad response: {type(e).__name__}: {e}", attempt
+
+async def run(args) -> Dict[str, Any]:
+    skip, dropped = resume_output(args.out) if args.resume else (set(), 0)
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.batch_size * 2)
+    lat = LatencyStats()
+    counts = {"ok": 0, "failed": 0, "retried": 0, "skipped": len(skip), "dropped_errors": dropped}
+    out = open(args.out, "a" if args.resume else "w", encoding="utf-8", newline="\n")
+    buf: List[str] = []
+
+    def emit(rec: Dict[str, Any]) -> None:
+        buf.append(json.dumps(rec, ensure_ascii=False) + "\n")
+        if len(buf) >= args.batch_size:
+            out.writelines(buf)
+            out.flush()
+            buf.clear()
+
+    async def worker() -> None:
+        conn = Connection(args.url, args.timeout, headers)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                rid, text = item
+                payload = {
+                    "model": args.model,
+                    "messages": [{"role": "system", "content": SYSTEM_TEXT}, {"role": "user", "content": text}],
+                    "temperature": args.temperature,
+                    "max_tokens": args.max_tokens,
+                }
+                t0 = time.perf_counter()
+                answer, err, attempts = await request_one(conn, payload, args.retries, args.backoff, args.max_backoff)
+                ms = (time.perf_counter() - t0) * 1000
+                if attempts > 1:
+                    counts["retried"] += 1
+                if err is None:
+                    lat.add(ms)
+                    counts["ok"] += 1
+                    emit({"id": rid, "answer": answer, "latency_ms": round(ms, 3), "attempts": attempts})
+                else:
+                    counts["failed"] += 1
+                    emit({"id": rid, "error": err, "attempts": attempts})
+        finally:
+            await conn.close()
+
+    t0 = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+    try:
+        for item in iter_prompts(args.input, skip):
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        out.writelines(buf)
+        out.close()
+    secs = time.perf_counter() - t0
+    done = counts["ok"] + counts["failed"]
+    return {
+        "url": args.url,
+        "input": args.input,
+        "out": args.out,
+        "concurrency": args.concurrency,
+        **counts,
+        "seconds": round(secs, 3),
+        "requests_per_sec": round(done / secs, 3) if secs > 0 else 0.0,
+        "latency": lat.summary(),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Async batched inference client for an OpenAI-compatible chat endpoint")
+    ap.add_argument("--input", required=True, help="프롬프트 JSONL ({id, text} / content / messages)")
+    ap.add_argument("--out", required=True, help="예측 JSONL ({id, answer})")
+    ap.add_argument("--url", default="http://127.0.0.1:8000/v1/chat/completions", help="chat completions URL")
+    ap.add_argument("--model", default="default", help="요청 model 필드")
+    ap.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"), help="Bearer 토큰 (기본: $OPENAI_API_KEY)")
+    ap.add_argument("--concurrency", type=int, default=16, help="동시 요청(연결) 수")
+    ap.add_argument("--batch-size", type=int, default=64, help="투입 큐 / 출력 flush 단위 행 수")
+    ap.add_argument("--retries", type=int, default=4, help="재시도 횟수 (429/5xx/연결 오류)")
+    ap.add_argument("--backoff", type=float, default=0.5, help="첫 재시도 대기(초), 이후 2배")
+    ap.add_argument("--max-backoff", type=float, default=20.0, help="재시도 대기 상한(초)")
+    ap.add_argument("--timeout", type=float, default=120.0, help="요청당 타임아웃(초)")
+    ap.add_argument("--temperature", type=float, default=0.0)
+    ap.add_argument("--max-tokens", type=int, default=2048)
+    ap.add_argument("--resume", action="store_true", help="출력에 answer가 있는 id는 건너뛰고 이어쓰기 (이전 실패 행은 지우고 재시도)")
+    ap.add_argument("--stats", default=None, help="지연 시간 / 처리량 통계 JSON 경로")
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    stats = asyncio.run(run(args))
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(stats, ensure_ascii=False, indent=2) + "\n")
+    lt = stats["latency"]
+    sys.stderr.write(
+        f"[infer] ok={stats['ok']} failed={stats['failed']} retried={stats['retried']} skipped={stats['skipped']} "
+        f"dropped_errors={stats['dropped_errors']} "
+        f"{stats['requests_per_sec']} req/s p50={lt['p50_ms']}ms p90={lt['p90_ms']}ms p99={lt['p99_ms']}ms\n"
+    )
+    for k, n in lt["histogram"].items():
+        sys.stderr.write(f"  {k:>10} {n}\n")
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
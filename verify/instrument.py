@@ -0,0 +1,277 @@
+# instrument.py
+# -*- coding: utf-8 -*-
+"""
+CLI 도구 공용 계측: 단계별 wall-time, cProfile / tracemalloc 덤프, rows/s 진행 표시.
+
+도구 쪽 사용법:
+    add_profile_args(ap)                       # --profile / --cprofile / --tracemalloc / --progress
+    prof = profiler_from_args(args, "autofix")
+    with prof:
+        for line in prof.iter("read", job.lines()):
+            with prof.stage("parse"):
+                row = json.loads(line)
+            ...
+            prof.tick()
+
+- 단계 시간은 배타적(exclusive): 단계 안에서 다른 단계에 들어가면 바깥 단계 시계는 멈춤
+  → 모든 단계 합 + other = 전체 wall time
+  단계 이름은 read / parse / fix / validate / serialize / write 를 기본으로 사용
+- 워커 프로세스에서 하는 일은 부모에서 결과를 기다린 단계(예: fix)의 시간으로 잡힘
+- 계측을 켜지 않으면 stage()는 공유 null 컨텍스트, iter()는 입력 그대로 → 오버헤드 없음
+- 리포트 JSON: 도구, argv, wall / cpu 초, rows, rows/s, 단계별 seconds / calls / share,
+  최대 RSS, (--tracemalloc) 할당 상위 위치 / 최대 추적 메모리
+
+두 리포트 비교:
+  python instrument.py prof_before.json prof_after.json
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("read", "parse", "fix", "validate", "serialize", "write")
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ("prof", "name")
+
+    def __init__(self, prof: "Profiler", name: str):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.prof._push(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.prof._pop()
+        return False
+
+class Profiler:
+    """단계 타이머 + 진행 표시. timing=False, progress=False면 아무 것도 하지 않음."""
+
+    def __init__(self, tool: str, report_path: Optional[str] = None, cprofile_path: Optional[str] = None,
+                 trace_malloc: bool = False, progress: bool = False, interval: float = 1.0):
+        self.tool = tool
+        self.report_path = report_path
+        self.cprofile_path = cprofile_path
+        self.trace_malloc = trace_malloc
+        self.progress = progress
+        self.interval = interval
+        self.timing = bool(report_path)
+        self.rows = 0
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._stack: List[str] = []
+        self._mark = 0.0
+        self._t0 = 0.0
+        self._cpu0 = 0.0
+        self._next_print = 0.0
+        self._cprof = None
+        self.extra: Dict[str, Any] = {}
+
+    # -- 단계 --
+    def _push(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            top = self._stack[-1]
+            self.seconds[top] = self.seconds.get(top, 0.0) + now - self._mark
+        self._stack.append(name)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self._mark = now
+
+    def _pop(self) -> None:
+        now = time.perf_counter()
+        name = self._stack.pop()
+        self.seconds[name] = self.seconds.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    def stage(self, name: str):
+        return _Stage(self, name) if self.timing else _NULL_STAGE
+
+    def iter(self, name: str, it: Iterable[Any]) -> Iterator[Any]:
+        """it의 next() 호출 시간을 name 단계로 집계."""
+        if not self.timing:
+            return iter(it)
+        return self._timed_iter(name, iter(it))
+
+    def _timed_iter(self, name: str, it: Iterator[Any]) -> Iterator[Any]:
+        while True:
+            self._push(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._pop()
+            yield item
+
+    # -- 진행 표시 --
+    def tick(self, n: int = 1) -> None:
+        self.rows += n
+        if self.progress:
+            now = time.perf_counter()
+            if now >= self._next_print:
+                self._next_print = now + self.interval
+                el = now - self._t0
+                sys.stderr.write(f"\r[{self.tool}] {self.rows:,} rows  {self.rows / el if el > 0 else 0:,.0f} rows/s ")
+                sys.stderr.flush()
+
+    # -- 시작 / 종료 --
+    def start(self) -> "Profiler":
+        if self.trace_malloc:
+            import tracemalloc
+            tracemalloc.start(10)
+        if self.cprofile_path:
+            import cProfile
+            self._cprof = cProfile.Profile()
+            self._cprof.enable()
+        self._t0 = self._mark = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._next_print = self._t0 + self.interval
+        return self
+
+    def report(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._t0
+        staged = sum(self.seconds.values())
+        stages = {
+            name: {"seconds": round(secs, 6), "calls": self.calls.get(name, 0),
+                   "share": round(secs / wall, 4) if wall > 0 else 0.0}
+            for name, secs in sorted(self.seconds.items(), key=lambda kv: -kv[1])
+        }
+        out: Dict[str, Any] = {
+            "tool": self.tool,
+            "argv": sys.argv[1:],
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(time.process_time() - self._cpu0, 6),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / wall, 1) if wall > 0 else None,
+            "stages": stages,
+            "other_s": round(max(wall - staged, 0.0), 6),
+            "peak_rss_mb": None,
+        }
+        if resource is not None:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            out["peak_rss_mb"] = round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+        out.update(self.extra)
+        return out
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        if self.progress and self.rows:
+            self._next_print = 0.0
+            self.tick(0)
+            sys.stderr.write("\n")
+        if self._cprof is not None:
+            self._cprof.disable()
+            self._cprof.dump_stats(self.cprofile_path)
+            sys.stderr.write(f"[{self.tool}] cProfile -> {self.cprofile_path}\n")
+        rep = None
+        if self.timing:
+            rep = self.report()
+            if self.trace_malloc:
+                rep["tracemalloc"] = _tracemalloc_summary()
+            with open(self.report_path, "w", encoding="utf-8", newline="\n") as f:
+                f.write(json.dumps(rep, ensure_ascii=False, indent=2) + "\n")
+            sys.stderr.write(f"[{self.tool}] profile -> {self.report_path} "
+                             + " ".join(f"{k}={v['seconds']:.2f}s" for k, v in rep["stages"].items()) + "\n")
+        if self.trace_malloc:
+            import tracemalloc
+            tracemalloc.stop()
+        return rep
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        while self._stack:
+            self._pop()
+        self.close()
+        return False
+
+def _tracemalloc_summary(top: int = 15) -> Dict[str, Any]:
+    import tracemalloc
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+    return {
+        "current_mb": round(current / (1 << 20), 2),
+        "peak_mb": round(peak / (1 << 20), 2),
+        "top": [{"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                 "size_kb": round(s.size / 1024, 1), "count": s.count} for s in stats],
+    }
+
+def add_profile_args(ap) -> None:
+    """argparse에 공통 계측 옵션 추가."""
+    ap.add_argument("--profile", default=None, metavar="JSON", help="단계별 시간 리포트 JSON 경로 (계측 활성화)")
+    ap.add_argument("--cprofile", default=None, metavar="PSTATS", help="cProfile 결과 덤프 경로 (snakeviz / pstats로 열기)")
+    ap.add_argument("--tracemalloc", action="store_true", help="--profile 리포트에 메모리 할당 상위 위치 / 최대치 포함")
+    ap.add_argument("--progress", action="store_true", help="stderr에 처리 행 수 / rows/s 진행 표시")
+
+def profiler_from_args(args, tool: str) -> Profiler:
+    return Profiler(
+        tool,
+        report_path=getattr(args, "profile", None),
+        cprofile_path=getattr(args, "cprofile", None),
+        trace_malloc=getattr(args, "tracemalloc", False),
+        progress=getattr(args, "progress", False),
+    )
+
+NULL_PROFILER = Profiler("null")
+
+# ---------------- 리포트 비교 ----------------
+def diff_reports(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    def pct(a, b):
+        return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+    lines = [f"{'':<12} {'old':>10} {'new':>10} {'change':>9}"]
+    for key in ("wall_s", "cpu_s", "rows_per_s", "peak_rss_mb"):
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            lines.append(f"{key:<12} {a:>10.2f} {b:>10.2f} {pct(a, b):>9}")
+    names = list(dict.fromkeys(list(new.get("stages", {})) + list(old.get("stages", {}))))
+    for name in names:
+        a = old.get("stages", {}).get(name, {}).get("seconds", 0.0)
+        b = new.get("stages", {}).get(name, {}).get("seconds", 0.0)
+        lines.append(f"  {name:<10} {a:>10.3f} {b:>10.3f} {pct(a, b):>9}")
+    lines.append(f"  {'other':<10} {old.get('other_s', 0.0):>10.3f} {new.get('other_s', 0.0):>10.3f}")
+    return lines
+
+def main():
+    ap = argparse.ArgumentParser(description="Diff two --profile timing reports")
+    ap.add_argument("old", help="이전 리포트 JSON")
+    ap.add_argument("new", help="새 리포트 JSON")
+    args = ap.parse_args()
+
+    try:
+        sys.stdout.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("tool") != new.get("tool"):
+        print(f"(note: tools differ: {old.get('tool')} vs {new.get('tool')})")
+    for line in diff_reports(old, new):
+        print(line)
+
+if __name__ == "__main__":
+    main()
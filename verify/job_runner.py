@@ -0,0 +1,318 @@
+# job_runner.py
+# -*- coding: utf-8 -*-
+"""
+장시간 재작성(rewrite) 작업용 체크포인트 / 재개 / 원자적 기록 러너.
+
+- 출력은 <out>.tmp 에 쓰고 정상 종료 시에만 os.replace로 교체 (중간 산출물이 out을 덮지 않음)
+- N행마다 체크포인트(<out>.ckpt.json) 기록:
+    입력 파일 번호 + 입력 바이트 오프셋 + 라인 번호, 출력 바이트 오프셋, stats/state 스냅샷
+  (출력 flush + fsync 후 체크포인트를 원자적으로 교체하므로 체크포인트는 항상 디스크의 출력보다 뒤처지지 않음)
+- --resume: 체크포인트의 출력 오프셋으로 .tmp를 잘라낸 뒤 입력 오프셋부터 이어서 처리
+    plain 입력은 seek, .gz/.zst 입력은 해제하며 건너뜀 (파싱/처리는 다시 하지 않음)
+    .gz/.zst 출력은 체크포인트마다 gzip member / zstd frame을 닫아 이어붙일 수 있게 유지
+- 입력 파일(경로/크기/mtime)이나 옵션이 체크포인트와 다르면 재개를 거부
+- 샤드 출력(--shard-rows/--shard-bytes/--manifest)은 샤드 단위 원자적 기록만 하고 재개는 지원하지 않음
+
+도구 쪽 사용 형태:
+  job = job_from_args(args, inputs, args.output, stats=stats, state=state, options={...})
+  with job:
+      for path, lineno, line in job.lines():
+          ...
+          job.write(json.dumps(obj, ensure_ascii=False), obj.get("id"))
+"""
+
+import io
+import os
+import sys
+import json
+import gzip
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from jsonl_io import (BUFSIZE, SNIFF_SIZE, GZIP_LEVEL, ZSTD_LEVEL, TMP_SUFFIX, ShardedJsonlWriter,
+                      writer_from_args, compression_of, open_binary_read, open_text_auto,
+                      _sniff_encoding, _need_zstd)
+
+CKPT_VERSION = 1
+CKPT_SUFFIX = ".ckpt.json"
+DEFAULT_EVERY = 50000
+
+# ------------------------- offset-tracking reader -------------------------
+def iter_lines_with_offsets(path: str, offset: int = 0, lineno: int = 0) -> Iterator[Tuple[int, str, Optional[int]]]:
+    """
+    (라인 번호, 텍스트 라인, 이 라인 끝의 해제 후 바이트 오프셋) 스트리밍.
+    open_text_auto와 같은 인코딩 판별(BOM / UTF-8 / CP949)과 CRLF → LF 변환.
+    UTF-16 입력은 바이트 단위로 줄을 자를 수 없으므로 오프셋 None (파일 중간 재개 불가).
+    """
+    fb = open_binary_read(path)
+    try:
+        enc = _sniff_encoding(fb.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+        if enc.startswith("utf-16"):
+            if offset:
+                raise ValueError(f"cannot resume inside UTF-16 input: {path}")
+            fb.close()
+            with open_text_auto(path) as f:
+                for line in f:
+                    lineno += 1
+                    yield lineno, line, None
+            return
+        if offset:
+            if compression_of(path) is None:
+                fb.seek(offset)
+            else:
+                left = offset
+                while left:
+                    chunk = fb.read(min(BUFSIZE, left))
+                    if not chunk:
+                        raise ValueError(f"input shorter than checkpoint offset {offset}: {path}")
+                    left -= len(chunk)
+        elif enc == "utf-8-sig":
+            offset = len(fb.read(3))
+        codec, errors = ("cp949", "replace") if enc == "cp949" else ("utf-8", "strict")
+        pos = offset
+        for raw in fb:
+            pos += len(raw)
+            lineno += 1
+            line = raw.decode(codec, errors)
+            if line.endswith("\r\n"):
+                line = line[:-2] + "\n"
+            yield lineno, line, pos
+    finally:
+        fb.close()
+
+def input_fingerprint(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+# ------------------------------- job --------------------------------------
+class ResumableJob:
+    """
+    입력 라인 스트림 + 원자적 출력 + 주기적 체크포인트.
+      lines()  : (path, lineno, line) — 직전 라인의 출력이 끝난 시점에만 체크포인트
+      lines_with_pos() + advance(pos, n) : 배치/병렬 처리에서 출력 완료 시점을 직접 알릴 때
+      write()  : 출력 라인(개행 제외) 기록
+      stats / state : 도구가 갱신하는 dict, 체크포인트에 함께 저장되고 재개 시 복원
+    out_path가 None이면(dry-run) 출력/체크포인트 없이 lines()만 제공.
+    writer(ShardedJsonlWriter)를 넘기면 출력은 writer에 위임하고 체크포인트는 하지 않는다.
+    """
+
+    def __init__(self, inputs: List[str], out_path: Optional[str], checkpoint_path: Optional[str] = None,
+                 every: int = DEFAULT_EVERY, resume: bool = False, stats: Optional[Dict[str, Any]] = None,
+                 state: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None,
+                 writer: Optional[ShardedJsonlWriter] = None, tag: str = "job"):
+        self.inputs = list(inputs)
+        self.out_path = out_path
+        self.tmp_path = out_path + TMP_SUFFIX if out_path else None
+        self.checkpoint_path = checkpoint_path or (out_path + CKPT_SUFFIX if out_path else None)
+        self.every = max(1, every)
+        self.resume = resume
+        self.stats = stats if stats is not None else {}
+        self.state = state if state is not None else {}
+        self.options = options or {}
+        self.writer = writer
+        self.tag = tag
+        self.written = 0
+        self.checkpoints = 0
+        self.resumed_from: Optional[Dict[str, Any]] = None
+        self._compression = compression_of(out_path, sniff=False) if out_path else None
+        self._raw = None
+        self._fh = None
+        self._start = (0, 0, 0)
+        self._pos = (0, 0, 0)
+        self._since = 0
+        self._opened = False
+
+    # -- 시작 / 종료 --
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
+
+    def open(self) -> None:
+        """출력 준비 (재개 시 체크포인트 검증, 불일치면 ValueError). 여러 번 불러도 한 번만 연다."""
+        if self._opened:
+            return
+        self._opened = True
+        if self.writer is not None or not self.out_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.out_path)), exist_ok=True)
+        ck = self._load_checkpoint() if self.resume else None
+        if ck is not None:
+            self._start = self._pos = (ck["input_index"], ck["input_offset"], ck["lineno"])
+            self.stats.update(ck["stats"])
+            self.state.update(ck["state"])
+            self.written = ck["written"]
+            self.resumed_from = ck
+            self._raw = open(self.tmp_path, "r+b", buffering=BUFSIZE)
+            self._raw.truncate(ck["output_offset"])
+            self._raw.seek(ck["output_offset"])
+            sys.stderr.write(
+                f"[{self.tag}] resume: input #{ck['input_index']} line {ck['lineno']} "
+                f"(offset {ck['input_offset']}), {ck['written']} rows already written\n"
+            )
+        else:
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+            self._raw = open(self.tmp_path, "wb", buffering=BUFSIZE)
+        self._open_member()
+
+    def finish(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            return
+        if self._raw is None:
+            return
+        self._close_member()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._raw = None
+        os.replace(self.tmp_path, self.out_path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def abort(self) -> None:
+        """예외 종료: 마지막 체크포인트까지는 재개 가능하도록 .tmp/체크포인트를 남긴다."""
+        if self.writer is not None:
+            self.writer.abort()
+            return
+        if self._raw is None:
+            return
+        try:
+            self._close_member()
+        finally:
+            self._raw.close()
+            self._raw = None
+        if not os.path.exists(self.checkpoint_path):
+            os.remove(self.tmp_path)
+        else:
+            sys.stderr.write(f"[{self.tag}] interrupted; rerun with --resume to continue from {self.checkpoint_path}\n")
+
+    # -- 압축 member / frame --
+    def _open_member(self) -> None:
+        if self._compression == "gzip":
+            gz = gzip.GzipFile(filename=self.out_path, mode="wb", compresslevel=GZIP_LEVEL, fileobj=self._raw)
+            self._fh = io.BufferedWriter(gz, buffer_size=BUFSIZE)
+        elif self._compression == "zstd":
+            self._fh = _need_zstd().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+                self._raw, write_size=BUFSIZE, closefd=False)
+        else:
+            self._fh = self._raw
+
+    def _close_member(self) -> None:
+        if self._fh is not None and self._fh is not self._raw:
+            self._fh.close()   # 하위 파일(_raw)은 닫지 않음
+        self._fh = None
+
+    # -- 체크포인트 --
+    def _fingerprint(self) -> Dict[str, Any]:
+        return {"inputs": [input_fingerprint(p) for p in self.inputs], "options": self.options}
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            sys.stderr.write(f"[{self.tag}] no checkpoint at {self.checkpoint_path}; starting from the beginning\n")
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            ck = json.load(f)
+        if ck.get("version") != CKPT_VERSION:
+            raise ValueError(f"checkpoint version mismatch: {ck.get('version')} (expected {CKPT_VERSION})")
+        fp = self._fingerprint()
+        if ck.get("inputs") != fp["inputs"] or ck.get("options") != json.loads(json.dumps(fp["options"])):
+            raise ValueError(f"checkpoint {self.checkpoint_path} does not match current inputs/options; "
+                             f"rerun without --resume")
+        if not os.path.exists(self.tmp_path) or os.path.getsize(self.tmp_path) < ck["output_offset"]:
+            raise ValueError(f"partial output {self.tmp_path} is missing or shorter than the checkpoint")
+        return ck
+
+    def checkpoint(self) -> None:
+        """출력 flush+fsync 후 현재 위치를 체크포인트로 원자적 기록."""
+        if self._raw is None:
+            return
+        self._close_member()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        idx, off, lineno = self._pos
+        ck = {
+            "version": CKPT_VERSION,
+            **self._fingerprint(),
+            "out_path": os.path.abspath(self.out_path),
+            "input_index": idx,
+            "input_offset": off,
+            "lineno": lineno,
+            "output_offset": self._raw.tell(),
+            "written": self.written,
+            "stats": self.stats,
+            "state": self.state,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        tmp = self.checkpoint_path + TMP_SUFFIX
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(ck, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self._open_member()
+        self.checkpoints += 1
+        self._since = 0
+
+    # -- 입출력 --
+    def lines_with_pos(self) -> Iterator[Tuple[str, int, str, Optional[Tuple[int, int, int]]]]:
+        """(path, lineno, line, pos). 출력을 다 쓴 뒤 advance(pos)를 부르는 건 호출자 몫 (배치 처리용)."""
+        idx0, off0, ln0 = self._start
+        for idx in range(idx0, len(self.inputs)):
+            path = self.inputs[idx]
+            off, ln = (off0, ln0) if idx == idx0 else (0, 0)
+            for lineno, line, end in iter_lines_with_offsets(path, off, ln):
+                yield path, lineno, line, (None if end is None else (idx, end, lineno))
+
+    def lines(self) -> Iterator[Tuple[str, int, str]]:
+        for path, lineno, line, pos in self.lines_with_pos():
+            yield path, lineno, line
+            # 여기로 돌아왔다 = 직전 라인의 출력이 끝났다
+            self.advance(pos)
+
+    def advance(self, pos: Optional[Tuple[int, int, int]], n: int = 1) -> None:
+        """pos까지의 입력에 대한 출력이 모두 기록됐음을 알림 → 간격이 차면 체크포인트."""
+        if pos is None:
+            return
+        self._pos = pos
+        self._since += n
+        if self._since >= self.every:
+            self.checkpoint()
+
+    def write(self, line: str, rec_id: Any = None) -> None:
+        if self.writer is not None:
+            self.writer.write(line, rec_id)
+        elif self._fh is not None:
+            self._fh.write((line + "\n").encode("utf-8"))
+        self.written += 1
+
+def add_job_args(ap) -> None:
+    """argparse에 공통 체크포인트/재개 옵션 추가."""
+    ap.add_argument("--resume", action="store_true", help="체크포인트(<out>.ckpt.json)가 있으면 이어서 처리")
+    ap.add_argument("--checkpoint", default=None, help="체크포인트 경로 (기본: <out>.ckpt.json)")
+    ap.add_argument("--checkpoint-every", type=int, default=DEFAULT_EVERY, help=f"체크포인트 간격(행, 기본 {DEFAULT_EVERY})")
+
+def job_from_args(args, inputs: List[str], out_path: Optional[str], stats: Optional[Dict[str, Any]] = None,
+                  state: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None,
+                  tag: str = "job") -> ResumableJob:
+    """샤드/manifest 옵션이 있으면 ShardedJsonlWriter(재개 불가), 아니면 체크포인트 단일 파일 출력."""
+    writer = None
+    if out_path and (getattr(args, "shard_rows", None) or getattr(args, "shard_bytes", None)
+                     or getattr(args, "manifest", None)):
+        if getattr(args, "resume", False):
+            raise ValueError("--resume is only supported for single-file output (no --shard-rows/--shard-bytes/--manifest)")
+        writer = writer_from_args(out_path, args)
+    return ResumableJob(
+        inputs, out_path,
+        checkpoint_path=getattr(args, "checkpoint", None),
+        every=getattr(args, "checkpoint_every", DEFAULT_EVERY),
+        resume=getattr(args, "resume", False),
+        stats=stats, state=state, options=options, writer=writer, tag=tag,
+    )
@@ -0,0 +1,485 @@
+# jsonl_io.py
+# -*- coding: utf-8 -*-
+"""
+데이터셋 도구 공용 JSONL 입출력/샤드 모듈.
+
+- 압축 투명 처리    : .gz / .zst 확장자 또는 매직 바이트로 감지해 스트리밍 압축/해제
+                       (zstd는 zstandard 패키지가 있을 때만, 1MB 버퍼)
+- open_text_auto / read_text_safely / robust_read_lines
+                     : BOM(UTF-8-SIG/UTF-16) 감지 + UTF-8 실패 시 CP949 폴백 (압축 파일 포함)
+- iter_raw_lines     : UTF-8 입력은 디코딩 없이 줄 바이트 그대로 (바이트 단위 빠른 경로용)
+                       빈 줄 판정은 row_text()와 같음 (유니코드 공백 / BOM만 있는 줄도 빈 줄)
+- ShardedJsonlWriter : 행 수(--shard-rows) 또는 바이트(--shard-bytes) 기준으로
+                       out-00000.jsonl, out-00001.jsonl ... 로 나눠 쓰고
+                       샤드별 행 수 / id 범위 / SHA-256을 manifest JSON에 기록
+                       (샤드 옵션이 없으면 기존처럼 단일 파일)
+- manifest 입력      : is_manifest() / manifest_shards() / map_shards()
+                       → 하위 도구가 샤드당 워커 1개로 팬아웃
+
+manifest 예:
+  {"version": 1, "total_rows": 56000,
+   "shards": [{"path": "dataset-00000.jsonl", "rows": 10000, "bytes": 21000000,
+               "id_min": 1, "id_max": 10000, "sha256": "..."}, ...]}
+"""
+
+import io
+import os
+import glob
+import gzip
+import json
+import codecs
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+try:
+    import zstandard as zstd
+except ImportError:  # 선택 의존성: .zst 파일을 다룰 때만 필요
+    zstd = None
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+TMP_SUFFIX = ".tmp"
+BUFSIZE = 1 << 20          # 압축 스트림 버퍼 (1MB)
+SNIFF_SIZE = 1 << 16       # 인코딩 판별용 선두 바이트 수
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_COMPRESSED_EXTS = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+# --------------------------- compression ----------------------------------
+def _need_zstd():
+    if zstd is None:
+        raise RuntimeError("zstd 파일 처리에는 zstandard 패키지가 필요합니다 (pip install zstandard)")
+    return zstd
+
+def compression_of(path: str, sniff: bool = True) -> Optional[str]:
+    """확장자 → (없으면) 매직 바이트로 압축 형식 판별: 'gzip' / 'zstd' / None."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in _COMPRESSED_EXTS:
+        return _COMPRESSED_EXTS[ext]
+    if sniff and os.path.isfile(path):
+        with open(path, "rb") as fb:
+            head = fb.read(4)
+        if head.startswith(_GZIP_MAGIC):
+            return "gzip"
+        if head.startswith(_ZSTD_MAGIC):
+            return "zstd"
+    return None
+
+def open_binary_read(path: str, bufsize: int = BUFSIZE) -> BinaryIO:
+    """압축 여부와 관계없이 해제된 바이트 스트림(BufferedReader) 반환."""
+    comp = compression_of(path)
+    if comp == "gzip":
+        return io.BufferedReader(gzip.GzipFile(filename=path, mode="rb"), buffer_size=bufsize)
+    if comp == "zstd":
+        fh = open(path, "rb")
+        reader = _need_zstd().ZstdDecompressor().stream_reader(fh, read_size=bufsize, closefd=True)
+        return io.BufferedReader(reader, buffer_size=bufsize)
+    return open(path, "rb", buffering=bufsize)
+
+def open_binary_write(path: str, compression: Optional[str] = "auto", bufsize: int = BUFSIZE) -> BinaryIO:
+    """
+    쓰기용 바이트 스트림. compression='auto'면 path 확장자로 결정
+    (.tmp 같은 임시 경로에 쓸 때는 최종 경로 기준 형식을 직접 넘긴다).
+    """
+    if compression == "auto":
+        compression = compression_of(path, sniff=False)
+    if compression == "gzip":
+        fh = open(path, "wb")
+        # gzip 헤더의 원본 파일명에는 임시 확장자(.tmp)를 남기지 않는다
+        name = path[:-len(TMP_SUFFIX)] if path.endswith(TMP_SUFFIX) else path
+        gz = gzip.GzipFile(filename=name, mode="wb", compresslevel=GZIP_LEVEL, fileobj=fh)
+        gz.myfileobj = fh  # close() 시 하위 파일도 닫히도록
+        return io.BufferedWriter(gz, buffer_size=bufsize)
+    if compression == "zstd":
+        fh = open(path, "wb")
+        return _need_zstd().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(fh, write_size=bufsize, closefd=True)
+    return open(path, "wb", buffering=bufsize)
+
+# ----------------------------- text readers -------------------------------
+def _sniff_encoding(head: bytes) -> str:
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    if head.startswith(b'\xff\xfe'):
+        return 'utf-16'      # LE
+    if head.startswith(b'\xfe\xff'):
+        return 'utf-16'      # BE (BOM으로 바이트 순서 판별 + BOM 제거)
+    try:
+        # 청크 경계에서 잘린 멀티바이트 문자는 오류로 보지 않음(final=False)
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp949'
+
+def open_text_auto(path: str, newline: Optional[str] = None) -> TextIO:
+    """BOM 감지로 텍스트 모드 오픈(스트리밍, .gz/.zst 포함). UTF-8이 아니면 CP949 폴백."""
+    raw = open_binary_read(path)
+    enc = _sniff_encoding(raw.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+    errors = "replace" if enc == "cp949" else "strict"
+    return io.TextIOWrapper(raw, encoding=enc, errors=errors, newline=newline)
+
+def row_text(line: str) -> str:
+    """줄에서 앞뒤 공백(유니코드 공백 포함)과 선두 BOM을 뗀 내용. 빈 문자열이면 빈 줄."""
+    s = line.strip()
+    if s[:1] == "\ufeff":
+        s = s.lstrip("\ufeff").strip()
+    return s
+
+def iter_raw_lines(path: str) -> Iterator[bytes]:
+    """
+    비어 있지 않은 줄을 row_text()로 다듬은 UTF-8 바이트로 yield.
+    UTF-8(-SIG)이면 디코딩 없이 바이트 그대로, 그 외 인코딩은 텍스트로 읽어 재인코딩.
+    """
+    with open_binary_read(path) as fb:
+        enc = _sniff_encoding(fb.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+        if enc in ("utf-8", "utf-8-sig"):
+            for raw in fb:
+                s = raw.strip()
+                # 양 끝이 출력 가능한 ASCII가 아니면(BOM / U+3000 같은 유니코드 공백 가능) 디코딩해 row_text()
+                if s and not (0x20 < s[0] < 0x7F and 0x20 < s[-1] < 0x7F):
+                    s = row_text(s.decode("utf-8", "surrogateescape")).encode("utf-8", "surrogateescape")
+                if s:
+                    yield s
+            return
+    with open_text_auto(path) as f:
+        for line in f:
+            s = row_text(line)
+            if s:
+                yield s.encode("utf-8")
+
+def read_bytes(path: str) -> bytes:
+    with open_binary_read(path) as fb:
+        return fb.read()
+
+def read_text_safely(path: str) -> str:
+    """UTF-8 / UTF-8-SIG / UTF-16LE/BE 자동 인식, 실패시 CP949 폴백 (.gz/.zst 포함)."""
+    data = read_bytes(path)
+    if data.startswith(b'\xef\xbb\xbf'):
+        return data.decode('utf-8-sig')
+    if data.startswith(b'\xff\xfe'):
+        return data.decode('utf-16')      # LE
+    if data.startswith(b'\xfe\xff'):
+        return data.decode('utf-16')      # BE (BOM 제거)
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('cp949', errors='replace')
+
+def robust_read_lines(path: str) -> List[str]:
+    """read_text_safely + CRLF 정리된 라인 목록."""
+    return [ln.rstrip("\r\n") for ln in read_text_safely(path).splitlines()]
+
+def open_text_write(path: str, compression: Optional[str] = "auto") -> TextIO:
+    """UTF-8 / LF 고정 텍스트 쓰기 (확장자에 따라 압축)."""
+    return io.TextIOWrapper(open_binary_write(path, compression), encoding="utf-8", newline="\n")
+
+# ------------------------------ naming ------------------------------------
+def _split_ext(path: str):
+    """dataset.jsonl.gz → ('dataset', '.jsonl.gz') 처럼 압축 확장자까지 묶어서 분리."""
+    base, ext = os.path.splitext(path)
+    if ext.lower() in _COMPRESSED_EXTS:
+        base, inner = os.path.splitext(base)
+        ext = inner + ext
+    return base, (ext or ".jsonl")
+
+def shard_path(out_path: str, index: int) -> str:
+    """dataset.jsonl → dataset-00003.jsonl"""
+    base, ext = _split_ext(out_path)
+    return f"{base}-{index:05d}{ext}"
+
+def default_manifest_path(out_path: str) -> str:
+    """dataset.jsonl → dataset.manifest.json"""
+    return _split_ext(out_path)[0] + MANIFEST_SUFFIX
+
+# ------------------------------ writer ------------------------------------
+class ShardedJsonlWriter:
+    """
+    JSONL 라인 기록기.
+      write(line, rec_id) : 라인(개행 제외) 1개 기록, rec_id는 manifest의 id 범위용
+      close()             : 마지막 샤드를 닫고 manifest 기록 후 manifest dict 반환
+    shard_rows/shard_bytes 둘 다 없으면 out_path 단일 파일로 기록(manifest는 요청 시만).
+    각 파일은 <path>.tmp에 쓰고 다 닫은 뒤 원자적으로 교체, 예외로 빠져나가면 .tmp는 삭제.
+    """
+
+    def __init__(self, out_path: str, shard_rows: Optional[int] = None, shard_bytes: Optional[int] = None,
+                 manifest_path: Optional[str] = None):
+        self.out_path = out_path
+        self.shard_rows = shard_rows or None
+        self.shard_bytes = shard_bytes or None
+        self.sharded = bool(self.shard_rows or self.shard_bytes)
+        self.manifest_path = manifest_path or (default_manifest_path(out_path) if self.sharded else None)
+        self.shards: List[Dict[str, Any]] = []
+        self.total_rows = 0
+        self._fh = None
+        self._cur: Optional[Dict[str, Any]] = None
+        self._sha = None
+        d = os.path.dirname(os.path.abspath(out_path))
+        os.makedirs(d, exist_ok=True)
+
+    # -- 샤드 관리 --
+    def _open_next(self) -> None:
+        path = shard_path(self.out_path, len(self.shards)) if self.sharded else self.out_path
+        self._compression = compression_of(path, sniff=False)
+        self._fh = open_binary_write(path + TMP_SUFFIX, self._compression)
+        self._sha = hashlib.sha256() if self._compression is None else None
+        self._cur = {"path": path, "rows": 0, "bytes": 0, "id_min": None, "id_max": None}
+
+    def _close_current(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        os.replace(self._cur["path"] + TMP_SUFFIX, self._cur["path"])
+        if self._sha is not None:
+            self._cur["sha256"] = self._sha.hexdigest()
+        else:
+            # 압축 샤드: 체크섬/크기는 디스크 파일 기준 (bytes는 압축 전 크기)
+            self._cur["sha256"] = sha256_file(self._cur["path"])
+            self._cur["file_bytes"] = os.path.getsize(self._cur["path"])
+        self.shards.append(self._cur)
+        self._fh = None
+        self._cur = None
+
+    def _full(self, nbytes: int) -> bool:
+        cur = self._cur
+        if cur["rows"] == 0:
+            return False
+        if self.shard_rows and cur["rows"] >= self.shard_rows:
+            return True
+        if self.shard_bytes and cur["bytes"] + nbytes > self.shard_bytes:
+            return True
+        return False
+
+    # -- 기록 --
+    def write(self, line: str, rec_id: Any = None) -> None:
+        data = (line + "\n").encode("utf-8")
+        if self._fh is None:
+            self._open_next()
+        elif self.sharded and self._full(len(data)):
+            self._close_current()
+            self._open_next()
+        self._fh.write(data)
+        if self._sha is not None:
+            self._sha.update(data)
+        cur = self._cur
+        cur["rows"] += 1
+        cur["bytes"] += len(data)
+        self.total_rows += 1
+        if isinstance(rec_id, int):
+            if cur["id_min"] is None or rec_id < cur["id_min"]:
+                cur["id_min"] = rec_id
+            if cur["id_max"] is None or rec_id > cur["id_max"]:
+                cur["id_max"] = rec_id
+
+    def write_lines(self, lines: List[bytes], ids: Optional[List[Any]] = None) -> None:
+        """
+        이미 UTF-8로 인코딩된 라인(개행 제외) 묶음 기록. ids는 lines와 같은 길이(manifest id 범위용).
+        단일 파일이면 join 한 번으로 쓰고, 샤드 모드면 샤드 경계 판단을 위해 행 단위로 쓴다.
+        """
+        if not lines:
+            return
+        if ids is None:
+            ids = [None] * len(lines)
+        if self.sharded:
+            for data, rid in zip(lines, ids):
+                self.write(data.decode("utf-8"), rid)
+            return
+        if self._fh is None:
+            self._open_next()
+        data = b"\n".join(lines) + b"\n"
+        self._fh.write(data)
+        if self._sha is not None:
+            self._sha.update(data)
+        cur = self._cur
+        cur["rows"] += len(lines)
+        cur["bytes"] += len(data)
+        self.total_rows += len(lines)
+        int_ids = [r for r in ids if isinstance(r, int)]
+        if int_ids:
+            lo, hi = min(int_ids), max(int_ids)
+            if cur["id_min"] is None or lo < cur["id_min"]:
+                cur["id_min"] = lo
+            if cur["id_max"] is None or hi > cur["id_max"]:
+                cur["id_max"] = hi
+
+    def write_record(self, rec: Dict[str, Any], **dumps_kw) -> None:
+        kw = {"ensure_ascii": False, "separators": (",", ":")}
+        kw.update(dumps_kw)
+        self.write(json.dumps(rec, **kw), rec.get("id") if isinstance(rec, dict) else None)
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        if self._fh is None and not self.shards:
+            self._open_next()          # 입력이 비어도 출력 파일은 만든다
+        self._close_current()
+        if not self.manifest_path:
+            return None
+        return write_manifest(self.shards, self.manifest_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self) -> None:
+        """쓰던 샤드를 버린다 (완료된 샤드와 manifest는 건드리지 않음)."""
+        if self._fh is not None:
+            self._fh.close()
+            tmp = self._cur["path"] + TMP_SUFFIX
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            self._fh = None
+            self._cur = None
+
+def build_manifest(shards: List[Dict[str, Any]], base_dir: str) -> Dict[str, Any]:
+    """샤드 경로는 manifest 위치 기준 상대경로로 저장."""
+    out = []
+    for sh in shards:
+        d = dict(sh)
+        d["path"] = os.path.relpath(os.path.abspath(sh["path"]), base_dir).replace(os.sep, "/")
+        out.append(d)
+    return {
+        "version": MANIFEST_VERSION,
+        "total_rows": sum(s["rows"] for s in shards),
+        "shards": out,
+    }
+
+def write_manifest(shards: List[Dict[str, Any]], manifest_path: str) -> Dict[str, Any]:
+    """manifest를 임시파일에 쓴 뒤 원자적 교체."""
+    manifest = build_manifest(shards, os.path.dirname(os.path.abspath(manifest_path)))
+    tmp = manifest_path + TMP_SUFFIX
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp, manifest_path)
+    return manifest
+
+def add_shard_args(ap) -> None:
+    """argparse에 공통 샤드 옵션 추가."""
+    ap.add_argument("--shard-rows", type=int, default=None, help="샤드당 최대 행 수 (지정 시 out-00000.jsonl ... + manifest)")
+    ap.add_argument("--shard-bytes", type=int, default=None, help="샤드당 최대 바이트 수")
+    ap.add_argument("--manifest", default=None, help="manifest 경로 (기본: <out>.manifest.json, 샤드 미사용 시 지정하면 기록)")
+
+def writer_from_args(out_path: str, args) -> ShardedJsonlWriter:
+    return ShardedJsonlWriter(
+        out_path,
+        shard_rows=getattr(args, "shard_rows", None),
+        shard_bytes=getattr(args, "shard_bytes", None),
+        manifest_path=getattr(args, "manifest", None),
+    )
+
+# ------------------------------ reader ------------------------------------
+def is_manifest(path: str) -> bool:
+    if path.endswith(MANIFEST_SUFFIX):
+        return True
+    if not path.lower().endswith(".json"):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except Exception:
+        return False
+    return isinstance(obj, dict) and isinstance(obj.get("shards"), list)
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for sh in manifest.get("shards", []):
+        sh["abspath"] = os.path.normpath(os.path.join(base, sh["path"]))
+    return manifest
+
+def manifest_shards(path: str) -> List[str]:
+    """manifest에 적힌 샤드 절대경로 목록 (순서 유지)."""
+    return [sh["abspath"] for sh in load_manifest(path)["shards"]]
+
+def sha256_file(path: str, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(bufsize)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+def shard_info(path: str) -> Dict[str, Any]:
+    """이미 기록된 샤드 파일에서 manifest 항목을 다시 계산 (재개 시 완료 샤드 건너뛰기용)."""
+    info: Dict[str, Any] = {"path": path, "rows": 0, "bytes": 0, "id_min": None, "id_max": None}
+    with open_binary_read(path) as fb:
+        for raw in fb:
+            info["rows"] += 1
+            info["bytes"] += len(raw)
+            try:
+                rid = json.loads(raw).get("id")
+            except Exception:
+                continue
+            if isinstance(rid, int):
+                info["id_min"] = rid if info["id_min"] is None else min(info["id_min"], rid)
+                info["id_max"] = rid if info["id_max"] is None else max(info["id_max"], rid)
+    info["sha256"] = sha256_file(path)
+    if compression_of(path, sniff=False):
+        info["file_bytes"] = os.path.getsize(path)
+    return info
+
+def verify_manifest(path: str) -> List[str]:
+    """샤드 존재/체크섬 검증. 문제 목록 반환(빈 리스트면 정상)."""
+    problems = []
+    for sh in load_manifest(path)["shards"]:
+        p = sh["abspath"]
+        if not os.path.exists(p):
+            problems.append(f"missing shard: {sh['path']}")
+        elif sh.get("sha256") and sha256_file(p) != sh["sha256"]:
+            problems.append(f"sha256 mismatch: {sh['path']}")
+    return problems
+
+def expand_input(path: str) -> List[str]:
+    """입력이 manifest면 샤드 목록, 아니면 [path]."""
+    return manifest_shards(path) if is_manifest(path) else [path]
+
+def expand_ordered(patterns: List[str]) -> List[str]:
+    """패턴 순서 유지, 패턴 안에서는 정렬. manifest는 샤드 순서로 펼침."""
+    out: List[str] = []
+    for pat in patterns:
+        for m in (sorted(glob.glob(pat)) if glob.has_magic(pat) else [pat]):
+            out.extend(expand_input(m))
+    return out
+
+def map_shards(func: Callable[..., Any], items: List[Any], workers: Optional[int] = None, *extra: Any) -> List[Any]:
+    """
+    샤드당 워커 1개로 func(item, *extra) 실행, 입력 순서대로 결과 반환.
+    item은 샤드 경로 또는 (입력, 출력) 튜플 등 도구별 작업 단위.
+    """
+    if len(items) <= 1 or workers == 1:
+        return [func(it, *extra) for it in items]
+    n = min(len(items), workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=n) as ex:
+        return list(ex.map(func, items, *[[e] * len(items) for e in extra]))
+
+def imap_ordered(func: Callable[..., Any], items: Iterable[Any], workers: Optional[int] = None,
+                 window: Optional[int] = None, *extra: Any) -> Iterator[Any]:
+    """
+    func(item, *extra)를 워커 풀에서 실행해 입력 순서대로 결과를 yield.
+    동시에 제출된 작업은 window개(기본 워커 수 x 2)로 제한 → items를 한꺼번에 읽지 않음.
+    workers == 1 이면 현재 프로세스에서 순차 실행.
+    """
+    if workers == 1:
+        for it in items:
+            yield func(it, *extra)
+        return
+    n = workers or os.cpu_count() or 1
+    window = window or n * 2
+    with ProcessPoolExecutor(max_workers=n) as ex:
+        pending = deque()
+        for it in items:
+            pending.append(ex.submit(func, it, *extra))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
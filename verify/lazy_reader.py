@@ -0,0 +1,119 @@
+# lazy_reader.py
+# -*- coding: utf-8 -*-
+"""
+빌드 포맷 줄에서 id와 assistant content만 부분 디코딩하는 지연(lazy) 리더.
+
+빌드 포맷 한 줄:
+  {"id":1,"messages":[{"role":"system","content":"<~1.5KB 시스템 프롬프트>"},
+                      {"role":"user","content":"..."},{"role":"assistant","content":"{\\"text\\": ...}"}]}
+대부분의 분석 도구는 id와 messages[2].content만 쓰는데 json.loads는 시스템 프롬프트 문자열까지 전부 디코딩한다.
+
+- 빠른 경로 (scan_line, 줄은 str 또는 UTF-8 bytes):
+    id       : 줄 맨 앞 {"id": <정수 | 문자열>, "messages": [ 를 정규식으로
+    assistant: 마지막 "role" 위치에서 "role":"assistant","content":" 확인,
+               줄 끝이 "}]} 인지 확인 후 그 사이 문자열 하나만 json.decoder.scanstring으로 디코딩
+               (bytes 줄이면 이 구간만 UTF-8 디코딩 → 시스템 프롬프트는 str로 만들지도 않음)
+    system / user: 디코딩하지 않고 {"role": "<문자열>", "content": "<문자열>"} 형태인지만 정규식으로 확인
+               (문자열은 이스케이프 / 제어문자까지 JSON 규칙대로 검사, bytes 줄이면 UTF-8 유효성도
+                → 깨진 줄은 빠른 경로에서 빠짐)
+               system 구간은 거의 모든 줄이 같으므로 마지막으로 통과한 구간과 같으면 (복사 없이 비교) 재검사 생략
+    JSON 문자열 안의 따옴표는 항상 \\" 로 이스케이프되므로 원문에 보이는 "role"은 실제 키뿐
+    → "role"이 정확히 3번이고 id 다음 키가 messages, 줄 끝이 }]} 이면 assistant = messages[2]
+- 키 순서 / 메시지 수 / id 위치가 다르거나 어디서든 확인이 어긋나면 None → 호출 측은 json.loads 폴백
+  (깨진 JSON이면 json.loads가 ValueError → 빠른 경로가 없을 때와 같은 결과)
+- assistant_view(line): 빠른 경로면 {"id", "messages": [None, None, {"role": "assistant", "content"}]} 형태의
+  가벼운 행, 아니면 json.loads(line) 결과 → messages[2] / id만 보는 기존 함수에 그대로 넘길 수 있다
+
+사용 예:
+  from jsonl_io import iter_raw_lines
+  from lazy_reader import assistant_view
+  for line in iter_raw_lines(path):
+      row = assistant_view(line)      # ValueError: JSON 아님
+      rid, msgs = row.get("id"), row.get("messages")
+"""
+
+import re
+import json
+from json.decoder import scanstring
+from typing import Any, Dict, Optional, Tuple, Union
+
+_HEAD = r'\{\s*"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*")\s*,\s*"messages"\s*:\s*\['
+_ASSISTANT = r'"role"\s*:\s*"assistant"\s*,\s*"content"\s*:\s*"'
+_TAIL = r'"\s*\}\s*\]\s*\}\s*$'
+# 유효한 JSON 문자열 (이스케이프 / 제어문자 규칙 포함)과 "role", "content" 멤버
+_STRING = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+_MEMBERS = r'"role"\s*:\s*' + _STRING + r'\s*,\s*"content"\s*:\s*' + _STRING + r'\s*\}\s*,\s*\{\s*'
+# '[' 뒤 system 메시지 ~ user의 "role" 앞 / user의 "role" ~ assistant의 "role" 앞
+_SYSTEM = r'\s*\{\s*' + _MEMBERS
+_USER = _MEMBERS
+
+# (head, user, assistant, tail, "role", 따옴표) — str 줄 / bytes 줄용
+_PATTERNS = {
+    str: (re.compile(_HEAD), re.compile(_USER), re.compile(_ASSISTANT), re.compile(_TAIL), '"role"', '"'),
+    bytes: (re.compile(_HEAD.encode()), re.compile(_USER.encode()), re.compile(_ASSISTANT.encode()),
+            re.compile(_TAIL.encode()), b'"role"', b'"'),
+}
+_SYSTEM_RE = {str: re.compile(_SYSTEM), bytes: re.compile(_SYSTEM.encode())}
+_last_system: Dict[type, Union[str, bytes, None]] = {str: None, bytes: None}   # 마지막으로 통과한 system 구간
+
+def _system_ok(line: Union[str, bytes], start: int, end: int) -> bool:
+    """line[start:end] (system 메시지 구간)이 유효한 JSON인지. 직전과 같은 시스템 프롬프트면 비교만."""
+    kind = type(line)
+    last = _last_system[kind]
+    if last is not None and end - start == len(last) and line.startswith(last, start):
+        return True
+    if _SYSTEM_RE[kind].fullmatch(line, start, end) is None:
+        return False
+    piece = line[start:end]
+    if kind is bytes:
+        try:
+            piece.decode("utf-8")
+        except UnicodeDecodeError:
+            return False
+    _last_system[kind] = piece
+    return True
+
+def scan_line(line: Union[str, bytes]) -> Optional[Tuple[Any, str]]:
+    """빌드 포맷 줄 → (id, assistant content 문자열). 레이아웃이 다르면 None."""
+    is_bytes = isinstance(line, bytes)
+    head, user, assistant, tail, role, quote = _PATTERNS[bytes if is_bytes else str]
+    m = head.match(line)
+    if m is None or line.count(role, m.end()) != 3:
+        return None
+    u = line.find(role, line.find(role, m.end()) + 1)
+    r = line.rfind(role)
+    # 건너뛰는 system / user 구간도 JSON으로 유효해야 함 (아니면 json.loads 폴백에서 ValueError)
+    if not _system_ok(line, m.end(), u) or user.fullmatch(line, u, r) is None:
+        return None
+    a = assistant.match(line, r)
+    if a is None:
+        return None
+    q = line.rfind(quote)
+    if q < a.end() or tail.match(line, q) is None:
+        return None
+    piece = line[a.end():q]
+    raw_id = m.group(1)
+    try:
+        if is_bytes:
+            line[u:r].decode("utf-8")       # user 구간은 UTF-8 유효성만 확인
+            piece = piece.decode("utf-8")
+            raw_id = raw_id.decode("utf-8")
+        content, end = scanstring(piece + '"', 0)
+        # 중간에 이스케이프 안 된 따옴표가 있으면 구간이 문자열 하나가 아님
+        if end != len(piece) + 1:
+            return None
+        rid: Any = scanstring(raw_id, 1)[0] if raw_id[0] == '"' else int(raw_id)
+    except ValueError:
+        return None
+    return rid, content
+
+def assistant_view(line: Union[str, bytes]) -> Any:
+    """
+    id / messages[2]만 채운 가벼운 행 (system / user 메시지 자리는 None).
+    빠른 경로가 안 맞으면 json.loads(line) 전체 결과 (dict가 아닐 수도 있음, 깨진 JSON이면 ValueError).
+    """
+    hit = scan_line(line)
+    if hit is None:
+        return json.loads(line)
+    rid, content = hit
+    return {"id": rid, "messages": [None, None, {"role": "assistant", "content": content}]}
@@ -0,0 +1,298 @@
+# parse_predictions.py
+# -*- coding: utf-8 -*-
+"""
+모델이 생성한 assistant JSON용 관대한(tolerant) 고속 파서.
+
+- fast path : json.loads 한 번으로 객체가 나오면 그대로 (대부분의 행)
+- repair    : 문자열 인식 스캐너 1패스로 흔한 결함 보정 후 다시 json.loads
+    ```json 코드 펜스 / 앞뒤 잡담   → 첫 '{'부터 짝이 맞는 '}'까지만 사용
+    후행 쉼표 ({..., } / [..., ])   → 제거
+    True / False / None            → true / false / null
+    출력이 잘림(max_tokens)         → 열린 문자열 / 괄호를 닫아 줌
+                                      값이 없는 마지막 멤버(키 도중 / "key" / "key": 에서 잘림)와
+                                      도중에 잘린 리터럴/숫자(tr, -, 1.) 멤버/원소는 버림,
+                                      배열에 새로 열다 잘려 빈 객체({)는 원소째 버림
+- realign   : 예측 value를 입력 텍스트 기준 오프셋으로 재정렬
+    text[begin:end] != value 이면 autofix_offsets.fix_entity_offsets()
+    (로컬 윈도우 → 전역 정확 매칭 → 정규화 근사) 로 begin/end 교체, 못 찾으면 그대로 둠
+- 통계: ok / repaired / failed 비율, realigned / unaligned 엔티티 수, 1000행당 ms
+
+evaluate.py가 예측 채점 시 사용하며, 단독 실행하면 정규화된 {"id", "answer"} JSONL을 쓴다:
+  python parse_predictions.py --pred predictions.jsonl --prompts "../Test Dataset/Test_Dataset_500_Prompt_Format.jsonl" \\
+      --out predictions_parsed.jsonl --stats parse_stats.json
+"""
+
+import io
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Optional
+
+from jsonl_io import open_text_auto, open_text_write
+from autofix_offsets import fix_entity_offsets
+from instrument import add_profile_args, profiler_from_args
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSE = {"{": "}", "[": "]"}
+# 값이 시작된 객체 멤버: "key" : <값 첫 글자>
+_MEMBER_WITH_VALUE = re.compile(r'\s*"(?:[^"\\]|\\.)*"\s*:\s*\S')
+# 멤버/원소 끝의 따옴표 없는 토큰(리터럴/숫자)과, 완결된 형태
+_BARE_TAIL = re.compile(r'([^\s"{}\[\]:,]+)\s*$')
+_COMPLETE_SCALAR = re.compile(r'true|false|null|-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+
+def repair_json(s: str) -> Optional[str]:
+    """
+    첫 '{'부터 최상위 객체가 닫힐 때까지 1패스 스캔하며 결함 보정한 JSON 텍스트.
+    '{'가 없으면 None.
+    """
+    start = s.find("{")
+    if start < 0:
+        return None
+    out: List[str] = []
+    stack: List[str] = []
+    starts: List[int] = []      # 열린 괄호별 현재 멤버 시작 위치 (out 인덱스)
+    in_str = False
+    esc = False
+    i, n = start, len(s)
+    while i < n:
+        ch = s[i]
+        if in_str:
+            out.append(ch)
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            elif ch == "\n":
+                out[-1] = "\\n"      # 문자열 안 실제 줄바꿈
+            i += 1
+            continue
+        if ch == '"':
+            in_str = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+            starts.append(len(out))
+        elif ch == ",":
+            out.append(ch)
+            if starts:
+                starts[-1] = len(out)
+        elif ch in "}]":
+            # 후행 쉼표 제거
+            j = len(out) - 1
+            while j >= 0 and out[j] in " \t\r\n":
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            if stack:
+                stack.pop()
+                starts.pop()
+            out.append(ch)
+            if not stack:
+                return "".join(out)   # 최상위 객체 끝 → 뒤쪽 잡담/펜스 무시
+        elif ch.isalpha():
+            j = i
+            while j < n and (s[j].isalnum() or s[j] == "_"):
+                j += 1
+            word = s[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # 잘린 출력: 열린 문자열 닫기 → 미완성 마지막 멤버/원소 버림 → 괄호 닫기
+    if in_str:
+        if esc:
+            out.pop()
+        out.append('"')
+    if stack:
+        member = "".join(out[starts[-1]:])
+        bare = _BARE_TAIL.search(member)
+        if ((stack[-1] == "{" and member.strip() and not _MEMBER_WITH_VALUE.match(member))
+                or (bare and not _COMPLETE_SCALAR.fullmatch(bare.group(1)))):
+            del out[starts[-1]:]
+    while out and out[-1] in " \t\r\n,":
+        out.pop()
+    # 배열의 새 원소 '{' 직후에서 잘려 비어 버린 객체는 원소째 버림
+    while len(stack) > 1 and stack[-1] == "{" and stack[-2] == "[" and out[-1] == "{":
+        out.pop()
+        stack.pop()
+        starts.pop()
+        while out and out[-1] in " \t\r\n,":
+            out.pop()
+    for open_ch in reversed(stack):
+        out.append(_CLOSE[open_ch])
+    return "".join(out)
+
+def realign(obj: Dict[str, Any], text: Optional[str], stats: Optional["ParseStats"] = None) -> None:
+    """entities의 begin/end를 입력 텍스트 기준으로 재정렬 (제자리 수정)."""
+    if not isinstance(text, str):
+        text = obj.get("text")
+    ents = obj.get("entities")
+    if not isinstance(text, str) or not isinstance(ents, list):
+        return
+    for e in ents:
+        if not isinstance(e, dict) or not isinstance(e.get("value"), str) or not e["value"]:
+            continue
+        b, en, v = e.get("begin"), e.get("end"), e["value"]
+        if isinstance(b, int) and isinstance(en, int) and 0 <= b < en <= len(text) and text[b:en] == v:
+            continue
+        fixed = fix_entity_offsets(text, {"value": v, "begin": b if isinstance(b, int) else 0},
+                                   use_nfkc=True, use_casefold=False)
+        if fixed:
+            e["begin"], e["end"] = fixed
+            if stats:
+                stats.realigned += 1
+        elif stats:
+            stats.unaligned += 1
+
+class ParseStats:
+    def __init__(self):
+        self.ok = 0
+        self.repaired = 0
+        self.failed = 0
+        self.realigned = 0
+        self.unaligned = 0
+        self.seconds = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.ok + self.repaired + self.failed
+
+    def merge(self, other: "ParseStats") -> None:
+        for k in ("ok", "repaired", "failed", "realigned", "unaligned", "seconds"):
+            setattr(self, k, getattr(self, k) + getattr(other, k))
+
+    def summary(self) -> Dict[str, Any]:
+        n = self.rows
+        return {
+            "rows": n,
+            "ok": self.ok,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "ok_rate": round(self.ok / n, 6) if n else 0.0,
+            "repair_rate": round(self.repaired / n, 6) if n else 0.0,
+            "fail_rate": round(self.failed / n, 6) if n else 0.0,
+            "realigned_entities": self.realigned,
+            "unaligned_entities": self.unaligned,
+            "ms_per_1000_rows": round(self.seconds * 1e6 / n, 3) if n else 0.0,
+        }
+
+def parse_prediction(raw: Any, text: Optional[str] = None, stats: Optional[ParseStats] = None,
+                     repair: bool = True, align: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    모델 출력(문자열 또는 객체) → assistant JSON 객체, 실패 시 None.
+    text: 입력(사용자) 텍스트. 주면 오프셋을 이 텍스트 기준으로 재정렬.
+    """
+    t0 = time.perf_counter()
+    obj: Any = raw if isinstance(raw, dict) else None
+    status = "ok"
+    if obj is None and isinstance(raw, str):
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            obj = None
+        if not isinstance(obj, dict) and repair:
+            fixed = repair_json(raw)
+            try:
+                obj = json.loads(fixed) if fixed is not None else None
+            except ValueError:
+                obj = None
+            status = "repaired"
+    if not isinstance(obj, dict):
+        obj, status = None, "failed"
+    elif align:
+        realign(obj, text, stats)
+    if stats:
+        setattr(stats, status, getattr(stats, status) + 1)
+        stats.seconds += time.perf_counter() - t0
+    return obj
+
+def raw_output(row: Dict[str, Any]) -> Any:
+    """예측 행에서 모델 출력: answer / messages[2].content / 행 자체(content 포맷)."""
+    if "answer" in row:
+        return row["answer"]
+    msgs = row.get("messages")
+    if isinstance(msgs, list) and len(msgs) >= 3 and isinstance(msgs[2], dict):
+        return msgs[2].get("content")
+    if "error" in row:
+        return None
+    return {"text": row.get("content"), "has_sensitive": row.get("has_sensitive"), "entities": row.get("entities")}
+
+def load_prompts(path: str) -> Dict[str, str]:
+    """id → 입력 텍스트 (prompt / answer / messages 포맷)."""
+    from infer_client import prompt_text
+    from profile_lengths import extract_text_entities
+    out: Dict[str, str] = {}
+    with open_text_auto(path) as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            row = json.loads(s)
+            text = prompt_text(row)
+            if text is None:
+                text = extract_text_entities(row)[0]
+            if text is not None:
+                out[str(row.get("id"))] = text
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Tolerant parser for model-generated assistant JSON")
+    ap.add_argument("--pred", required=True, help="예측 JSONL ({id, answer} / messages)")
+    ap.add_argument("--out", required=True, help='출력 JSONL ({"id", "answer": <정규화된 JSON 문자열>})')
+    ap.add_argument("--prompts", default=None, help="입력 텍스트 JSONL (id 조인, 오프셋 재정렬 기준; 없으면 예측의 text)")
+    ap.add_argument("--no-repair", action="store_true", help="repair 경로 사용 안 함 (엄격 파싱)")
+    ap.add_argument("--no-realign", action="store_true", help="오프셋 재정렬 안 함")
+    ap.add_argument("--keep-failed", action="store_true", help="파싱 실패 행도 answer=null로 기록")
+    ap.add_argument("--stats", default=None, help="파싱 통계 JSON 경로")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    prof = profiler_from_args(args, "parse")
+    stats = ParseStats()
+    with prof, open_text_auto(args.pred) as fin, open_text_write(args.out) as fout:
+        with prof.stage("read"):
+            prompts = load_prompts(args.prompts) if args.prompts else {}
+        for line in prof.iter("read", fin):
+            s = line.strip()
+            if not s:
+                continue
+            prof.tick()
+            with prof.stage("parse"):
+                row = json.loads(s)
+            rid = row.get("id")
+            with prof.stage("fix"):
+                obj = parse_prediction(raw_output(row), prompts.get(str(rid)), stats,
+                                       repair=not args.no_repair, align=not args.no_realign)
+            if obj is None and not args.keep_failed:
+                continue
+            with prof.stage("serialize"):
+                ans = json.dumps(obj, ensure_ascii=False) if obj is not None else None
+                out = json.dumps({"id": rid, "answer": ans}, ensure_ascii=False)
+            with prof.stage("write"):
+                fout.write(out + "\n")
+
+    summary = stats.summary()
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(summary, ensure_ascii=False, indent=2) + "\n")
+    sys.stderr.write(
+        f"[parse] rows={summary['rows']} ok={summary['ok']} repaired={summary['repaired']} failed={summary['failed']} "
+        f"realigned={summary['realigned_entities']} unaligned={summary['unaligned_entities']} "
+        f"{summary['ms_per_1000_rows']}ms/1000 rows\n"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# profile_lengths.py
+# -*- coding: utf-8 -*-
+"""
+텍스트 길이 / 엔티티 밀도 스트리밍 프로파일러 (t-digest 분위수).
+
+- 수집 지표
+    text_length              : 텍스트 길이(문자 수)
+    entities_per_100         : 100자당 엔티티 수
+    entity_length[LABEL]     : 라벨별 엔티티 길이(end-begin)
+    buckets                  : Test Dataset 길이 구간(<=100, <=200, <=500, <=1000, >1000)별
+                               행 수 / 엔티티 수 / entities_per_100 분위수
+- 파일(샤드)별로 워커 프로세스에서 집계 → t-digest 병합
+- 결과 JSON에는 분위수 요약과 함께 digest 중심점(centroids)이 들어 있어
+  --merge로 여러 실행 결과를 다시 합칠 수 있음
+
+사용 예:
+  python profile_lengths.py ../dataset_full_build_56000.jsonl --out train_profile.json --workers 4
+  python profile_lengths.py "../Test Dataset/Test_Dataset_500_Answer_Format.jsonl" --out test_profile.json
+  python profile_lengths.py --merge shard0.json shard1.json --out merged.json
+"""
+
+import io
+import sys
+import json
+import math
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonl_io import iter_raw_lines
+from lazy_reader import assistant_view
+from instrument import add_profile_args, profiler_from_args
+
+QUANTILES = (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+BUCKETS = ((100, "<=100"), (200, "<=200"), (500, "<=500"), (1000, "<=1000"))
+OVER_LAST = ">1000"
+
+# ------------------------------ t-digest ----------------------------------
+class TDigest:
+    """
+    Merging t-digest (k1 스케일 함수).
+    add()는 버퍼에 쌓고, 버퍼가 차면 정렬 후 한 번에 압축한다.
+    """
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.centroids: List[Tuple[float, float]] = []   # (mean, weight), mean 오름차순
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_limit = int(compression * 5)
+        self.count = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float, w: float = 1.0) -> None:
+        self._buffer.append((x, w))
+        self.count += w
+        self.total += x * w
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inv(self, k: float) -> float:
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        pts = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        n = sum(w for _, w in pts)
+        out: List[Tuple[float, float]] = []
+        cur_m, cur_w = pts[0]
+        q0 = 0.0
+        q_limit = self._k_inv(self._k(0.0) + 1) * n
+        for m, w in pts[1:]:
+            if q0 + cur_w + w <= q_limit:
+                cur_w += w
+                cur_m += (m - cur_m) * w / cur_w
+            else:
+                out.append((cur_m, cur_w))
+                q0 += cur_w
+                q_limit = self._k_inv(self._k(min(1.0, q0 / n)) + 1) * n
+                cur_m, cur_w = m, w
+        out.append((cur_m, cur_w))
+        self.centroids = out
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        self._buffer.extend(other.centroids)
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        c = self.centroids
+        if not c:
+            return None
+        if len(c) == 1:
+            return c[0][0]
+        target = q * self.count
+        cum = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for m, w in c:
+            center = cum + w / 2
+            if target < center:
+                span = center - prev_center
+                t = (target - prev_center) / span if span > 0 else 0.0
+                return prev_mean + t * (m - prev_mean)
+            cum += w
+            prev_center, prev_mean = center, m
+        span = self.count - prev_center
+        t = (target - prev_center) / span if span > 0 else 1.0
+        return prev_mean + min(1.0, t) * (self.max - prev_mean)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        out = {
+            "count": int(self.count),
+            "mean": round(self.total / self.count, 4),
+            "min": self.min,
+            "max": self.max,
+        }
+        for q in QUANTILES:
+            out[f"p{round(q * 100):02d}"] = round(self.quantile(q), 4)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "centroids": [[round(m, 6), w] for m, w in self.centroids],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "TDigest":
+        td = cls(d.get("compression", 100.0))
+        td.centroids = [(float(m), float(w)) for m, w in d.get("centroids", [])]
+        td.count = float(d.get("count", 0))
+        td.total = float(d.get("total", 0))
+        td.min = d["min"] if d.get("min") is not None else math.inf
+        td.max = d["max"] if d.get("max") is not None else -math.inf
+        return td
+
+# ------------------------------ IO helpers --------------------------------
+def extract_text_entities(row: Dict[str, Any]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """messages / answer / content 포맷에서 (text, entities) 추출."""
+    text, _, ents = extract_record(row)
+    return text, ents
+
+def extract_record(row: Dict[str, Any]) -> Tuple[Optional[str], Any, List[Dict[str, Any]]]:
+    """extract_text_entities + has_sensitive 원값 (없으면 None, 타입 검사 안 함)."""
+    ans: Any = None
+    msgs = row.get("messages")
+    if isinstance(msgs, list) and len(msgs) >= 3 and isinstance(msgs[2], dict):
+        ans = msgs[2].get("content")
+    elif "answer" in row:
+        ans = row["answer"]
+    if isinstance(ans, str):
+        try:
+            ans = json.loads(ans)
+        except Exception:
+            ans = None
+    if isinstance(ans, dict):
+        text, hs, ents = ans.get("text"), ans.get("has_sensitive"), ans.get("entities")
+    else:
+        text, hs, ents = row.get("text", row.get("content")), row.get("has_sensitive"), row.get("entities")
+    return (text if isinstance(text, str) else None), hs, (ents if isinstance(ents, list) else [])
+
+def bucket_of(n: int) -> str:
+    for limit, name in BUCKETS:
+        if n <= limit:
+            return name
+    return OVER_LAST
+
+# ------------------------------ Profile -----------------------------------
+class Profile:
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.rows = 0
+        self.bad_lines = 0
+        self.text_length = TDigest(compression)
+        self.entities_per_100 = TDigest(compression)
+        self.entity_length: Dict[str, TDigest] = {}
+        self.buckets: Dict[str, Dict[str, Any]] = {}
+
+    def _bucket(self, name: str) -> Dict[str, Any]:
+        b = self.buckets.get(name)
+        if b is None:
+            b = self.buckets[name] = {"rows": 0, "entities": 0, "entities_per_100": TDigest(self.compression)}
+        return b
+
+    def add(self, text: str, ents: List[Dict[str, Any]]) -> None:
+        n = len(text)
+        self.rows += 1
+        self.text_length.add(n)
+        density = len(ents) * 100.0 / n if n else 0.0
+        self.entities_per_100.add(density)
+        b = self._bucket(bucket_of(n))
+        b["rows"] += 1
+        b["entities"] += len(ents)
+        b["entities_per_100"].add(density)
+        for e in ents:
+            if not isinstance(e, dict):
+                continue
+            lab = e.get("label")
+            bb, ee = e.get("begin"), e.get("end")
+            if isinstance(bb, int) and isinstance(ee, int):
+                ln = ee - bb
+            elif isinstance(e.get("value"), str):
+                ln = len(e["value"])
+            else:
+                continue
+            td = self.entity_length.get(lab)
+            if td is None:
+                td = self.entity_length[lab] = TDigest(self.compression)
+            td.add(ln)
+
+    def merge(self, other: "Profile") -> None:
+        self.rows += other.rows
+        self.bad_lines += other.bad_lines
+        self.text_length.merge(other.text_length)
+        self.entities_per_100.merge(other.entities_per_100)
+        for lab, td in other.entity_length.items():
+            self.entity_length.setdefault(lab, TDigest(self.compression)).merge(td)
+        for name, ob in other.buckets.items():
+            b = self._bucket(name)
+            b["rows"] += ob["rows"]
+            b["entities"] += ob["entities"]
+            b["entities_per_100"].merge(ob["entities_per_100"])
+
+    def to_dict(self, sources: List[str]) -> Dict[str, Any]:
+        order = [name for _, name in BUCKETS] + [OVER_LAST]
+        return {
+            "sources": sources,
+            "rows": self.rows,
+            "bad_lines": self.bad_lines,
+            "text_length": self.text_length.summary(),
+            "entities_per_100": self.entities_per_100.summary(),
+            "entity_length": {lab: td.summary() for lab, td in sorted(self.entity_length.items(), key=lambda x: str(x[0]))},
+            "buckets": {
+                name: {
+                    "rows": self.buckets[name]["rows"],
+                    "share": round(self.buckets[name]["rows"] / self.rows, 4) if self.rows else 0,
+                    "entities": self.buckets[name]["entities"],
+                    "entities_per_100": self.buckets[name]["entities_per_100"].summary(),
+                }
+                for name in order if name in self.buckets
+            },
+            # 병합용 원시 digest
+            "digests": {
+                "compression": self.compression,
+                "text_length": self.text_length.to_dict(),
+                "entities_per_100": self.entities_per_100.to_dict(),
+                "entity_length": {str(lab): td.to_dict() for lab, td in self.entity_length.items()},
+                "buckets": {
+                    name: {"rows": b["rows"], "entities": b["entities"], "entities_per_100": b["entities_per_100"].to_dict()}
+                    for name, b in self.buckets.items()
+                },
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Profile":
+        dg = d["digests"]
+        p = cls(dg.get("compression", 100.0))
+        p.rows = d.get("rows", 0)
+        p.bad_lines = d.get("bad_lines", 0)
+        p.text_length = TDigest.from_dict(dg["text_length"])
+        p.entities_per_100 = TDigest.from_dict(dg["entities_per_100"])
+        p.entity_length = {lab: TDigest.from_dict(td) for lab, td in dg["entity_length"].items()}
+        p.buckets = {
+            name: {"rows": b["rows"], "entities": b["entities"], "entities_per_100": TDigest.from_dict(b["entities_per_100"])}
+            for name, b in dg["buckets"].items()
+        }
+        return p
+
+def profile_file(path: str, compression: float = 100.0) -> Dict[str, Any]:
+    """파일 1개 집계 (워커 프로세스에서 실행, 병합 가능한 dict 반환)."""
+    prof = Profile(compression)
+    for s in iter_raw_lines(path):
+        try:
+            text, ents = extract_text_entities(assistant_view(s))
+        except Exception:
+            prof.bad_lines += 1
+            continue
+        if text is None:
+            prof.bad_lines += 1
+            continue
+        prof.add(text, ents)
+    return prof.to_dict([path])
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming text-length / entity-density profiler (t-digest quantiles)")
+    ap.add_argument("inputs", nargs="*", help="입력 JSONL (messages / answer / content 포맷)")
+    ap.add_argument("--merge", nargs="*", default=[], help="이전에 내보낸 프로파일 JSON들을 병합")
+    ap.add_argument("--out", default=None, help="결과 JSON 경로 (미지정 시 stdout)")
+    ap.add_argument("--workers", type=int, default=1, help="파일(샤드) 단위 병렬 워커 수")
+    ap.add_argument("--compression", type=float, default=100.0, help="t-digest compression (클수록 정확/큼)")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    if not args.inputs and not args.merge:
+        ap.error("입력 JSONL 또는 --merge 대상이 필요합니다")
+
+    parts: List[Dict[str, Any]] = []
+    timer = profiler_from_args(args, "profile_lengths")
+
+    def collect(results) -> None:
+        for d in timer.iter("parse", results):
+            parts.append(d)
+            timer.tick(d["rows"] + d["bad_lines"])
+
+    with timer:
+        if args.workers > 1 and len(args.inputs) > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                collect(ex.map(profile_file, args.inputs, [args.compression] * len(args.inputs)))
+        else:
+            collect(profile_file(p, args.compression) for p in args.inputs)
+        for p in args.merge:
+            with timer.stage("read"), open(p, "r", encoding="utf-8") as f:
+                parts.append(json.load(f))
+
+        with timer.stage("fix"):
+            total = Profile(args.compression)
+            sources: List[str] = []
+            for d in parts:
+                total.merge(Profile.from_dict(d))
+                sources.extend(d.get("sources", []))
+
+        with timer.stage("serialize"):
+            result = json.dumps(total.to_dict(sources), ensure_ascii=False, indent=2)
+        if args.out:
+            with timer.stage("write"), open(args.out, "w", encoding="utf-8", newline="\n") as f:
+                f.write(result + "\n")
+            sys.stderr.write(f"[profile] rows={total.rows} bad_lines={total.bad_lines} -> {args.out}\n")
+        else:
+            try:
+                sys.stdout.reconfigure(encoding="utf-8")
+            except Exception:
+                sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+            print(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# quota_sampler.py
+# -*- coding: utf-8 -*-
+"""
+목표 분포(쿼터) 기반 조합 균형 샘플러.
+
+README의 목표 분포(카테고리 1/2/3/4개 = 50/30/15/5%, 라벨당 1000개,
+조합당 500/200/100/50개)를 수작업으로 잘라 맞추던 것을 자동화한다.
+
+- 층(stratum) 키 (spec의 "key"):
+    label    : 단일 라벨 행만 대상, 키 = 라벨 (기본 데이터셋 "라벨당 N개")
+    category : 정렬한 카테고리 조합, 예) "FINANCIAL+NETWORK"   (6C1~6C4 조합별 쿼터)
+    size     : 카테고리 개수 "1" ~ "6"                          (50/30/15/5% 비율)
+- 층마다 쿼터 크기의 reservoir(시드 고정)로 후보 파일들을 1패스 스트리밍
+    → 메모리는 쿼터 합계에 비례
+- 모든 층이 쿼터를 채우면 입력 순서대로 빌드 출력, 모자라면 층별 부족분 리포트 후 종료코드 1
+  (--allow-partial 이면 부족한 채로 출력)
+
+spec JSON 예:
+  {"key": "category", "per_size": {"1": 500, "2": 200, "3": 100, "4": 50}, "seed": 42}
+  {"key": "label", "default": 1000}
+  {"key": "size", "total": 10000, "ratios": {"1": 0.5, "2": 0.3, "3": 0.15, "4": 0.05}}
+  {"key": "category", "quotas": {"BASIC": 1000, "AUTH+FINANCIAL": 300}, "default": 0}
+
+  quotas   : 층별 개수 직접 지정
+  per_size : (key=category) 카테고리 개수별 "조합당" 개수 → 해당 크기의 모든 조합에 적용
+  total + ratios : 층별 비율 → 총합이 total과 정확히 일치하도록 최대 잔여 방식으로 배분
+  default  : 위에서 정해지지 않은 층의 쿼터 (기본 0 = 제외)
+
+사용 예:
+  python quota_sampler.py --spec readme_targets.json --input "../dataset6C2/*_final.jsonl" ../dataset6C3.jsonl \
+      --out dataset_balanced.jsonl --report quota_report.json
+"""
+
+import io
+import sys
+import json
+import glob
+import random
+import argparse
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonl_io import add_shard_args, writer_from_args, expand_input, open_text_auto
+from profile_lengths import extract_text_entities
+from instrument import add_profile_args, profiler_from_args
+
+# -------------------- 카테고리 (README 라벨링 그룹) --------------------
+CATEGORIES = {
+    # 기본 신원 정보
+    "BASIC": ("NAME", "PHONE", "EMAIL", "ADDRESS", "POSTAL_CODE"),
+    # 공적 식별번호
+    "PUBLIC_ID": ("PERSONAL_CUSTOMS_ID", "RESIDENT_ID", "PASSPORT", "DRIVER_LICENSE",
+                  "FOREIGNER_ID", "HEALTH_INSURANCE_ID", "BUSINESS_ID", "MILITARY_ID"),
+    # 인증 정보
+    "AUTH": ("JWT", "API_KEY", "GITHUB_PAT", "PRIVATE_KEY"),
+    # 금융 정보
+    "FINANCIAL": ("CARD_NUMBER", "CARD_EXPIRY", "BANK_ACCOUNT", "CARD_CVV", "PAYMENT_PIN", "MOBILE_PAYMENT_PIN"),
+    # 가상화폐 정보
+    "CRYPTO": ("MNEMONIC", "CRYPTO_PRIVATE_KEY", "HD_WALLET", "PAYMENT_URI_QR"),
+    # 네트워크 정보 / 기타
+    "NETWORK": ("IPV4", "IPV6", "MAC_ADDRESS", "IMEI"),
+}
+LABEL_CATEGORY = {lab: cat for cat, labs in CATEGORIES.items() for lab in labs}
+# ------------------------------------------------------------------------
+
+KEYS = ("label", "category", "size")
+
+def stratum_key(ents: List[Dict[str, Any]], key: str) -> Optional[str]:
+    """행의 층 키. 대상이 아니면(엔티티 없음, 미등록 라벨, label 키인데 다중 라벨) None."""
+    labels = {e.get("label") for e in ents if isinstance(e, dict)}
+    if not labels or any(lab not in LABEL_CATEGORY for lab in labels):
+        return None
+    if key == "label":
+        return next(iter(labels)) if len(labels) == 1 else None
+    cats = sorted({LABEL_CATEGORY[lab] for lab in labels})
+    return "+".join(cats) if key == "category" else str(len(cats))
+
+def all_strata(key: str) -> List[str]:
+    if key == "label":
+        return list(LABEL_CATEGORY)
+    if key == "size":
+        return [str(k) for k in range(1, len(CATEGORIES) + 1)]
+    return ["+".join(sorted(c)) for k in range(1, len(CATEGORIES) + 1) for c in combinations(CATEGORIES, k)]
+
+def apportion(total: int, ratios: Dict[str, float]) -> Dict[str, int]:
+    """비율을 정수 개수로 배분 (최대 잔여 방식, 합계 == total)."""
+    s = sum(ratios.values())
+    raw = {k: total * v / s for k, v in ratios.items()}
+    out = {k: int(v) for k, v in raw.items()}
+    rest = total - sum(out.values())
+    for k in sorted(raw, key=lambda k: (-(raw[k] - out[k]), k))[:rest]:
+        out[k] += 1
+    return out
+
+def resolve_quotas(spec: Dict[str, Any]) -> Dict[str, int]:
+    """spec → {층 키: 쿼터}. 0 인 층은 제외."""
+    key = spec.get("key", "category")
+    if key not in KEYS:
+        raise ValueError(f"spec.key must be one of {KEYS}: {key!r}")
+    default = int(spec.get("default", 0))
+    quotas = {s: default for s in all_strata(key)}
+
+    per_size = spec.get("per_size")
+    if per_size:
+        if key != "category":
+            raise ValueError("per_size is only valid with key=category")
+        for s in quotas:
+            n = per_size.get(str(s.count("+") + 1))
+            if n is not None:
+                quotas[s] = int(n)
+    if "ratios" in spec:
+        if "total" not in spec:
+            raise ValueError("ratios requires total")
+        quotas.update(apportion(int(spec["total"]), {str(k): float(v) for k, v in spec["ratios"].items()}))
+    for s, n in (spec.get("quotas") or {}).items():
+        quotas[str(s)] = int(n)
+
+    unknown = sorted(set(quotas) - set(all_strata(key)))
+    if unknown:
+        raise ValueError(f"unknown strata for key={key}: {unknown}")
+    return {s: n for s, n in quotas.items() if n > 0}
+
+class QuotaTracker:
+    """층별 쿼터 크기 reservoir. 항목은 (입력 순번, 원본 줄, id)."""
+
+    def __init__(self, quotas: Dict[str, int], seed: int):
+        self.quotas = quotas
+        self.seen = {s: 0 for s in quotas}
+        self.res: Dict[str, List[Tuple[int, str, Any]]] = {s: [] for s in quotas}
+        self.rng = {s: random.Random(f"{seed}:{s}") for s in quotas}
+
+    def offer(self, stratum: str, seq: int, line: str, rec_id: Any = None) -> None:
+        q = self.quotas.get(stratum)
+        if not q:
+            return
+        self.seen[stratum] += 1
+        res = self.res[stratum]
+        if len(res) < q:
+            res.append((seq, line, rec_id))
+            return
+        j = self.rng[stratum].randrange(self.seen[stratum])
+        if j < q:
+            res[j] = (seq, line, rec_id)
+
+    def shortfall(self) -> Dict[str, int]:
+        return {s: q - len(self.res[s]) for s, q in self.quotas.items() if len(self.res[s]) < q}
+
+    def selected(self) -> List[Tuple[int, str, Any]]:
+        return sorted(item for res in self.res.values() for item in res)
+
+def main():
+    ap = argparse.ArgumentParser(description="Quota-driven combination-balanced sampler (README distribution targets)")
+    ap.add_argument("--spec", required=True, help="목표 분포 spec JSON 경로")
+    ap.add_argument("--input", nargs="+", required=True, help="후보 JSONL / 매니페스트 (glob 가능)")
+    ap.add_argument("--out", required=True, help="출력 JSONL (원본 줄 그대로, 입력 순서)")
+    ap.add_argument("--report", default=None, help="층별 쿼터/가용/선택/부족 리포트 JSON (미지정 시 stderr 요약만)")
+    ap.add_argument("--seed", type=int, default=None, help="spec.seed 대신 사용할 난수 시드")
+    ap.add_argument("--allow-partial", action="store_true", help="쿼터 미달이어도 선택된 행으로 빌드 출력")
+    add_shard_args(ap)
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    with open(args.spec, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    key = spec.get("key", "category")
+    seed = args.seed if args.seed is not None else int(spec.get("seed", 42))
+    try:
+        quotas = resolve_quotas(spec)
+    except ValueError as e:
+        ap.error(str(e))
+
+    paths: List[str] = []
+    for pat in args.input:
+        matched = sorted(glob.glob(pat)) or [pat]
+        for p in matched:
+            paths.extend(expand_input(p))
+
+    prof = profiler_from_args(args, "quota")
+    with prof:
+        tracker = QuotaTracker(quotas, seed)
+        stats = {"rows": 0, "bad_lines": 0, "out_of_scope": 0}
+        seq = 0
+        for path in paths:
+            with open_text_auto(path) as fin:
+                for ln, line in enumerate(prof.iter("read", fin), 1):
+                    s = line.strip()
+                    if not s:
+                        continue
+                    prof.tick()
+                    try:
+                        with prof.stage("parse"):
+                            row = json.loads(s)
+                            text, ents = extract_text_entities(row)
+                    except Exception:
+                        text = None
+                    if text is None:
+                        stats["bad_lines"] += 1
+                        sys.stderr.write(f"[quota] {path}:{ln} 파싱 불가 → 건너뜀\n")
+                        continue
+                    seq += 1
+                    stats["rows"] += 1
+                    st = stratum_key(ents, key)
+                    if st is None or st not in quotas:
+                        stats["out_of_scope"] += 1
+                        continue
+                    tracker.offer(st, seq, s, row.get("id"))
+
+        short = tracker.shortfall()
+        report = {
+            "spec": spec,
+            "key": key,
+            "seed": seed,
+            "inputs": paths,
+            **stats,
+            "quota_total": sum(quotas.values()),
+            "selected_total": sum(len(r) for r in tracker.res.values()),
+            "shortfall_total": sum(short.values()),
+            "strata": {
+                s: {"quota": q, "available": tracker.seen[s], "selected": len(tracker.res[s]), "shortfall": short.get(s, 0)}
+                for s, q in sorted(quotas.items())
+            },
+        }
+        if args.report:
+            with open(args.report, "w", encoding="utf-8", newline="\n") as f:
+                f.write(json.dumps(report, ensure_ascii=False, indent=2) + "\n")
+
+        for s in sorted(short):
+            sys.stderr.write(f"[quota] 부족 {s}: quota={quotas[s]} available={tracker.seen[s]} shortfall={short[s]}\n")
+
+        if short and not args.allow_partial:
+            sys.stderr.write(f"[quota] {len(short)}개 층 쿼터 미달 (부족 {report['shortfall_total']}건) → 출력하지 않음\n")
+            return 1
+
+        writer = writer_from_args(args.out, args)
+        try:
+            with prof.stage("write"):
+                for _, line, rid in tracker.selected():
+                    writer.write(line, rid)
+        finally:
+            writer.close()
+        sys.stderr.write(
+            f"[quota] rows={stats['rows']} selected={report['selected_total']}/{report['quota_total']} "
+            f"strata={len(quotas)} -> {args.out}\n"
+        )
+        return 1 if short else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# split_dataset.py
+# -*- coding: utf-8 -*-
+"""
+카테고리(또는 라벨) 조합 × 길이 구간 층화 train / val / test 분할기 (1패스, 층별 reservoir).
+
+- 층(stratum) 키: 조합 | 길이 구간(<=100 ... >1000), 조합은 --key로 선택
+    category(기본): quota_sampler.CATEGORIES 기준 카테고리 조합 ("BASIC+FINANCIAL", 미등록 라벨은 OTHER)
+                    → 6개 카테고리 조합 × 길이 구간이라 층 수가 작아 층마다 val/test를 채우기 쉬움
+    label         : 정렬한 라벨 조합 ("CARD_CVV+NAME") — 조합 수가 많아 대부분의 층이 1~2행
+    엔티티가 없으면 두 모드 모두 "NONE"
+- 층마다 크기 val+test의 reservoir를 두고 한 번만 읽는다.
+    reservoir에서 밀려난 행 / 뽑히지 않은 행은 즉시 train 파일로 스트리밍
+    → 메모리는 (층 수 × reservoir 크기)에 비례, 코퍼스 크기와 무관
+- 층별 난수는 "seed:stratum"으로 시드 → 같은 입력/시드면 항상 같은 분할
+- 작은 층은 --min-train 만큼 train에 먼저 남긴 뒤 val → test 순으로 채움
+- 리포트: 층별 행 수 / 분할별 개수, val·test에 한 건도 없는 라벨 조합 목록
+
+출력 순서:
+  train : 입력 순서(단, reservoir에서 밀려난 행은 밀려난 시점에 기록, min-train으로 되돌린 행은 마지막)
+  val/test : 입력 순서
+
+사용 예:
+  python split_dataset.py ../dataset_full_build_56000.jsonl --train train.jsonl --val val.jsonl --test test.jsonl \
+      --val-per-stratum 5 --test-per-stratum 5 --seed 42 --report split_report.json
+  python split_dataset.py ../dataset_full_build_56000.jsonl --train train.jsonl --val val.jsonl --key label
+"""
+
+import io
+import sys
+import json
+import random
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonl_io import expand_input, open_text_auto, open_text_write
+from profile_lengths import extract_text_entities, bucket_of
+from quota_sampler import LABEL_CATEGORY
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
+NO_LABEL = "NONE"
+OTHER_CATEGORY = "OTHER"
+KEYS = ("category", "label")
+
+def combo_key(ents: List[Dict[str, Any]], key: str = "category") -> str:
+    labels = {str(e.get("label")) for e in ents if isinstance(e, dict) and e.get("label")}
+    if not labels:
+        return NO_LABEL
+    if key == "label":
+        return "+".join(sorted(labels))
+    return "+".join(sorted({LABEL_CATEGORY.get(lab, OTHER_CATEGORY) for lab in labels}))
+
+def stratum_of(text: str, ents: List[Dict[str, Any]], key: str = "category") -> str:
+    return f"{combo_key(ents, key)}|{bucket_of(len(text))}"
+
+class Stratum:
+    """층 하나의 reservoir (Algorithm R). 항목은 (입력 순번, 원본 줄)."""
+
+    def __init__(self, key: str, size: int, seed: int):
+        self.key = key
+        self.size = size
+        self.rng = random.Random(f"{seed}:{key}")
+        self.rows = 0
+        self.reservoir: List[Tuple[int, str]] = []
+        self.alloc: Dict[str, int] = {}
+
+    def offer(self, seq: int, line: str) -> Optional[str]:
+        """행을 넣어 보고 train으로 보낼 줄(밀려났거나 뽑히지 않음)을 반환."""
+        self.rows += 1
+        if len(self.reservoir) < self.size:
+            self.reservoir.append((seq, line))
+            return None
+        j = self.rng.randrange(self.rows)
+        if j < self.size:
+            out = self.reservoir[j][1]
+            self.reservoir[j] = (seq, line)
+            return out
+        return line
+
+    def allocate(self, n_val: int, n_test: int, min_train: int) -> Dict[str, List[Tuple[int, str]]]:
+        """reservoir를 train(되돌림) / val / test로 배분."""
+        items = list(self.reservoir)
+        self.rng.shuffle(items)
+        streamed = self.rows - len(items)
+        back = min(len(items), max(0, min_train - streamed))
+        rest = items[back:]
+        return {
+            "train": items[:back],
+            "val": rest[:n_val],
+            "test": rest[n_val:n_val + n_test],
+        }
+
+def split(inputs: List[str], n_val: int, n_test: int, seed: int, min_train: int,
+          train_out, on_bad=None, prof=NULL_PROFILER, key: str = "category") -> Tuple[Dict[str, Stratum], Dict[str, List[Tuple[int, str]]], Dict[str, int]]:
+    """입력을 1회 스트리밍하며 train_out에 train 줄을 쓰고, 층/배분 결과를 반환."""
+    strata: Dict[str, Stratum] = {}
+    stats = {"rows": 0, "bad_lines": 0, "train_streamed": 0}
+    seq = 0
+    for path in inputs:
+        with open_text_auto(path) as fin:
+            for ln, line in enumerate(prof.iter("read", fin), 1):
+                s = line.strip()
+                if not s:
+                    continue
+                prof.tick()
+                try:
+                    with prof.stage("parse"):
+                        text, ents = extract_text_entities(json.loads(s))
+                except Exception:
+                    text = None
+                if text is None:
+                    stats["bad_lines"] += 1
+                    if on_bad:
+                        on_bad(path, ln)
+                    continue
+                seq += 1
+                stats["rows"] += 1
+                sk = stratum_of(text, ents, key)
+                st = strata.get(sk)
+                if st is None:
+                    st = strata[sk] = Stratum(sk, n_val + n_test, seed)
+                out = st.offer(seq, s)
+                if out is not None:
+                    with prof.stage("write"):
+                        train_out.write(out + "\n")
+                    stats["train_streamed"] += 1
+
+    picked: Dict[str, List[Tuple[int, str]]] = {"train": [], "val": [], "test": []}
+    for sk in sorted(strata):
+        alloc = strata[sk].allocate(n_val, n_test, min_train)
+        strata[sk].alloc = {name: len(v) for name, v in alloc.items()}
+        for name, v in alloc.items():
+            picked[name].extend(v)
+    for v in picked.values():
+        v.sort(key=lambda t: t[0])
+    return strata, picked, stats
+
+def build_report(strata: Dict[str, Stratum], picked: Dict[str, List[Tuple[int, str]]],
+                 stats: Dict[str, int], args) -> Dict[str, Any]:
+    per: Dict[str, Dict[str, int]] = {}
+    combos: Dict[str, Dict[str, int]] = {}
+    for key in sorted(strata):
+        st = strata[key]
+        train = st.rows - st.alloc["val"] - st.alloc["test"]
+        row = {"rows": st.rows, "train": train, "val": st.alloc["val"], "test": st.alloc["test"]}
+        per[key] = row
+        c = combos.setdefault(key.split("|", 1)[0], {"rows": 0, "train": 0, "val": 0, "test": 0})
+        for k, v in row.items():
+            c[k] += v
+    return {
+        "inputs": args.inputs,
+        "key": args.key,
+        "seed": args.seed,
+        "val_per_stratum": args.val_per_stratum,
+        "test_per_stratum": args.test_per_stratum,
+        "min_train": args.min_train,
+        "rows": stats["rows"],
+        "bad_lines": stats["bad_lines"],
+        "splits": {
+            "train": stats["rows"] - len(picked["val"]) - len(picked["test"]),
+            "val": len(picked["val"]),
+            "test": len(picked["test"]),
+        },
+        "strata_count": len(per),
+        "combos_missing": {
+            "val": sorted(k for k, c in combos.items() if args.val_per_stratum and not c["val"]),
+            "test": sorted(k for k, c in combos.items() if args.test_per_stratum and not c["test"]),
+        },
+        "combos": combos,
+        "strata": per,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="One-pass stratified train/val/test splitter (category/label combination x length bucket)")
+    ap.add_argument("inputs", nargs="+", help="입력 JSONL / 매니페스트 (messages / answer / content 포맷)")
+    ap.add_argument("--train", required=True, help="train 출력 JSONL")
+    ap.add_argument("--val", required=True, help="validation 출력 JSONL")
+    ap.add_argument("--test", default=None, help="test 출력 JSONL (미지정 시 test 분할 없음)")
+    ap.add_argument("--val-per-stratum", type=int, default=2, help="층당 validation 행 수 (reservoir 크기)")
+    ap.add_argument("--test-per-stratum", type=int, default=2, help="층당 test 행 수 (--test 지정 시)")
+    ap.add_argument("--min-train", type=int, default=1, help="층마다 train에 먼저 남길 최소 행 수")
+    ap.add_argument("--key", choices=KEYS, default="category",
+                    help="층 조합 기준: category(카테고리 조합, 기본) / label(라벨 조합)")
+    ap.add_argument("--seed", type=int, default=42, help="난수 시드")
+    ap.add_argument("--report", default=None, help="층별 개수 리포트 JSON 경로 (미지정 시 stdout)")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    if not args.test:
+        args.test_per_stratum = 0
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+    inputs = [p for path in args.inputs for p in expand_input(path)]
+
+    def warn(path, ln):
+        sys.stderr.write(f"[split] {path}:{ln} 파싱 불가 → 건너뜀\n")
+
+    prof = profiler_from_args(args, "split")
+    with prof:
+        with open_text_write(args.train) as ftrain:
+            strata, picked, stats = split(inputs, args.val_per_stratum, args.test_per_stratum,
+                                          args.seed, args.min_train, ftrain, warn, prof, args.key)
+            with prof.stage("write"):
+                for _, line in picked["train"]:
+                    ftrain.write(line + "\n")
+        for name, path in (("val", args.val), ("test", args.test)):
+            if not path:
+                continue
+            with prof.stage("write"), open_text_write(path) as f:
+                for _, line in picked[name]:
+                    f.write(line + "\n")
+
+    report = build_report(strata, picked, stats, args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text + "\n")
+    else:
+        try:
+            sys.stdout.reconfigure(encoding="utf-8")
+        except Exception:
+            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+        print(text)
+
+    sp = report["splits"]
+    sys.stderr.write(
+        f"[split] rows={stats['rows']} strata={len(strata)} train={sp['train']} val={sp['val']} test={sp['test']} "
+        f"missing_val_combos={len(report['combos_missing']['val'])}\n"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# stub_server.py
+# -*- coding: utf-8 -*-
+"""
+오프라인 테스트 / 처리량 측정용 OpenAI 호환 로컬 서버 (표준 라이브러리 asyncio).
+
+- POST /v1/chat/completions : 마지막 user 메시지 텍스트로 응답 조회
+    --gold    : 정답 JSONL(answer / messages / content 포맷) → 같은 text의 정답 JSON을 그대로 반환
+    --fixture : {"<user text>": "<assistant content>" 또는 객체} JSON → 지정한 응답 반환 (gold보다 우선)
+    둘 다 없으면 {"text": <입력>, "has_sensitive": false, "entities": []}
+- --delay-ms / --jitter-ms : 응답 지연 흉내, --fail-rate : 그 비율로 503 + Retry-After (재시도 테스트)
+- GET /health : "ok"
+
+사용 예:
+  python stub_server.py --gold "../Test Dataset/Test_Dataset_500_Answer_Format.jsonl" --port 8000 --delay-ms 20 --fail-rate 0.05
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, Optional
+
+from jsonl_io import expand_input, open_text_auto
+from profile_lengths import extract_text_entities
+
+def load_answers(gold: Optional[str], fixture: Optional[str]) -> Dict[str, str]:
+    """user text → assistant content(JSON 문자열)."""
+    answers: Dict[str, str] = {}
+    if gold:
+        for p in expand_input(gold):
+            with open_text_auto(p) as f:
+                for line in f:
+                    s = line.strip()
+                    if not s:
+                        continue
+                    row = json.loads(s)
+                    text, ents = extract_text_entities(row)
+                    if text is None:
+                        continue
+                    ans = row.get("answer")
+                    if isinstance(ans, str):
+                        answers[text] = ans
+                    else:
+                        answers[text] = json.dumps(
+                            {"text": text, "has_sensitive": len(ents) > 0, "entities": ents},
+                            ensure_ascii=False)
+    if fixture:
+        with open(fixture, "r", encoding="utf-8") as f:
+            for text, v in json.load(f).items():
+                answers[text] = v if isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+    return answers
+
+class StubServer:
+    def __init__(self, answers: Dict[str, str], delay_ms: float, jitter_ms: float, fail_rate: float, seed: int):
+        self.answers = answers
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failed = 0
+
+    def complete(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        user = ""
+        for m in req.get("messages") or []:
+            if isinstance(m, dict) and m.get("role") == "user":
+                user = m.get("content") or ""
+        content = self.answers.get(user)
+        if content is None:
+            content = json.dumps({"text": user, "has_sensitive": False, "entities": []}, ensure_ascii=False)
+        return {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path = line.decode("latin-1").split()[:2]
+                hdrs: Dict[str, str] = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    hdrs[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(hdrs.get("content-length", "0")))
+                status, extra, data = await self.route(method, path, body)
+                head = [f"HTTP/1.1 {status}", "Content-Type: application/json",
+                        f"Content-Length: {len(data)}", "Connection: keep-alive"] + extra
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if hdrs.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes):
+        if method == "GET" and path == "/health":
+            return "200 OK", [], b'"ok"'
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return "404 Not Found", [], b'{"error":"not found"}'
+        self.requests += 1
+        delay = self.delay_ms + (self.rng.random() * self.jitter_ms if self.jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            self.failed += 1
+            return "503 Service Unavailable", ["Retry-After: 0"], b'{"error":"stub overload"}'
+        try:
+            req = json.loads(body)
+        except Exception:
+            return "400 Bad Request", [], b'{"error":"bad json"}'
+        return "200 OK", [], json.dumps(self.complete(req), ensure_ascii=False).encode("utf-8")
+
+async def serve(args) -> None:
+    stub = StubServer(load_answers(args.gold, args.fixture), args.delay_ms, args.jitter_ms, args.fail_rate, args.seed)
+    server = await asyncio.start_server(stub.handle, args.host, args.port)
+    sys.stderr.write(f"[stub] {len(stub.answers)} answers, listening on http://{args.host}:{args.port}/v1/chat/completions\n")
+    sys.stderr.flush()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sys.stderr.write(f"[stub] requests={stub.requests} injected_failures={stub.failed}\n")
+
+def main():
+    ap = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server for offline inference tests")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--gold", default=None, help="정답 JSONL (같은 user text의 정답을 그대로 응답)")
+    ap.add_argument("--fixture", default=None, help='{"<user text>": <assistant content>} JSON')
+    ap.add_argument("--delay-ms", type=float, default=0.0, help="응답 지연(ms)")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="추가 무작위 지연 상한(ms)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="503 응답 비율 (0~1)")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# watch_validate.py
+# -*- coding: utf-8 -*-
+"""
+데이터셋 디렉터리 감시 + 변경 줄만 재검증하는 watch 모드.
+
+- 디렉터리 트리를 --interval 초마다 폴링 (os.scandir stat: mtime_ns / size 비교)
+- 바뀐 파일은 줄 단위 해시(blake2b 8바이트)로 이전 상태와 비교해
+  처음 보는 줄만 검증, 나머지는 해시별 캐시 결과를 재사용 → 전체 재검사 없음
+- 검증은 check_dataset.py와 동일한 코드/메시지 (오류 코드 CODES 공용)
+    messages 포맷           : row_checks() + offset_problems()
+    answer / content 포맷   : extract_text_entities() + offset_problems() (+ has_sensitive 일치)
+- 파일별 요약(행 수 / 문제 행 / 코드별 건수)을 변경 시마다 출력, --summary 로 JSON 파일도 갱신
+
+사용 예:
+  python watch_validate.py ../dataset6C2 ../dataset6C3 "../Additional Dataset/seperated_files"
+  python watch_validate.py ../dataset6C2 --once --summary watch_summary.json     # 1회 검사 후 종료 (CI용)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import fnmatch
+import hashlib
+import argparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from jsonl_io import read_text_safely, zstd
+from check_dataset import offset_problems, row_checks
+from profile_lengths import extract_text_entities
+from instrument import NULL_PROFILER, add_profile_args, profiler_from_args
+
+DEFAULT_PATTERNS = ("*.jsonl", "*.jsonl.gz", "*.jsonl.zst")
+
+# 쓰는 중인 파일(잘린 gzip/zstd 스트림 포함)을 읽을 때 나는 예외 → 다음 폴링에서 재시도
+IN_PROGRESS_ERRORS: Tuple[type, ...] = (OSError, EOFError, zlib.error) + (
+    (zstd.ZstdError,) if zstd is not None else ())
+
+# 문제 항목: (코드, 메시지, 라벨, 엔티티 인덱스)
+Problem = Tuple[str, str, Optional[str], Optional[int]]
+
+def line_hash(line: str) -> bytes:
+    return hashlib.blake2b(line.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+
+def line_problems(line: str, kw: Dict[str, Any]) -> List[Problem]:
+    """줄 1개 검사 (check_dataset과 같은 코드/메시지)."""
+    try:
+        row = json.loads(line)
+    except Exception as e:
+        return [("JSON_PARSE", f"JSON parse error: {e}", None, None)]
+    if not isinstance(row, dict):
+        return [("MESSAGES_SHAPE", "row must be a JSON object", None, None)]
+    try:
+        return _row_problems(row, line, kw)
+    except Exception as e:
+        # check_dataset이 예외로 멈추는 비정형 구조도 감시는 계속
+        return [("MESSAGES_SHAPE", f"unexpected structure: {type(e).__name__}: {e}", None, None)]
+
+def _row_problems(row: Dict[str, Any], line: str, kw: Dict[str, Any]) -> List[Problem]:
+    if "messages" not in row:
+        # 테스트 정답 / 원본(content) 포맷
+        text, ents = extract_text_entities(row)
+        if text is None:
+            return [("TEXT_TYPE", "'text' / 'content' must be string", None, None)]
+        probs = [(c, m, lab, i) for c, m, i, lab in offset_problems(text, ents, **kw)]
+        hs = row.get("has_sensitive")
+        if isinstance(hs, bool) and (len(ents) > 0) != hs:
+            probs.append(("HS_MISMATCH", f"has_sensitive mismatch: entities={len(ents)} hs={hs}", None, None))
+        return probs
+    _, pre, job, post, _ = row_checks(line)
+    errs = [(c, m, lab, i) for c, m, i, lab in offset_problems(*job, **kw)] if job is not None else []
+    return pre + errs + post
+
+class FileState:
+    """파일 1개의 줄 해시별 검사 결과 캐시 (현재 내용에 있는 해시만 유지)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sig: Optional[Tuple[int, int]] = None
+        self.cache: Dict[bytes, List[Problem]] = {}
+        self.rows = 0
+        self.bad = 0
+        self.codes: Dict[str, int] = {}
+
+    def update(self, text: str, kw: Dict[str, Any]) -> Tuple[int, List[Tuple[int, Problem]]]:
+        """새 내용 반영 → (재검증한 줄 수, 재검증한 줄의 문제 [(줄 번호, 문제)])."""
+        cache: Dict[bytes, List[Problem]] = {}
+        fresh: List[Tuple[int, Problem]] = []
+        checked = 0
+        rows = bad = 0
+        codes: Dict[str, int] = {}
+        for ln, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            h = line_hash(line)
+            probs = cache.get(h)
+            if probs is None:
+                probs = self.cache.get(h)
+                if probs is None:
+                    probs = line_problems(line, kw)
+                    checked += 1
+                    fresh.extend((ln, p) for p in probs)
+                cache[h] = probs
+            rows += 1
+            if probs:
+                bad += 1
+                for p in probs:
+                    codes[p[0]] = codes.get(p[0], 0) + 1
+        self.cache = cache
+        self.rows, self.bad, self.codes = rows, bad, codes
+        return checked, fresh
+
+    def summary(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "problem_rows": self.bad, "by_code": dict(sorted(self.codes.items()))}
+
+def iter_files(roots: List[str], patterns: List[str]) -> Iterator[Tuple[str, os.stat_result]]:
+    """감시 대상 파일 (경로, stat). 디렉터리는 재귀."""
+    stack: List[str] = []
+    for root in roots:
+        if os.path.isdir(root):
+            stack.append(root)
+        elif os.path.isfile(root):
+            yield root, os.stat(root)
+    while stack:
+        d = stack.pop()
+        try:
+            entries = list(os.scandir(d))
+        except OSError:
+            continue
+        for ent in entries:
+            if ent.is_dir(follow_symlinks=False):
+                stack.append(ent.path)
+            elif ent.is_file() and any(fnmatch.fnmatch(ent.name, p) for p in patterns):
+                try:
+                    yield ent.path, ent.stat()
+                except OSError:
+                    continue
+
+class Watcher:
+    def __init__(self, roots: List[str], patterns: List[str], kw: Dict[str, Any], show: int, out=print,
+                 prof=NULL_PROFILER):
+        self.roots = roots
+        self.patterns = patterns
+        self.kw = kw
+        self.show = show
+        self.out = out
+        self.prof = prof
+        self.files: Dict[str, FileState] = {}
+
+    def poll(self) -> List[str]:
+        """한 번 스캔해서 바뀐 파일만 재검증, 바뀐 파일 경로 목록 반환."""
+        changed: List[str] = []
+        seen = set()
+        for path, st in iter_files(self.roots, self.patterns):
+            seen.add(path)
+            sig = (st.st_mtime_ns, st.st_size)
+            fs = self.files.get(path)
+            if fs is not None and fs.sig == sig:
+                continue
+            if fs is None:
+                fs = self.files[path] = FileState(path)
+            try:
+                with self.prof.stage("read"):
+                    text = read_text_safely(path)
+            except IN_PROGRESS_ERRORS:
+                continue  # 저장 도중(잘린 압축 스트림 포함) / 권한 → 다음 폴링에서 재시도
+            prev_bad = fs.bad if fs.sig is not None else None
+            t0 = time.perf_counter()
+            with self.prof.stage("validate"):
+                checked, fresh = fs.update(text, self.kw)
+            self.prof.tick(checked)
+            fs.sig = sig
+            changed.append(path)
+            self.report(fs, prev_bad, checked, fresh, time.perf_counter() - t0)
+        for path in sorted(set(self.files) - seen):
+            del self.files[path]
+            self.out(f"[watch] {path}: removed")
+            changed.append(path)
+        return changed
+
+    def report(self, fs: FileState, prev_bad: Optional[int], checked: int,
+               fresh: List[Tuple[int, Problem]], secs: float) -> None:
+        codes = " ".join(f"{c}={n}" for c, n in sorted(fs.codes.items()))
+        delta = "" if prev_bad is None else f" ({fs.bad - prev_bad:+d})"
+        status = "OK" if fs.bad == 0 else "PROBLEMS"
+        self.out(f"[watch] {fs.path}: {status} rows={fs.rows} bad={fs.bad}{delta} "
+                 f"rechecked={checked} in {secs * 1000:.0f}ms {codes}".rstrip())
+        for ln, (code, msg, _, _) in fresh[:self.show]:
+            self.out(f"  [L{ln}] {code} {msg}")
+        if len(fresh) > self.show:
+            self.out(f"  ... {len(fresh) - self.show} more")
+
+    def summary(self) -> Dict[str, Any]:
+        files = {p: fs.summary() for p, fs in sorted(self.files.items())}
+        return {
+            "files": len(files),
+            "rows": sum(s["rows"] for s in files.values()),
+            "problem_rows": sum(s["problem_rows"] for s in files.values()),
+            "per_file": files,
+        }
+
+def write_summary(path: str, summary: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps(summary, ensure_ascii=False, indent=2) + "\n")
+    os.replace(tmp, path)
+
+def main():
+    ap = argparse.ArgumentParser(description="Watch dataset files and re-validate only changed lines")
+    ap.add_argument("roots", nargs="+", help="감시할 디렉터리 / 파일")
+    ap.add_argument("--pattern", action="append", default=None,
+                    help=f"대상 파일 glob (반복 가능, 기본: {' '.join(DEFAULT_PATTERNS)})")
+    ap.add_argument("--interval", type=float, default=0.5, help="폴링 주기(초)")
+    ap.add_argument("--once", action="store_true", help="1회 검사 후 종료 (문제 있으면 종료코드 1)")
+    ap.add_argument("--summary", default=None, help="파일별 요약 JSON 경로 (변경 시마다 갱신)")
+    ap.add_argument("--show", type=int, default=10, help="파일당 출력할 새 문제 수")
+    ap.add_argument("--nfkc", action="store_true", help="use NFKC normalization for slice comparison (default NFC)")
+    ap.add_argument("--allow-overlap", action="store_true", help="do not error on overlapping entity spans")
+    ap.add_argument("--strict-entity-keys", action="store_true", help="error on extra/missing keys in entity objects")
+    ap.add_argument("--no-sort-warn", action="store_true", help="disable sorted-by-begin warning")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    try:
+        sys.stdout.reconfigure(encoding="utf-8", line_buffering=True)
+    except Exception:
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", line_buffering=True)
+
+    kw = dict(use_nfkc=args.nfkc, allow_overlap=args.allow_overlap,
+              strict_entity_keys=args.strict_entity_keys, warn_sort=not args.no_sort_warn)
+    prof = profiler_from_args(args, "watch")
+    w = Watcher(args.roots, args.pattern or list(DEFAULT_PATTERNS), kw, args.show, prof=prof)
+
+    with prof:
+        w.poll()
+        summary = w.summary()
+        if args.summary:
+            with prof.stage("write"):
+                write_summary(args.summary, summary)
+        print(f"[watch] {summary['files']} file(s), rows={summary['rows']} problem_rows={summary['problem_rows']}")
+        if args.once:
+            return 0 if summary["problem_rows"] == 0 else 1
+
+        try:
+            while True:
+                time.sleep(args.interval)
+                if w.poll() and args.summary:
+                    with prof.stage("write"):
+                        write_summary(args.summary, w.summary())
+        except KeyboardInterrupt:
+            return 0
+
+if __name__ == "__main__":
+    sys.exit(main())